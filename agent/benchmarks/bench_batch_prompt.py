@@ -0,0 +1,126 @@
+"""Modelled throughput of batched prompts against batch size K.
+
+A stub LLM charges a fixed per-request overhead plus a per-token cost for
+prompt evaluation and generation (tokens estimated as characters / 4), so the
+numbers show how much of the fixed instruction preamble batching amortizes.
+
+Usage::
+
+    python benchmarks/bench_batch_prompt.py --emails 2000 --sizes 1,2,4,8,16
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import re
+
+from inbox_triage_agent.classifier import ClassificationEngine
+from inbox_triage_agent.models import Message
+from inbox_triage_agent.rules import classify_with_rules
+
+_EMAIL_ID = re.compile(r"^Email id (\d+):\nSubject: (.*)\nSnippet: (.*)$", re.M)
+_SINGLE = re.compile(r"^Subject: (.*)\nSnippet: (.*)$", re.M)
+
+_SUBJECTS = (
+    ("Thank you for applying to Acme", "We received your application and will review it shortly."),
+    ("Your application to Globex", "Unfortunately we regret to inform you that we are not moving forward."),
+    ("Coding challenge", "Please complete the HackerRank assessment within 5 days."),
+    ("Interview availability", "Could you share availability for a phone screen next week?"),
+    ("Offer letter", "We are excited to extend an offer with the compensation package attached."),
+    ("Weekly newsletter", "Top stories this week. Unsubscribe at any time."),
+)
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class CostModelLLM:
+    model = "cost-model"
+
+    def __init__(self, *, request_seconds: float, prompt_token_seconds: float, output_token_seconds: float) -> None:
+        self._request_seconds = request_seconds
+        self._prompt_token_seconds = prompt_token_seconds
+        self._output_token_seconds = output_token_seconds
+        self.elapsed = 0.0
+        self.calls = 0
+        self.prompt_tokens = 0
+
+    async def generate(self, prompt: str, *, options: dict | None = None) -> str:
+        emails = _EMAIL_ID.findall(prompt)
+        if emails:
+            answer = json.dumps(
+                [
+                    {"id": int(email_id), "label": classify_with_rules(f"{subject}\n{snippet}"), "confidence": 0.9,
+                     "reason": "stub"}
+                    for email_id, subject, snippet in emails
+                ]
+            )
+        else:
+            subject, snippet = _SINGLE.search(prompt).groups()  # type: ignore[union-attr]
+            answer = json.dumps(
+                {"label": classify_with_rules(f"{subject}\n{snippet}"), "confidence": 0.9, "reason": "stub"}
+            )
+
+        self.calls += 1
+        self.prompt_tokens += _tokens(prompt)
+        self.elapsed += (
+            self._request_seconds
+            + _tokens(prompt) * self._prompt_token_seconds
+            + _tokens(answer) * self._output_token_seconds
+        )
+        return answer
+
+
+def corpus(count: int, seed: int) -> list[Message]:
+    rng = random.Random(seed)
+    return [Message(id=index, subject=subject, snippet=snippet) for index, (subject, snippet) in
+            ((index, rng.choice(_SUBJECTS)) for index in range(1, count + 1))]
+
+
+async def run(size: int, messages: list[Message], args: argparse.Namespace) -> dict[str, float]:
+    llm = CostModelLLM(
+        request_seconds=args.request_ms / 1000,
+        prompt_token_seconds=args.prompt_token_ms / 1000,
+        output_token_seconds=args.output_token_ms / 1000,
+    )
+    engine = ClassificationEngine(llm, min_confidence=0.5)
+    llm_labelled = 0
+    for start in range(0, len(messages), size):
+        chunk = messages[start : start + size]
+        if size == 1:
+            payloads = [await engine.classify_message(chunk[0])]
+        else:
+            payloads = await engine.classify_batch(chunk)
+        llm_labelled += sum(payload.classified_by == "llm" for payload in payloads)
+
+    return {
+        "batch_size": size,
+        "llm_calls": llm.calls,
+        "prompt_tokens_per_email": llm.prompt_tokens / len(messages),
+        "modelled_seconds": llm.elapsed,
+        "emails_per_second": len(messages) / llm.elapsed,
+        "llm_share": llm_labelled / len(messages),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--sizes", default="1,2,4,8,16")
+    parser.add_argument("--request-ms", type=float, default=50.0, help="fixed cost per Ollama request")
+    parser.add_argument("--prompt-token-ms", type=float, default=2.0, help="prompt evaluation cost per token")
+    parser.add_argument("--output-token-ms", type=float, default=40.0, help="generation cost per token")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    messages = corpus(args.emails, args.seed)
+    for size in (int(value) for value in args.sizes.split(",")):
+        print(json.dumps(asyncio.run(run(size, messages, args))))
+
+
+if __name__ == "__main__":
+    main()
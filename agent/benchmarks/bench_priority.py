@@ -0,0 +1,160 @@
+"""Time-to-label of high-value mail as the backlog grows, with and without priority scheduling.
+
+Each run queues ``--backlog`` low-value emails (newsletters, acknowledgements,
+rejections) and then feeds a trickle of offers and interview invites while the
+pipeline works through the backlog. Classification is a stub that takes
+``--classify-ms`` per message and labels with the keyword rules, so only the
+order of work differs between runs. Latency is measured from the moment a
+high-value email reaches the fake API to its update. Results are printed as
+JSON lines; with scheduling on, the p95 for ``offer`` and ``interview_invite``
+should stay flat as ``--backlogs`` grows.
+
+Usage::
+
+    python benchmarks/bench_priority.py --backlogs 100,400,1600 --classify-ms 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from inbox_triage_agent.metrics import Metrics
+from inbox_triage_agent.models import Message, UpdatePayload
+from inbox_triage_agent.priority import HIGH_VALUE_LABELS
+from inbox_triage_agent.rules import default_rules
+from inbox_triage_agent.runner import ClassificationPipeline
+from inbox_triage_agent.settings import Settings
+
+_LOW_VALUE = (
+    ("Acme weekly digest", "Top stories this week. Unsubscribe at any time.", {"List-Unsubscribe": "<https://x/u>"}),
+    ("Thank you for applying to Globex", "We received your application and will review it shortly.", {}),
+    ("Your application to Initech", "Unfortunately we will not be moving forward with your application.", {}),
+)
+_HIGH_VALUE = (
+    ("Offer letter from Hooli", "We are excited to extend an offer for the SRE position.", {}),
+    ("Interview availability - SRE", "Could you share availability for a phone screen next week?", {}),
+)
+
+
+class BacklogApi:
+    """Serves a growing list of unclassified messages and records updates."""
+
+    def __init__(self, backlog: list[Message], stop_event: asyncio.Event) -> None:
+        self.pending = list(backlog)
+        self.expected = len(backlog)
+        self.arrived: dict[int, float] = {}
+        self.latency: dict[int, float] = {}
+        self._stop_event = stop_event
+
+    def add(self, message: Message) -> None:
+        # Like the real API, the listing is newest first.
+        self.pending.insert(0, message)
+        self.arrived[message.id] = time.perf_counter()
+        self.expected += 1
+
+    async def fetch_messages(self, *, classification: str, limit: int, offset: int = 0, ids=None) -> list[Message]:
+        return self.pending[offset : offset + limit]
+
+    async def update_messages(self, updates) -> dict[int, str | None]:
+        for message_id, _ in updates:
+            self._done(message_id)
+        return {message_id: None for message_id, _ in updates}
+
+    async def update_message(self, message_id: int, payload: UpdatePayload) -> None:
+        self._done(message_id)
+
+    def _done(self, message_id: int) -> None:
+        if message_id in self.arrived:
+            self.latency[message_id] = time.perf_counter() - self.arrived[message_id]
+        self.pending = [message for message in self.pending if message.id != message_id]
+        self.expected -= 1
+        if self.expected <= 0:
+            self._stop_event.set()
+
+
+class StubEngine:
+    def __init__(self, seconds: float) -> None:
+        self._seconds = seconds
+        self._rules = default_rules()
+
+    async def classify_message(self, message: Message) -> UpdatePayload:
+        await asyncio.sleep(self._seconds)
+        return UpdatePayload(classification=self._rules.classify(message.combined_text()), classified_by="rules")
+
+
+def _message(message_id: int, template: tuple[str, str, dict]) -> Message:
+    subject, snippet, headers = template
+    return Message(id=message_id, subject=subject, snippet=snippet, raw_headers={"From": "x@example.com", **headers})
+
+
+async def run(backlog_size: int, scheduling: bool, args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    stop_event = asyncio.Event()
+    api = BacklogApi([_message(i, rng.choice(_LOW_VALUE)) for i in range(1, backlog_size + 1)], stop_event)
+    metrics = Metrics()
+    settings = Settings(
+        JOB_COPILOT_API_TOKEN="bench",
+        BATCH_SIZE=50,
+        POLL_INTERVAL_SECONDS=0.01,
+        CLASSIFY_CONCURRENCY=args.concurrency,
+        CLAIM_MESSAGES=False,
+        # Fixed polling, so idle back-off does not blur the comparison.
+        ADAPTIVE_POLLING=False,
+        PRIORITY_SCHEDULING=scheduling,
+        UPDATE_FLUSH_SECONDS=0.01,
+    )
+    pipeline = ClassificationPipeline(api, StubEngine(args.classify_ms / 1000), metrics, settings)
+
+    async def trickle() -> None:
+        for index in range(args.high_value):
+            await asyncio.sleep(args.interval_ms / 1000)
+            api.add(_message(backlog_size + index + 1, _HIGH_VALUE[index % len(_HIGH_VALUE)]))
+
+    feeder = asyncio.create_task(trickle())
+    await asyncio.wait_for(pipeline.run(stop_event), timeout=args.timeout)
+    feeder.cancel()
+    result: dict = {"backlog": backlog_size, "scheduling": scheduling}
+    for index, label in enumerate(HIGH_VALUE_LABELS):
+        latencies = sorted(
+            seconds
+            for message_id, seconds in api.latency.items()
+            if (message_id - backlog_size - 1) % len(_HIGH_VALUE) == index
+        )
+        result[f"{label}_p95"] = round(_percentile(latencies, 0.95), 3)
+        result[f"{label}_mean"] = round(sum(latencies) / len(latencies), 3) if latencies else None
+    return result
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    for backlog_size in (int(value) for value in args.backlogs.split(",")):
+        for scheduling in (False, True):
+            print(json.dumps(await run(backlog_size, scheduling, args)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backlogs", default="100,400,1600")
+    parser.add_argument("--high-value", type=int, default=20, help="offers and invites fed during the run")
+    parser.add_argument("--interval-ms", type=float, default=20.0, help="gap between high-value arrivals")
+    parser.add_argument("--classify-ms", type=float, default=2.0)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--seed", type=int, default=7)
+    # Keep the benchmark independent of any local agent/.env.
+    os.environ.pop("PRIORITY_SCHEDULING", None)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Prompt size, prompt-eval time and accuracy with and without prompt compaction.
+
+Each configuration classifies the same corpus: ``full`` sends every header
+and the whole snippet, ``headers`` only keeps whitelisted headers, and
+``budget:N`` also truncates snippets to about N tokens. By default a stub LLM
+labels each prompt with the keyword rules (plus a List-Unsubscribe hint) and
+charges a per-token prompt-evaluation cost, so accuracy only drops when
+compaction removes the text that decided the label. With ``--ollama-url`` the
+prompts go to a real Ollama server and its reported ``prompt_eval_duration``
+is used instead. ``--data`` reads labelled JSON lines as written by
+``inbox-triage-agent train --export``.
+
+Usage::
+
+    python benchmarks/bench_prompt_compaction.py --emails 1000 --budgets 64,128,256
+    python benchmarks/bench_prompt_compaction.py --data labelled.jsonl --ollama-url http://localhost:11434
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+
+from inbox_triage_agent.classifier import ClassificationEngine
+from inbox_triage_agent.local_model import read_examples
+from inbox_triage_agent.metrics import Metrics
+from inbox_triage_agent.models import Message
+from inbox_triage_agent.ollama_client import OllamaClient
+from inbox_triage_agent.prompt_budget import PromptCompactor, estimate_tokens
+from inbox_triage_agent.rules import classify_with_rules
+
+_SINGLE = re.compile(r"^Subject: (.*)\nSnippet: (.*)\nHeaders:\n(.*?)(?:\n\n|\Z)", re.M | re.S)
+
+_TEMPLATES = (
+    ("Thank you for applying to {company}", "We received your application for {role} and will review it shortly."),
+    ("Your application to {company}", "Unfortunately we will not be moving forward with your {role} application."),
+    ("{company} coding challenge", "Please complete the HackerRank assessment for {role} within 5 days."),
+    ("Interview availability - {role}", "Could you share availability for a phone screen with {company} next week?"),
+    ("Offer letter from {company}", "We are excited to extend an offer for the {role} position."),
+    ("{company} weekly digest", "Top stories this week from {company}."),
+    ("Following up", "Hi, just checking in about the {role} role at {company}."),
+)
+_BOILERPLATE = (
+    "This message and any attachments are confidential and intended solely for the addressee. "
+    "If you received it in error please notify the sender and delete it. {company} is an equal "
+    "opportunity employer and values diversity at all levels. "
+)
+_COMPANIES = ("Acme", "Globex", "Initech", "Umbrella", "Hooli")
+_ROLES = ("Backend Engineer", "Data Scientist", "SRE", "ML Engineer")
+_ATS = ("Greenhouse", "Lever", "Workday", None)
+_BASE64 = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
+
+def _gmail_headers(rng: random.Random, company: str, ats: str | None, bulk: bool) -> dict[str, str]:
+    def blob(length: int) -> str:
+        return "".join(rng.choice(_BASE64) for _ in range(length))
+
+    domain = f"{company.lower()}.com"
+    headers = {
+        "Delivered-To": "candidate@gmail.com",
+        "Received": f"from mail-sor-f41.google.com (mail-sor-f41.google.com. [209.85.220.41]) by mx.google.com "
+        f"with SMTPS id {blob(24)} for <candidate@gmail.com>; Mon, 05 Jan 2026 09:14:03 -0800 (PST)",
+        "X-Received": f"by 2002:a05:6a00:{blob(4)} with SMTP id {blob(30)}; Mon, 05 Jan 2026 09:14:03 -0800 (PST)",
+        "ARC-Seal": f"i=1; a=rsa-sha256; t=1767633243; cv=none; d=google.com; s=arc-20240605; b={blob(340)}",
+        "ARC-Message-Signature": f"i=1; a=rsa-sha256; c=relaxed/relaxed; d=google.com; s=arc-20240605; "
+        f"h=to:subject:message-id:date:from:mime-version:dkim-signature; bh={blob(44)}; b={blob(340)}",
+        "ARC-Authentication-Results": f"i=1; mx.google.com; dkim=pass header.i=@{domain}; spf=pass; dmarc=pass",
+        "Authentication-Results": f"mx.google.com; dkim=pass header.i=@{domain} header.s=s1 header.b={blob(8)}",
+        "DKIM-Signature": f"v=1; a=rsa-sha256; c=relaxed/relaxed; d={domain}; s=s1; t=1767633242; "
+        f"h=to:subject:message-id:date:from:mime-version; bh={blob(44)}; b={blob(340)}",
+        "X-Google-Smtp-Source": blob(96),
+        "Message-ID": f"<{blob(32)}@mail.{domain}>",
+        "Date": "Mon, 05 Jan 2026 09:14:02 -0800",
+        "To": "candidate@gmail.com",
+        "From": f"{company} Talent <talent@{domain}>",
+        "Reply-To": f"no-reply@{domain}",
+    }
+    if ats is not None:
+        headers["X-Mailer"] = f"{ats} Mailer"
+        headers[f"X-{ats}-Application-Id"] = str(rng.randint(10_000, 99_999))
+    if bulk:
+        headers["List-Unsubscribe"] = f"<https://{domain}/unsubscribe?token={blob(120)}>"
+    return headers
+
+
+def corpus(count: int, seed: int, buried_share: float) -> list[tuple[Message, str]]:
+    """Synthetic Gmail messages and the label their full text gets.
+
+    ``buried_share`` of the snippets put the deciding sentence after a long
+    disclaimer, where a tight snippet budget cuts it off.
+    """
+
+    rng = random.Random(seed)
+    examples = []
+    for index in range(1, count + 1):
+        subject, body = rng.choice(_TEMPLATES)
+        company, role = rng.choice(_COMPANIES), rng.choice(_ROLES)
+        subject, body = subject.format(company=company, role=role), body.format(company=company, role=role)
+        boilerplate = _BOILERPLATE.format(company=company) * rng.randint(1, 3)
+        snippet = boilerplate + body if rng.random() < buried_share else body + " " + boilerplate
+        bulk = "digest" in subject
+        message = Message(
+            id=index,
+            subject=subject,
+            snippet=snippet.strip(),
+            raw_headers=_gmail_headers(rng, company, rng.choice(_ATS), bulk),
+        )
+        examples.append((message, _label(subject, snippet, bulk)))
+    return examples
+
+
+def _label(subject: str, snippet: str, unsubscribe: bool) -> str:
+    label = classify_with_rules(f"{subject}\n{snippet}")
+    return "not_job_related" if label == "other" and unsubscribe else label
+
+
+class CostModelLLM:
+    """Rule-based stand-in for Ollama that charges per prompt token."""
+
+    model = "cost-model"
+
+    def __init__(self, *, request_seconds: float, prompt_token_seconds: float) -> None:
+        self._request_seconds = request_seconds
+        self._prompt_token_seconds = prompt_token_seconds
+        self.prompt_eval_seconds = 0.0
+        self.elapsed = 0.0
+
+    async def generate(self, prompt: str, *, options: dict | None = None) -> str:
+        subject, snippet, headers = _SINGLE.search(prompt).groups()  # type: ignore[union-attr]
+        label = _label(subject, snippet, "List-Unsubscribe:" in headers)
+        prompt_eval = estimate_tokens(prompt) * self._prompt_token_seconds
+        self.prompt_eval_seconds += prompt_eval
+        self.elapsed += self._request_seconds + prompt_eval
+        return json.dumps({"label": label, "confidence": 0.9, "reason": "stub"})
+
+
+async def run(
+    name: str,
+    compaction: dict | None,
+    examples: list[tuple[Message, str]],
+    args: argparse.Namespace,
+    reference: list[str] | None,
+) -> tuple[dict, list[str]]:
+    metrics = Metrics()
+    compactor = PromptCompactor(**compaction, metrics=metrics) if compaction is not None else None
+    if args.ollama_url:
+        llm = OllamaClient(
+            base_url=args.ollama_url, model=args.model, timeout=120.0, max_retries=1, keep_alive="30m", metrics=metrics
+        )
+    else:
+        llm = CostModelLLM(request_seconds=args.request_ms / 1000, prompt_token_seconds=args.prompt_token_ms / 1000)
+    engine = ClassificationEngine(llm, min_confidence=0.0, metrics=metrics, compactor=compactor)
+
+    started = time.perf_counter()
+    labels = []
+    for message, _ in examples:
+        labels.append((await engine.classify_message(message)).classification)
+    elapsed = time.perf_counter() - started
+    if isinstance(llm, OllamaClient):
+        await llm.close()
+        prompt_eval, total = metrics.ollama_prompt_eval_seconds, elapsed
+    else:
+        prompt_eval, total = llm.prompt_eval_seconds, llm.elapsed
+
+    count = len(examples)
+    result = {
+        "config": name,
+        "prompt_tokens_mean": round(metrics.prompt_tokens.mean, 1),
+        "prompt_tokens_p95": metrics.prompt_tokens.quantile(0.95),
+        "prompt_eval_seconds": round(prompt_eval, 3),
+        "seconds": round(total, 3),
+        "accuracy": round(sum(label == truth for label, (_, truth) in zip(labels, examples)) / count, 4),
+        "agreement_with_full": (
+            round(sum(a == b for a, b in zip(labels, reference)) / count, 4) if reference is not None else 1.0
+        ),
+        "headers_dropped": metrics.prompt_headers_dropped,
+        "snippets_truncated": metrics.prompt_snippets_truncated,
+    }
+    return result, labels
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    if args.data:
+        examples = read_examples(args.data)[: args.emails]
+    else:
+        examples = corpus(args.emails, args.seed, args.buried_share)
+    configs: list[tuple[str, dict | None]] = [
+        ("full", None),
+        ("headers", {"snippet_tokens": None}),
+        *((f"budget:{budget}", {"snippet_tokens": int(budget)}) for budget in args.budgets.split(",")),
+    ]
+    reference: list[str] | None = None
+    for name, compaction in configs:
+        result, labels = await run(name, compaction, examples, args, reference)
+        reference = reference or labels
+        print(json.dumps(result))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--emails", type=int, default=1000)
+    parser.add_argument("--budgets", default="64,128,256")
+    parser.add_argument("--buried-share", type=float, default=0.15, help="share of snippets with a leading disclaimer")
+    parser.add_argument("--data", help="labelled JSON lines instead of the synthetic corpus")
+    parser.add_argument("--ollama-url", help="classify with this Ollama server instead of the stub")
+    parser.add_argument("--model", default="llama3.1")
+    parser.add_argument("--request-ms", type=float, default=50.0, help="fixed cost per stub request")
+    parser.add_argument("--prompt-token-ms", type=float, default=2.0, help="stub prompt evaluation cost per token")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+"""Replay a synthetic inbox through the real ``worker_loop`` against in-process fakes.
+
+The fake API serves the message listing, claims (with 409 conflicts from a
+simulated competing worker), updates and the bulk routes. The fake Ollama
+answers with rule labels after a latency drawn from a configurable
+distribution, and fails or returns unparseable text at configurable rates.
+Both run on localhost, so the agent talks plain HTTP exactly as in
+production. Results are printed as JSON. With ``--baseline`` the run exits
+non-zero when throughput or the fallback rate regress beyond ``--tolerance``.
+
+Latency specs: ``fixed:0.2``, ``uniform:0.1,0.4`` or ``lognormal:0.2,0.5``
+(median seconds, sigma).
+
+Usage::
+
+    python benchmarks/bench_replay.py --emails 500 --latency lognormal:0.2,0.5 --failure-rate 0.02
+    python benchmarks/bench_replay.py --emails 500 --save baseline.json
+    python benchmarks/bench_replay.py --emails 500 --env LLM_BATCH_SIZE=4 --baseline baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter
+from typing import Callable
+
+from inbox_triage_agent.httpd import HttpRequest, HttpResponse, TinyHttpServer
+from inbox_triage_agent.models import Message
+from inbox_triage_agent.rules import classify_with_rules
+from inbox_triage_agent.runner import worker_loop
+from inbox_triage_agent.settings import get_settings
+
+_TEMPLATES = (
+    ("Thank you for applying to {company}", "We received your application for {role} and will review it shortly."),
+    ("Your application to {company}", "Unfortunately we will not be moving forward with your {role} application."),
+    ("{company} coding challenge", "Please complete the HackerRank assessment for {role} within {days} days."),
+    ("Interview availability - {role}", "Could you share availability for a phone screen with {company} next week?"),
+    ("Offer letter from {company}", "We are excited to extend an offer for the {role} position."),
+    ("Quick question about your background", "I'm a recruiter at {company} and came across your profile for {role}."),
+    ("{company} weekly digest", "Top stories this week from {company}. Unsubscribe at any time."),
+    ("Re: {role} role", "Thanks for getting back to me, happy to chat about {company}."),
+)
+_COMPANIES = ("Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark", "Wayne", "Wonka", "Tyrell", "Cyberdyne")
+_ROLES = ("Backend Engineer", "Data Scientist", "SRE", "Frontend Engineer", "ML Engineer", "Product Manager")
+_SINGLE = re.compile(r"^Subject: (.*)\nSnippet: (.*)$", re.M)
+_EMAIL_ID = re.compile(r"^Email id (\d+):\nSubject: (.*)\nSnippet: (.*)$", re.M)
+
+
+def corpus(count: int, seed: int) -> list[Message]:
+    rng = random.Random(seed)
+    messages = []
+    for index in range(1, count + 1):
+        subject, snippet = rng.choice(_TEMPLATES)
+        values = {"company": rng.choice(_COMPANIES), "role": rng.choice(_ROLES), "days": rng.randint(2, 7)}
+        messages.append(
+            Message(
+                id=index,
+                subject=subject.format(**values),
+                snippet=snippet.format(**values),
+                raw_headers={"From": f"jobs@{values['company'].lower()}.example"},
+            )
+        )
+    return messages
+
+
+def latency_sampler(spec: str, rng: random.Random) -> Callable[[], float]:
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        return lambda: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"unsupported latency spec {spec!r}")
+
+
+def _json(status: int, body: object) -> HttpResponse:
+    return HttpResponse(status, json.dumps(body).encode())
+
+
+class FakeApi:
+    """In-memory stand-in for the Rails messages API."""
+
+    def __init__(
+        self,
+        messages: list[Message],
+        *,
+        conflict_rate: float,
+        competitor_hold: float,
+        rng: random.Random,
+        on_done: Callable[[], None],
+    ) -> None:
+        self._messages = {message.id: message for message in messages}
+        self._newest_first = sorted(self._messages, reverse=True)
+        self._classification = {message_id: "other" for message_id in self._messages}
+        self._competitor: set[int] = set()
+        self.labelled_elsewhere: set[int] = set()
+        self._claimed_at: dict[int, float] = {}
+        self._conflict_rate = conflict_rate
+        self._competitor_hold = competitor_hold
+        self._rng = rng
+        self._on_done = on_done
+        self.updates: dict[int, dict] = {}
+        self.latencies: list[float] = []
+        self.conflicts = 0
+        self.requests: Counter[str] = Counter()
+
+    def handle(self, request: HttpRequest) -> HttpResponse:
+        path = request.path[request.path.find("/messages") :]
+        parts = path.strip("/").split("/")
+        body = json.loads(request.body or b"{}")
+        if request.method == "GET" and parts == ["messages"]:
+            self.requests["fetch"] += 1
+            return _json(200, self._list(request.query))
+        if request.method != "PATCH":
+            return _json(404, {"error": "not found"})
+        if parts == ["messages", "bulk_claim"]:
+            self.requests["bulk_claim"] += 1
+            return _json(200, {"results": [self._bulk_claim(message_id) for message_id in body.get("ids", [])]})
+        if parts == ["messages", "bulk_update"]:
+            self.requests["bulk_update"] += 1
+            results = [self._update(update.pop("id"), update) for update in body.get("updates", [])]
+            return _json(200, {"results": results})
+        if len(parts) == 3 and parts[2] == "claim":
+            self.requests["claim"] += 1
+            result = self._bulk_claim(int(parts[1]))
+            status = {"claimed": 200, "conflict": 409}.get(result["status"], 404)
+            return _json(status, {"triage_in_progress": result["triage_in_progress"]})
+        if len(parts) == 2:
+            self.requests["update"] += 1
+            result = self._update(int(parts[1]), body)
+            return _json(200 if result["status"] == "updated" else 404, result)
+        return _json(404, {"error": "not found"})
+
+    def _list(self, query: dict[str, str]) -> list[dict]:
+        classification = query.get("classification")
+        ids = {int(value) for value in query.get("ids", "").split(",") if value}
+        rows = [
+            message_id
+            for message_id in self._newest_first
+            if (not classification or self._classification[message_id] == classification)
+            and (not ids or message_id in ids)
+        ]
+        offset = int(query.get("offset", 0))
+        limit = min(int(query.get("limit", 50)), 100)
+        return [
+            {**self._messages[message_id].model_dump(), "classification": self._classification[message_id]}
+            for message_id in rows[offset : offset + limit]
+        ]
+
+    def _bulk_claim(self, message_id: int) -> dict:
+        if message_id not in self._messages:
+            return {"id": message_id, "status": "not_found", "triage_in_progress": False}
+        if message_id in self._competitor:
+            self.conflicts += 1
+            return {"id": message_id, "status": "conflict", "triage_in_progress": False}
+        if message_id not in self._claimed_at and self._rng.random() < self._conflict_rate:
+            # Another worker got there first; it labels the message once its hold ends.
+            self._competitor.add(message_id)
+            asyncio.get_running_loop().call_later(self._competitor_hold, self._competitor_done, message_id)
+            self.conflicts += 1
+            return {"id": message_id, "status": "conflict", "triage_in_progress": False}
+        self._claimed_at.setdefault(message_id, time.monotonic())
+        return {"id": message_id, "status": "claimed", "triage_in_progress": True}
+
+    def _update(self, message_id: int, payload: dict) -> dict:
+        if message_id not in self._messages:
+            return {"id": message_id, "status": "not_found"}
+        claimed_at = self._claimed_at.pop(message_id, None)
+        if claimed_at is not None and message_id not in self.updates:
+            self.latencies.append(time.monotonic() - claimed_at)
+        self._classification[message_id] = payload["classification"]
+        self.updates.setdefault(message_id, payload)
+        self._check_done()
+        return {"id": message_id, "status": "updated"}
+
+    def _competitor_done(self, message_id: int) -> None:
+        message = self._messages[message_id]
+        self._classification[message_id] = classify_with_rules(f"{message.subject}\n{message.snippet}")
+        self.labelled_elsewhere.add(message_id)
+        self._check_done()
+
+    def _check_done(self) -> None:
+        if len(self.updates.keys() | self.labelled_elsewhere) == len(self._messages):
+            self._on_done()
+
+
+class FakeOllama:
+    """Answers ``/api/generate`` with rule labels after a sampled delay."""
+
+    def __init__(
+        self,
+        *,
+        latency: Callable[[], float],
+        failure_rate: float,
+        garbage_rate: float,
+        rng: random.Random,
+    ) -> None:
+        self._latency = latency
+        self._failure_rate = failure_rate
+        self._garbage_rate = garbage_rate
+        self._rng = rng
+        self.requests: Counter[str] = Counter()
+
+    async def handle(self, request: HttpRequest) -> HttpResponse:
+        if request.path == "/api/version":
+            return _json(200, {"version": "0.0.0-fake"})
+        if request.path != "/api/generate":
+            return _json(404, {"error": "not found"})
+        payload = json.loads(request.body or b"{}")
+        prompt = payload.get("prompt", "")
+        if not prompt:
+            self.requests["warm_up"] += 1
+            return _json(200, {"done": True})
+
+        await asyncio.sleep(self._latency())
+        roll = self._rng.random()
+        if roll < self._failure_rate:
+            self.requests["failed"] += 1
+            return _json(500, {"error": "fake failure"})
+        if roll < self._failure_rate + self._garbage_rate:
+            self.requests["garbage"] += 1
+            answer = "I think this email is probably about a job."
+        else:
+            self.requests["ok"] += 1
+            answer = self._answer(prompt)
+
+        if not payload.get("stream"):
+            return _json(200, {"response": answer, "done": True, "eval_count": len(answer) // 4})
+        chunks = [answer[start : start + 4] for start in range(0, len(answer), 4)]
+        lines = [json.dumps({"response": chunk, "done": False}) for chunk in chunks]
+        lines.append(json.dumps({"response": "", "done": True, "eval_count": len(chunks)}))
+        return HttpResponse(200, "\n".join(lines).encode(), "application/x-ndjson")
+
+    @staticmethod
+    def _answer(prompt: str) -> str:
+        emails = _EMAIL_ID.findall(prompt)
+        if emails:
+            return json.dumps(
+                [
+                    {"id": int(email_id), "label": classify_with_rules(f"{subject}\n{snippet}"), "confidence": 0.9,
+                     "reason": "fake"}
+                    for email_id, subject, snippet in emails
+                ]
+            )
+        match = _SINGLE.search(prompt)
+        text = "\n".join(match.groups()) if match else prompt
+        return json.dumps({"label": classify_with_rules(text), "confidence": 0.9, "reason": "fake"})
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+async def replay(args: argparse.Namespace, overrides: dict[str, str]) -> dict:
+    rng = random.Random(args.seed)
+    messages = corpus(args.emails, args.seed)
+    stop_event = asyncio.Event()
+    api = FakeApi(
+        messages,
+        conflict_rate=args.conflict_rate,
+        competitor_hold=args.competitor_hold,
+        rng=rng,
+        on_done=stop_event.set,
+    )
+    ollama = FakeOllama(
+        latency=latency_sampler(args.latency, rng),
+        failure_rate=args.failure_rate,
+        garbage_rate=args.garbage_rate,
+        rng=rng,
+    )
+    api_server = TinyHttpServer(api.handle)
+    ollama_server = TinyHttpServer(ollama.handle)
+    await api_server.start()
+    await ollama_server.start()
+
+    env = {
+        "JOB_COPILOT_API_URL": f"http://127.0.0.1:{api_server.port}/api/v1",
+        "JOB_COPILOT_API_TOKEN": "bench",
+        "OLLAMA_URL": f"http://127.0.0.1:{ollama_server.port}",
+        # Idle back-off is tuned for a live inbox; keep it short so contested
+        # messages are picked up again once the competing claim expires.
+        "POLL_INTERVAL_SECONDS": "0.05",
+        "MAX_POLL_INTERVAL_SECONDS": "0.5",
+        "MAX_RETRIES": "1",
+        "METRICS_LOG_INTERVAL_SECONDS": "0",
+        **overrides,
+    }
+    os.environ.update(env)
+    get_settings.cache_clear()
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.call_later(args.timeout, stop_event.set)
+    started = time.perf_counter()
+    try:
+        await worker_loop(stop_event)
+    finally:
+        elapsed = time.perf_counter() - started
+        deadline.cancel()
+        await api_server.close()
+        await ollama_server.close()
+
+    fallbacks = sum(payload.get("classified_by") == "rules" for payload in api.updates.values())
+    return {
+        "emails": args.emails,
+        "completed": len(api.updates),
+        "labelled_elsewhere": len(api.labelled_elsewhere),
+        "elapsed_seconds": round(elapsed, 3),
+        "messages_per_second": round(len(api.updates) / elapsed, 3),
+        "latency_seconds": {
+            "p50": round(_percentile(api.latencies, 0.50), 4),
+            "p95": round(_percentile(api.latencies, 0.95), 4),
+            "p99": round(_percentile(api.latencies, 0.99), 4),
+        },
+        "fallback_rate": round(fallbacks / max(1, len(api.updates)), 4),
+        "conflicts": api.conflicts,
+        "api_requests": dict(api.requests),
+        "ollama_requests": dict(ollama.requests),
+        "overrides": overrides,
+    }
+
+
+def regressions(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    problems = []
+    unlabelled = result["emails"] - result["completed"] - result["labelled_elsewhere"]
+    if unlabelled:
+        problems.append(f"{unlabelled} of {result['emails']} emails were still unlabelled at the timeout")
+    if result["messages_per_second"] < baseline["messages_per_second"] * (1 - tolerance):
+        problems.append(
+            f"throughput {result['messages_per_second']} msg/s < baseline {baseline['messages_per_second']}"
+        )
+    if result["latency_seconds"]["p95"] > baseline["latency_seconds"]["p95"] * (1 + tolerance):
+        problems.append(f"p95 {result['latency_seconds']['p95']}s > baseline {baseline['latency_seconds']['p95']}s")
+    if result["fallback_rate"] > baseline["fallback_rate"] + tolerance / 10:
+        problems.append(f"fallback rate {result['fallback_rate']} > baseline {baseline['fallback_rate']}")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--emails", type=int, default=300)
+    parser.add_argument("--latency", default="lognormal:0.05,0.4", help="fake Ollama latency distribution")
+    parser.add_argument("--failure-rate", type=float, default=0.01, help="share of generations answered with HTTP 500")
+    parser.add_argument("--garbage-rate", type=float, default=0.02, help="share of generations without JSON")
+    parser.add_argument("--conflict-rate", type=float, default=0.05, help="share of messages first claimed elsewhere")
+    parser.add_argument("--competitor-hold", type=float, default=0.2, help="seconds a competing claim lasts")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="agent setting override")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save", help="write the result JSON to this file")
+    parser.add_argument("--baseline", help="compare against a result saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    overrides = dict(item.split("=", 1) for item in args.env)
+    result = asyncio.run(replay(args, overrides))
+    print(json.dumps(result, indent=2))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as handle:
+            json.dump(result, handle, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            problems = regressions(result, json.load(handle), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Micro-benchmark: single-pass RuleSet versus the original per-label regex loop.
+
+Usage::
+
+    python benchmarks/bench_rules.py --emails 100000 --extra-phrases 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+
+from inbox_triage_agent.rules import RuleGroup, RuleSet, default_rules
+
+# The original implementation: one case-insensitive search per label.
+_LEGACY_RULES = {
+    "offer": re.compile(r"\boffer\b|compensation|package", re.I),
+    "interview_invite": re.compile(r"\b(interview|invite|phone screen|onsite|loop)\b", re.I),
+    "oa": re.compile(r"(hacker ?rank|codility|codesignal|karat|online assessment|challenge|take-?home)", re.I),
+    "recruiter_reply": re.compile(r"(connect|schedule|chat|next steps|availability)", re.I),
+    "rejection": re.compile(r"(regret to inform|unfortunately|not moving forward)", re.I),
+    "auto_ack": re.compile(r"(thank you for applying|we received your application|application received)", re.I),
+    "not_job_related": re.compile(r"unsubscribe|newsletter|promo", re.I),
+}
+_LEGACY_PRIORITY = tuple(_LEGACY_RULES)
+
+_SIGNALS = (
+    "We regret to inform you",
+    "Thank you for applying to the role",
+    "Please complete the HackerRank challenge",
+    "Can we schedule a phone screen next week",
+    "We are excited to extend an offer",
+    "Unsubscribe from this newsletter",
+    "Following up on our conversation",
+)
+_FILLER = (
+    "the team position role update regarding looking forward please let us know hi best regards "
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor"
+).split()
+
+
+def legacy_classify(text: str, extra: list[re.Pattern[str]]) -> str:
+    label = "other"
+    for candidate in _LEGACY_PRIORITY:
+        if _LEGACY_RULES[candidate].search(text):
+            label = candidate
+            break
+    for pattern in extra:
+        # Company phrases would be one more search each.
+        pattern.search(text)
+    return label
+
+
+def synthetic_emails(count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    emails = []
+    for _ in range(count):
+        words = [rng.choice(_FILLER) for _ in range(rng.randint(30, 90))]
+        if rng.random() < 0.7:
+            words.insert(rng.randrange(len(words)), rng.choice(_SIGNALS))
+        emails.append("Subject line\n" + " ".join(words))
+    return emails
+
+
+def extra_phrases(count: int) -> list[str]:
+    return [f"acme {index} talent acquisition" for index in range(count)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--emails", type=int, default=100_000)
+    parser.add_argument("--extra-phrases", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    emails = synthetic_emails(args.emails, args.seed)
+    phrases = extra_phrases(args.extra_phrases)
+
+    rules = default_rules()
+    if phrases:
+        company = RuleGroup("recruiter_reply", phrases=tuple(phrases))
+        rules = RuleSet([*rules.groups, company], rules.priority)
+    legacy_extra = [re.compile(re.escape(phrase), re.I) for phrase in phrases]
+
+    started = time.perf_counter()
+    legacy = [legacy_classify(email, legacy_extra) for email in emails]
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    compiled = [rules.classify(email) for email in emails]
+    compiled_seconds = time.perf_counter() - started
+
+    disagreements = sum(1 for old, new in zip(legacy, compiled) if old != new)
+    print(f"emails={len(emails)} extra_phrases={len(phrases)}")
+    print(f"legacy   {legacy_seconds:.3f}s  {len(emails) / legacy_seconds:,.0f} emails/s")
+    print(f"compiled {compiled_seconds:.3f}s  {len(emails) / compiled_seconds:,.0f} emails/s")
+    print(f"speedup  {legacy_seconds / compiled_seconds:.2f}x  disagreements={disagreements}")
+
+
+if __name__ == "__main__":
+    main()
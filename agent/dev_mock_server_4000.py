@@ -1,9 +1,16 @@
+from collections import Counter
 from http.server import BaseHTTPRequestHandler, HTTPServer
 import json
 
+# Requests served per route, printed after each one so request counts per
+# message can be compared between per-message and bulk modes.
+REQUEST_COUNTS = Counter()
+
+
 class Handler(BaseHTTPRequestHandler):
     def do_GET(self):
         if self.path.startswith('/api/v1/messages'):
+            self._count('fetch')
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
             self.end_headers()
@@ -20,26 +27,43 @@ class Handler(BaseHTTPRequestHandler):
             self.end_headers()
 
     def do_PATCH(self):
-        # Accept claim and update endpoints
+        # Accept claim and update endpoints, single and bulk
         if self.path.startswith('/api/v1/messages'):
+            data = self._read_json()
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
             self.end_headers()
-            if self.path.endswith('/claim'):
+            if self.path.endswith('/bulk_claim'):
+                self._count('bulk_claim')
+                results = [{'id': i, 'status': 'claimed', 'triage_in_progress': True} for i in data.get('ids', [])]
+                self.wfile.write(json.dumps({'results': results}).encode())
+            elif self.path.endswith('/bulk_update'):
+                self._count('bulk_update')
+                results = [{'id': u.get('id'), 'status': 'updated'} for u in data.get('updates', [])]
+                self.wfile.write(json.dumps({'results': results}).encode())
+            elif self.path.endswith('/claim'):
+                self._count('claim')
                 self.wfile.write(json.dumps({'triage_in_progress': True}).encode())
             else:
                 # echo back payload
-                length = int(self.headers.get('Content-Length', 0))
-                body = self.rfile.read(length) if length else b''
-                try:
-                    data = json.loads(body.decode() or '{}')
-                except Exception:
-                    data = {}
+                self._count('update')
                 self.wfile.write(json.dumps({'received': data}).encode())
         else:
             self.send_response(404)
             self.end_headers()
 
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(body.decode() or '{}')
+        except Exception:
+            return {}
+
+    def _count(self, route):
+        REQUEST_COUNTS[route] += 1
+        print('requests:', dict(REQUEST_COUNTS))
+
 if __name__ == '__main__':
     server = HTTPServer(('127.0.0.1', 4000), Handler)
     print('Mock server running on http://127.0.0.1:4000')
@@ -0,0 +1,137 @@
+"""Adaptive fetch sizing and poll interval for the pipeline's fetch loop."""
+
+from __future__ import annotations
+
+import logging
+import random
+import time
+from collections import deque
+from typing import Callable
+
+from .metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+# Completions within this window make up the throughput estimate.
+THROUGHPUT_WINDOW_SECONDS = 120.0
+# Fewer completions than this are too noisy to cap batches with.
+MIN_THROUGHPUT_SAMPLES = 5
+
+
+class AdaptiveController:
+    """Sizes fetches and poll delays from what the last fetches returned.
+
+    Full batches double the batch size (up to ``max_batch_size``). Fetches
+    that find the inbox empty halve it again and back the poll interval off
+    exponentially with jitter, up to ``max_interval``; any other fetch resets
+    the interval. The runner only sleeps when a fetch comes back idle, so the
+    interval never drops below its starting value. Batches are also capped by measured
+    throughput, so that everything fetched can be processed within
+    ``claim_ttl * safety`` seconds instead of sitting claimed until the
+    server lets another worker take it over.
+    """
+
+    def __init__(
+        self,
+        *,
+        batch_size: int,
+        interval: float,
+        max_batch_size: int,
+        max_interval: float,
+        claim_ttl: float = 600.0,
+        safety: float = 0.5,
+        jitter: float = 0.2,
+        metrics: Metrics | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self._base_batch_size = max(1, batch_size)
+        self._max_batch_size = max(self._base_batch_size, max_batch_size)
+        self._base_interval = interval
+        self._max_interval = max(max_interval, interval)
+        self._claim_budget = claim_ttl * safety
+        self._jitter = jitter
+        self._metrics = metrics or Metrics()
+        self._clock = clock
+        self._rng = rng
+
+        self._batch_size = self._base_batch_size
+        self._interval = interval
+        self._empty_streak = 0
+        self._completions: deque[float] = deque()
+        self._publish()
+
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    def throughput(self) -> float | None:
+        """Messages finished per second over the recent window, once there are enough samples."""
+
+        self._trim()
+        if len(self._completions) < MIN_THROUGHPUT_SAMPLES:
+            return None
+        span = max(self._clock() - self._completions[0], 1e-6)
+        return len(self._completions) / span
+
+    def fetch_limit(self, in_flight: int) -> int:
+        """How many messages to ask for now, given the messages still in flight."""
+
+        limit = self._batch_size
+        throughput = self.throughput()
+        if throughput is not None:
+            budget = int(throughput * self._claim_budget) - in_flight
+            if budget < limit:
+                self._metrics.adaptive_throughput_capped += 1
+                limit = max(1, budget)
+        return limit
+
+    def record_fetch(self, *, fresh: int, limit: int, inbox_empty: bool) -> None:
+        """Adapt to a fetch that found ``fresh`` new messages out of ``limit``.
+
+        ``inbox_empty`` tells a genuinely empty inbox apart from a page of a
+        large backlog that only held messages already in flight or processed;
+        only the former backs off.
+        """
+
+        if fresh >= limit:
+            self._empty_streak = 0
+            self._batch_size = min(self._batch_size * 2, self._max_batch_size)
+            self._interval = self._base_interval
+            self._metrics.adaptive_grow += 1
+        elif inbox_empty:
+            self._empty_streak += 1
+            self._batch_size = max(self._base_batch_size, self._batch_size // 2)
+            self._interval = min(self._base_interval * 2 ** (self._empty_streak - 1), self._max_interval)
+            self._metrics.adaptive_backoff += 1
+        elif fresh:
+            self._empty_streak = 0
+            self._interval = self._base_interval
+        logger.debug(
+            "Fetched %s/%s fresh; next batch_size=%s interval=%.2fs", fresh, limit, self._batch_size, self._interval
+        )
+        self._publish()
+
+    def record_completion(self) -> None:
+        self._completions.append(self._clock())
+        self._trim()
+
+    def next_delay(self) -> float:
+        """The current interval with +/- ``jitter`` applied, so several agents do not poll in lockstep."""
+
+        return self._interval * (1 + self._jitter * (2 * self._rng() - 1))
+
+    def _trim(self) -> None:
+        horizon = self._clock() - THROUGHPUT_WINDOW_SECONDS
+        while self._completions and self._completions[0] < horizon:
+            self._completions.popleft()
+
+    def _publish(self) -> None:
+        metrics = self._metrics
+        metrics.adaptive_batch_size = self._batch_size
+        metrics.adaptive_interval_seconds = self._interval
+        metrics.adaptive_throughput = self.throughput() or 0.0
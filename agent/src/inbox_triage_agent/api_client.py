@@ -3,16 +3,33 @@
 from __future__ import annotations
 
 import logging
+from typing import Sequence
+
 import httpx
-from tenacity import AsyncRetrying, RetryError, retry_if_exception_type, stop_after_attempt, wait_exponential
+from pydantic import ValidationError
+from tenacity import AsyncRetrying, RetryError, retry_if_exception, wait_exponential
 
-from .models import ClaimResponse, Message, UpdatePayload
+from .breaker import CircuitBreaker, RetryBudget, retry_stop
+from .metrics import Metrics
+from .models import BulkResponse, BulkResult, ClaimResponse, Message, UpdatePayload
 
 logger = logging.getLogger(__name__)
 
+# The API rejects bulk requests with more ids than this (MessagesController::BULK_LIMIT).
+BULK_LIMIT = 100
+
 
 class ApiError(RuntimeError):
-    """Raised when the API request ultimately fails."""
+    """Raised when the API request ultimately fails.
+
+    ``status_code`` is the HTTP status of the last response, if there was one.
+    ``retry_after`` is set when the circuit breaker refused the request.
+    """
+
+    def __init__(self, message: str, *, status_code: int | None = None, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
 
 
 class ApiClient:
@@ -22,17 +39,29 @@ class ApiClient:
         token: str,
         timeout: float,
         max_retries: int,
+        metrics: Metrics | None = None,
+        shard: tuple[int, int] | None = None,
+        *,
+        breaker: CircuitBreaker | None = None,
+        retry_budget: RetryBudget | None = None,
     ) -> None:
+        if shard is not None and not 0 <= shard[0] < shard[1]:
+            raise ValueError(f"shard index must be in [0, {shard[1]}), got {shard[0]}")
+        self._metrics = metrics or Metrics()
+        # (index, count): listings only return messages with id % count == index.
+        self._shard = shard if shard is not None and shard[1] > 1 else None
         self._client = httpx.AsyncClient(
             base_url=base_url,
             headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
             timeout=timeout,
         )
+        self._breaker = breaker
+        self._retry_budget = retry_budget
         self._retry = AsyncRetrying(
-            reraise=True,
-            stop=stop_after_attempt(max(1, max_retries)),
+            stop=retry_stop(max_retries, breaker=breaker, budget=retry_budget),
             wait=wait_exponential(multiplier=1, min=1, max=timeout),
-            retry=retry_if_exception_type((httpx.RequestError, httpx.HTTPStatusError)),
+            retry=retry_if_exception(_is_transient),
+            before_sleep=lambda _state: self._metrics.record_retry("api"),
         )
 
     async def close(self) -> None:
@@ -44,29 +73,38 @@ class ApiClient:
     async def __aexit__(self, exc_type, exc, tb) -> None:  # type: ignore[override]
         await self.close()
 
-    async def fetch_messages(self, *, classification: str, limit: int) -> list[Message]:
-        response = await self._request(
-            "GET",
-            "/messages",
-            params={"classification": classification, "limit": str(limit)},
-        )
+    async def fetch_messages(
+        self,
+        *,
+        classification: str,
+        limit: int,
+        offset: int = 0,
+        ids: Sequence[int] | None = None,
+    ) -> list[Message]:
+        params = {"classification": classification, "limit": str(limit)}
+        if offset:
+            params["offset"] = str(offset)
+        if ids:
+            params["ids"] = ",".join(str(message_id) for message_id in ids)
+        if self._shard is not None:
+            params["shard_index"], params["shard_count"] = (str(value) for value in self._shard)
+        response = await self._request("GET", "/messages", params=params)
         data = response.json()
         if not isinstance(data, list):
             raise ApiError("API did not return a list of messages")
         return [Message.model_validate(item) for item in data]
 
     async def claim_message(self, message_id: int) -> bool:
-        try:
-            response = await self._request(
-                "PATCH",
-                f"/messages/{message_id}/claim",
-                raise_for_status=False,
-            )
-        except httpx.HTTPStatusError as exc:
-            if exc.response.status_code == 404:
-                logger.info("Message %s not claimable (404)", message_id)
-                return False
-            raise
+        # Only 5xx raise here; client errors are answered below.
+        response = await self._request(
+            "PATCH",
+            f"/messages/{message_id}/claim",
+            raise_for_status=False,
+        )
+
+        if response.status_code == 404:
+            logger.info("Message %s not claimable (404)", message_id)
+            return False
 
         if response.status_code == 409:
             logger.info("Message %s already claimed", message_id)
@@ -94,6 +132,58 @@ class ApiClient:
             json=payload.model_dump(exclude_none=True),
         )
 
+    async def claim_messages(self, message_ids: Sequence[int]) -> dict[int, bool]:
+        """Claim several messages, ``BULK_LIMIT`` per request, and report which ones were claimed."""
+
+        results: dict[int, BulkResult] = {}
+        for start in range(0, len(message_ids), BULK_LIMIT):
+            chunk = list(message_ids[start : start + BULK_LIMIT])
+            results.update(await self._bulk_request("/messages/bulk_claim", {"ids": chunk}))
+        claimed: dict[int, bool] = {}
+        for message_id in message_ids:
+            result = results.get(message_id)
+            claimed[message_id] = result is not None and result.status == "claimed"
+            if not claimed[message_id]:
+                logger.info(
+                    "Message %s not claimed (%s)", message_id, result.status if result else "missing from response"
+                )
+        return claimed
+
+    async def update_messages(self, updates: Sequence[tuple[int, UpdatePayload]]) -> dict[int, str | None]:
+        """Write several classifications, ``BULK_LIMIT`` per request.
+
+        Returns ``None`` for every id that was updated and an error description
+        for the others.
+        """
+
+        results: dict[int, BulkResult] = {}
+        for start in range(0, len(updates), BULK_LIMIT):
+            body = {
+                "updates": [
+                    {"id": message_id, **payload.model_dump(exclude_none=True)}
+                    for message_id, payload in updates[start : start + BULK_LIMIT]
+                ]
+            }
+            results.update(await self._bulk_request("/messages/bulk_update", body))
+        errors: dict[int, str | None] = {}
+        for message_id, _ in updates:
+            result = results.get(message_id)
+            if result is None:
+                errors[message_id] = "missing from bulk response"
+            elif result.status == "updated":
+                errors[message_id] = None
+            else:
+                errors[message_id] = result.error or result.status
+        return errors
+
+    async def _bulk_request(self, url: str, body: dict) -> dict[int, BulkResult]:
+        response = await self._request("PATCH", url, json=body)
+        try:
+            parsed = BulkResponse.model_validate_json(response.text)
+        except ValidationError as exc:
+            raise ApiError(f"Unexpected bulk response from {url}: {exc}") from exc
+        return {result.id: result for result in parsed.results}
+
     async def _request(
         self,
         method: str,
@@ -103,16 +193,50 @@ class ApiClient:
         json: dict | None = None,
         raise_for_status: bool = True,
     ) -> httpx.Response:
+        breaker = self._breaker
+        if breaker is not None and not breaker.allow():
+            raise ApiError(f"API circuit breaker is {breaker.state}", retry_after=breaker.retry_after)
+        if self._retry_budget is not None:
+            self._retry_budget.record_request()
         try:
             async for attempt in self._retry:
                 with attempt:
-                    response = await self._client.request(method, url, params=params, json=json)
-                    if raise_for_status:
-                        response.raise_for_status()
-                    elif response.status_code >= 500:
-                        response.raise_for_status()
+                    self._metrics.api_requests += 1
+                    try:
+                        response = await self._client.request(method, url, params=params, json=json)
+                        if raise_for_status or response.status_code >= 500:
+                            response.raise_for_status()
+                    except httpx.HTTPError as exc:
+                        self._record_outcome(exc)
+                        raise
+                    self._record_outcome(None)
                     return response
         except RetryError as exc:
-            raise ApiError(str(exc.last_attempt.exception())) from exc
+            error = exc.last_attempt.exception()
+            raise ApiError(str(error), status_code=_status_code(error)) from error
+        except httpx.HTTPError as exc:
+            raise ApiError(str(exc), status_code=_status_code(exc)) from exc
 
         raise ApiError("Request failed without raising an exception")
+
+    def _record_outcome(self, exc: BaseException | None) -> None:
+        if self._breaker is None:
+            return
+        # A client error still means the API is up.
+        if exc is None or not _is_transient(exc):
+            self._breaker.record_success()
+        else:
+            self._breaker.record_failure()
+
+
+def _status_code(exc: BaseException | None) -> int | None:
+    return exc.response.status_code if isinstance(exc, httpx.HTTPStatusError) else None
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """Network errors, 5xx and 429 are worth retrying; other client errors are not."""
+
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(exc, httpx.RequestError)
@@ -0,0 +1,97 @@
+"""Offset-based scanning of the unclassified message backlog."""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class BacklogScanner:
+    """Pages through ``classification=other`` messages and remembers what was done.
+
+    The API orders messages newest first, so re-reading the first page forever
+    would starve older messages and keep re-classifying anything the agent
+    itself labelled ``other``. The scanner walks the backlog page by page,
+    skips messages it has already classified and reports the backlog as
+    exhausted after a full pass turns up nothing new. While exhausted only the
+    first page is polled, which is where newly synced mail appears.
+    """
+
+    def __init__(
+        self,
+        *,
+        memory_size: int = 50_000,
+        revisit_after: float | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._memory_size = max(1, memory_size)
+        self._revisit_after = revisit_after
+        self._clock = clock
+        self._processed: OrderedDict[int, float] = OrderedDict()
+        self._offset = 0
+        self._exhausted = False
+        self._pass_fresh = 0
+        self._pass_shifted = False
+
+    @property
+    def offset(self) -> int:
+        return self._offset
+
+    @property
+    def exhausted(self) -> bool:
+        return self._exhausted
+
+    def classified_at(self, message_id: int) -> float | None:
+        return self._processed.get(message_id)
+
+    def is_processed(self, message_id: int) -> bool:
+        classified_at = self._processed.get(message_id)
+        if classified_at is None:
+            return False
+        if self._revisit_after is not None and self._clock() - classified_at >= self._revisit_after:
+            del self._processed[message_id]
+            return False
+        return True
+
+    def mark_processed(self, message_id: int, classification: str) -> None:
+        self._processed[message_id] = self._clock()
+        self._processed.move_to_end(message_id)
+        while len(self._processed) > self._memory_size:
+            self._processed.popitem(last=False)
+        if classification != "other":
+            # The message leaves the "other" listing, shifting later offsets up.
+            self._pass_shifted = True
+
+    def advance(self, *, returned: int, fresh: int, limit: int) -> bool:
+        """Record the page fetched at :attr:`offset` and move the cursor.
+
+        Returns ``True`` when the caller should wait a poll interval before
+        fetching again.
+        """
+
+        if self._exhausted:
+            if not fresh:
+                return True
+            logger.info("New messages found; resuming backlog scan")
+            self._exhausted = False
+            self._pass_fresh = 0
+            self._pass_shifted = False
+
+        self._pass_fresh += fresh
+        if returned >= limit:
+            self._offset += returned
+            return False
+
+        # Short page: this pass over the backlog is complete.
+        found_work = self._pass_fresh > 0
+        if not found_work and not self._pass_shifted:
+            logger.info("Backlog exhausted; polling for new messages only")
+            self._exhausted = True
+        self._offset = 0
+        self._pass_fresh = 0
+        self._pass_shifted = False
+        return not found_work
@@ -0,0 +1,172 @@
+"""Circuit breakers and retry budgets that keep a failing dependency from stalling the pipeline."""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Callable
+
+from tenacity import stop_after_attempt, stop_any
+from tenacity.stop import stop_base
+
+from .metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one dependency.
+
+    ``failure_threshold`` consecutive failed attempts open the breaker, and
+    calls are refused until ``reset_seconds`` have passed. The breaker is then
+    half-open: one probe call goes through, and its outcome closes the breaker
+    again or re-opens it for another ``reset_seconds``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        metrics: Metrics | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self._failure_threshold = max(1, failure_threshold)
+        self._reset_seconds = reset_seconds
+        self._metrics = metrics or Metrics()
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started: float | None = None
+        self._metrics.breaker_state[name] = CLOSED
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until an open breaker lets a probe through (0 when it is not open)."""
+
+        if self._state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self._reset_seconds - self._clock())
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead; counts the refusal when it may not."""
+
+        now = self._clock()
+        if self._state == OPEN and now - self._opened_at >= self._reset_seconds:
+            self._transition(HALF_OPEN)
+        if self._state == CLOSED:
+            return True
+        # A probe that never reported back (e.g. a cancelled call) must not wedge the breaker.
+        if self._state == HALF_OPEN and (
+            self._probe_started is None or now - self._probe_started >= self._reset_seconds
+        ):
+            self._probe_started = now
+            return True
+        self._metrics.breaker_rejected[self.name] = self._metrics.breaker_rejected.get(self.name, 0) + 1
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        if self._state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self._failure_threshold):
+            self._opened_at = self._clock()
+            self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        logger.log(
+            logging.WARNING if state == OPEN else logging.INFO,
+            "Circuit breaker %s: %s -> %s",
+            self.name,
+            self._state,
+            state,
+        )
+        self._state = state
+        self._probe_started = None
+        metrics = self._metrics
+        metrics.breaker_state[self.name] = state
+        key = (self.name, state)
+        metrics.breaker_transitions[key] = metrics.breaker_transitions.get(key, 0) + 1
+
+
+class RetryBudget:
+    """Token bucket of retries shared by every in-flight request to one dependency.
+
+    Each request deposits ``ratio`` tokens and each retry withdraws one, so
+    retries stay at about ``ratio`` of the traffic however many requests fail
+    at once. ``min_per_second`` tokens also accrue with time so a quiet client
+    can still retry. The bucket holds at most ``capacity`` tokens.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        ratio: float = 0.2,
+        min_per_second: float = 1.0,
+        capacity: float = 10.0,
+        metrics: Metrics | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self._ratio = ratio
+        self._min_per_second = min_per_second
+        self._capacity = capacity
+        self._metrics = metrics or Metrics()
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def record_request(self) -> None:
+        self._refill()
+        self._tokens = min(self._capacity, self._tokens + self._ratio)
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        metrics = self._metrics
+        metrics.retry_budget_exhausted[self.name] = metrics.retry_budget_exhausted.get(self.name, 0) + 1
+        return False
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._min_per_second)
+        self._updated = now
+
+
+def retry_stop(
+    max_attempts: int,
+    *,
+    breaker: CircuitBreaker | None = None,
+    budget: RetryBudget | None = None,
+) -> stop_base:
+    """Tenacity stop condition: the attempt limit, an open breaker, or an empty retry budget."""
+
+    stops: list = [stop_after_attempt(max(1, max_attempts))]
+    if breaker is not None:
+        stops.append(lambda _state: breaker.state == OPEN)
+    if budget is not None:
+        # Checked last so a token is only spent on a retry that will actually happen.
+        stops.append(lambda _state: not budget.try_spend())
+    return stop_any(*stops)
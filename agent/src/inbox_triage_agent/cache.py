@@ -0,0 +1,184 @@
+"""Content-addressed cache of LLM classifications."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+from .metrics import Metrics
+from .models import Message, UpdatePayload
+
+logger = logging.getLogger(__name__)
+
+# Headers that differ for every delivery of otherwise identical mail.
+_VOLATILE_HEADERS = frozenset(
+    {
+        "arc-authentication-results",
+        "arc-message-signature",
+        "arc-seal",
+        "authentication-results",
+        "date",
+        "delivered-to",
+        "dkim-signature",
+        "in-reply-to",
+        "message-id",
+        "received",
+        "received-spf",
+        "references",
+        "return-path",
+        "to",
+        "x-gm-message-state",
+        "x-google-dkim-signature",
+        "x-google-smtp-source",
+        "x-received",
+    }
+)
+
+# The SQLite layer is pruned after this many writes (and when it is opened).
+_PRUNE_EVERY = 100
+
+_WHITESPACE = re.compile(r"\s+")
+_DIGITS = re.compile(r"\d+")
+
+
+def _normalize(text: str | None) -> str:
+    collapsed = _WHITESPACE.sub(" ", (text or "").casefold()).strip()
+    return _DIGITS.sub("#", collapsed)
+
+
+def cache_key(message: Message, model: str, *, context: str | None = None) -> str:
+    """Hash the prompt inputs of ``message`` into a stable cache key.
+
+    ``model`` names whatever produces the answers (one model or a cascade),
+    and ``context`` is the extra prompt context such as a thread's earlier
+    label. Case, whitespace and digit runs (ticket numbers, dates) are
+    normalized so templated ATS mail maps onto a single entry.
+    """
+
+    headers = sorted(
+        (name.lower(), _normalize(str(value)))
+        for name, value in (message.raw_headers or {}).items()
+        if name.lower() not in _VOLATILE_HEADERS
+    )
+    parts: list = [model, _normalize(message.subject), _normalize(message.snippet), headers]
+    if context:
+        parts.append(_normalize(context))
+    material = json.dumps(parts, separators=(",", ":"))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ClassificationCache:
+    """Bounded in-memory LRU with an optional SQLite layer that survives restarts.
+
+    The SQLite layer keeps at most ``max_rows`` rows, newest first, and
+    forgets rows older than ``max_age_seconds``.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 10_000,
+        path: str | Path | None = None,
+        metrics: Metrics | None = None,
+        max_rows: int = 100_000,
+        max_age_seconds: float | None = 30 * 86_400,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._max_entries = max(1, max_entries)
+        self._entries: OrderedDict[str, UpdatePayload] = OrderedDict()
+        self._metrics = metrics or Metrics()
+        self._max_rows = max(1, max_rows)
+        self._max_age_seconds = max_age_seconds
+        self._clock = clock
+        self._writes = 0
+        self._db: sqlite3.Connection | None = None
+        if path is not None:
+            self._db = sqlite3.connect(str(path))
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS classifications ("
+                " key TEXT PRIMARY KEY,"
+                " payload TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS classifications_created_at ON classifications (created_at)")
+            self._db.commit()
+            self.prune()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> UpdatePayload | None:
+        payload = self._entries.get(key)
+        if payload is not None:
+            self._entries.move_to_end(key)
+        elif self._db is not None:
+            row = self._db.execute(
+                "SELECT payload FROM classifications WHERE key = ? AND created_at >= ?", (key, self._oldest())
+            ).fetchone()
+            if row is not None:
+                try:
+                    payload = UpdatePayload.model_validate_json(row[0])
+                except ValueError:
+                    logger.warning("Discarding unreadable cache entry %s", key)
+                else:
+                    self._remember(key, payload)
+
+        if payload is None:
+            self._metrics.cache_misses += 1
+            return None
+        self._metrics.cache_hits += 1
+        return payload.model_copy()
+
+    def put(self, key: str, payload: UpdatePayload) -> None:
+        if payload.classified_by != "llm":
+            # Rule fallbacks are not LLM answers; caching them would pin a guess.
+            return
+        self._remember(key, payload)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO classifications (key, payload, created_at) VALUES (?, ?, ?)",
+                (key, payload.model_dump_json(), self._clock()),
+            )
+            self._db.commit()
+            self._writes += 1
+            if self._writes % _PRUNE_EVERY == 0:
+                self.prune()
+
+    def prune(self) -> int:
+        """Drop expired rows and the oldest rows beyond ``max_rows``; returns how many were removed."""
+
+        if self._db is None:
+            return 0
+        removed = self._db.execute("DELETE FROM classifications WHERE created_at < ?", (self._oldest(),)).rowcount
+        removed += self._db.execute(
+            "DELETE FROM classifications WHERE key IN"
+            " (SELECT key FROM classifications ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self._max_rows,),
+        ).rowcount
+        self._db.commit()
+        self._metrics.cache_evictions += removed
+        return removed
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _oldest(self) -> float:
+        if self._max_age_seconds is None:
+            return float("-inf")
+        return self._clock() - self._max_age_seconds
+
+    def _remember(self, key: str, payload: UpdatePayload) -> None:
+        self._entries[key] = payload
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._metrics.cache_evictions += 1
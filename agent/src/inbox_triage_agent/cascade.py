@@ -0,0 +1,61 @@
+"""Model cascade configuration: cheap models first, larger ones for low-confidence answers."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from .models import LABELS, LLMClassification
+
+
+@dataclass(frozen=True)
+class CascadeTier:
+    """One model in the cascade and the confidence it needs to settle a label."""
+
+    model: str
+    min_confidence: float
+    label_confidence: dict[str, float] = field(default_factory=dict)
+
+    def threshold(self, label: str) -> float:
+        return self.label_confidence.get(label, self.min_confidence)
+
+    def accepts(self, result: LLMClassification) -> bool:
+        return result.confidence is not None and result.confidence >= self.threshold(result.label)
+
+
+def parse_cascade(value: str, *, default_confidence: float) -> list[CascadeTier]:
+    """Parse ``"small@0.85,offer=0.95;large@0.5"`` into tiers, cheapest first.
+
+    Tiers are separated by ``;``. Each starts with a model name, optionally
+    followed by ``@`` and its minimum confidence (``default_confidence`` when
+    omitted), then any ``label=confidence`` overrides separated by commas.
+    """
+
+    tiers: list[CascadeTier] = []
+    for spec in value.split(";"):
+        items = [item.strip() for item in spec.split(",") if item.strip()]
+        if not items:
+            continue
+        model, separator, confidence = items[0].rpartition("@")
+        if not separator:
+            model, confidence = items[0], str(default_confidence)
+        overrides: dict[str, float] = {}
+        for item in items[1:]:
+            label, separator, label_confidence = item.partition("=")
+            label = label.strip()
+            if not separator or label not in LABELS:
+                raise ValueError(f"invalid cascade threshold {item!r} for model {model!r}")
+            overrides[label] = _confidence(label_confidence, item)
+        tiers.append(CascadeTier(model.strip(), _confidence(confidence, items[0]), overrides))
+    if not tiers:
+        raise ValueError("no cascade tiers configured")
+    return tiers
+
+
+def _confidence(value: str, item: str) -> float:
+    try:
+        confidence = float(value)
+    except ValueError:
+        raise ValueError(f"invalid confidence in cascade item {item!r}") from None
+    if not 0.0 <= confidence <= 1.0:
+        raise ValueError(f"cascade confidence must be between 0 and 1 in {item!r}")
+    return confidence
@@ -2,97 +2,623 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Literal, Sequence
 
-from .models import ClassificationError, LLMClassification, Message, UpdatePayload
-from .ollama_client import OllamaClient, OllamaError
-from .rules import classify_with_rules
+from .cache import ClassificationCache, cache_key
+from .deadlines import RollingLatency, hedged
+from .json_extract import extract_first_json_array, extract_first_json_object
+from .knn import EmbeddingIndex
+from .local_model import NaiveBayesModel
+from .metrics import Metrics
+from .models import (
+    ClassificationError,
+    LLMClassification,
+    Message,
+    UpdatePayload,
+    batch_classification_json_schema,
+    classification_json_schema,
+)
+from .cascade import CascadeTier
+from .ollama_client import GenerationStats, OllamaClient, OllamaError
+from .prompt_budget import PromptCompactor, estimate_tokens
+from .rules import RuleSet, default_rules
 from pydantic import ValidationError
 
 logger = logging.getLogger(__name__)
 
+# Generations started in the current task, while :func:`count_generations` is active.
+_generations: ContextVar[list[int] | None] = ContextVar("generations", default=None)
+
+
+@contextmanager
+def count_generations() -> Iterator[list[int]]:
+    """Count the LLM generations started inside the block; read ``counter[0]``."""
+
+    counter = [0]
+    token = _generations.set(counter)
+    try:
+        yield counter
+    finally:
+        _generations.reset(token)
+
+
+# ``time.monotonic()`` by which the current task's classification must finish, see :func:`message_deadline`.
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def message_deadline(deadline: float | None) -> Iterator[None]:
+    """Bound the LLM calls made inside the block by ``deadline`` (a ``time.monotonic()`` value).
+
+    Generations still running at the deadline are cancelled, later ones are not
+    started, and the affected messages fall back to the rules.
+    """
+
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+class DeadlineExceeded(OllamaError):
+    """The message's deadline passed before the LLM answered."""
+
 
 class ClassificationEngine:
-    def __init__(self, llm_client: OllamaClient, *, min_confidence: float) -> None:
+    def __init__(
+        self,
+        llm_client: OllamaClient,
+        *,
+        min_confidence: float,
+        cache: ClassificationCache | None = None,
+        rules_short_circuit: bool = False,
+        rules_min_precision: float = 0.9,
+        metrics: Metrics | None = None,
+        rules: RuleSet | None = None,
+        batch_fallback: Literal["retry", "rules"] = "retry",
+        use_system_prompt: bool = False,
+        stream: bool = False,
+        output_format: Literal["none", "json", "schema"] = "none",
+        knn_index: EmbeddingIndex | None = None,
+        embed_model: str | None = None,
+        knn_k: int = 3,
+        knn_min_similarity: float = 0.92,
+        knn_min_confidence: float = 0.8,
+        local_model: NaiveBayesModel | None = None,
+        local_min_probability: float = 0.9,
+        compactor: PromptCompactor | None = None,
+        cascade: Sequence[CascadeTier] | None = None,
+        hedge_quantile: float | None = None,
+    ) -> None:
         self._llm_client = llm_client
         self._min_confidence = max(0.0, min(1.0, min_confidence))
+        self._cache = cache
+        self._rules_short_circuit = rules_short_circuit
+        self._rules_min_precision = rules_min_precision
+        self._metrics = metrics or Metrics()
+        self._rules = rules or default_rules()
+        self._batch_fallback = batch_fallback
+        self._use_system_prompt = use_system_prompt
+        self._stream = stream
+        self._output_format = output_format
+        self._knn = knn_index
+        self._embed_model = embed_model
+        self._knn_k = max(1, knn_k)
+        self._knn_min_similarity = knn_min_similarity
+        self._knn_min_confidence = knn_min_confidence
+        self._local_model = local_model
+        self._local_min_probability = local_min_probability
+        self._compactor = compactor
+        # Models tried cheapest first; empty means the client's own model with ``min_confidence``.
+        self._cascade = list(cascade or ())
+        # Cached answers belong to whatever produced them: the cascade's models or the client's model.
+        self._cache_model = "+".join(tier.model for tier in self._cascade) or getattr(llm_client, "model", "")
+        # Duplicate a generation still running after this quantile of recent generation latencies.
+        self._hedge_quantile = hedge_quantile
+        self._latency = RollingLatency()
 
-    async def classify_message(self, message: Message) -> UpdatePayload:
-        text = message.combined_text()
-        fallback_label = classify_with_rules(text)
+    async def classify_message(self, message: Message, *, context: str | None = None) -> UpdatePayload:
+        payload, key = self._shortcut(message, context=context)
+        if payload is not None:
+            return payload
+        [(payload, vector)] = await self._nearest([message])
+        if payload is not None:
+            return payload
+        return await self._classify_with_llm(message, key, vector, context=context)
 
-        raw_response: str | None = None
-        reason: str | None = None
+    async def classify_batch(
+        self, messages: Sequence[Message], *, context: str | None = None
+    ) -> list[UpdatePayload]:
+        """Classify several messages with a single LLM prompt.
 
-        try:
-            prompt = build_prompt(message)
-            raw_response = await self._llm_client.generate(
-                prompt,
-                options={"temperature": 0.0, "num_predict": 256},
+        Messages resolved by confident rules, the cache or their nearest
+        neighbours never enter the prompt. Entries missing from or malformed in the model's answer fall
+        back individually, to a single-message retry or to rules depending on
+        ``batch_fallback``. ``context`` (such as the thread's earlier label) is
+        added to the prompt.
+        """
+
+        results: dict[int, UpdatePayload] = {}
+        shortlist: list[tuple[int, Message, str | None]] = []
+        for index, message in enumerate(messages):
+            payload, key = self._shortcut(message, context=context)
+            if payload is not None:
+                results[index] = payload
+            else:
+                shortlist.append((index, message, key))
+
+        pending: list[tuple[int, Message, str | None, list[float] | None]] = []
+        neighbours = await self._nearest([message for _, message, _ in shortlist]) if shortlist else []
+        for (index, message, key), (payload, vector) in zip(shortlist, neighbours):
+            if payload is not None:
+                results[index] = payload
+            else:
+                pending.append((index, message, key, vector))
+
+        if len(pending) == 1:
+            index, message, key, vector = pending[0]
+            results[index] = await self._classify_with_llm(message, key, vector, context=context)
+        elif pending:
+            payloads = await self._classify_llm_batch(
+                [(message, key, vector) for _, message, key, vector in pending], context=context
             )
-            json_payload = extract_first_json_object(raw_response)
-            llm_result = parse_llm(json_payload)
-            reason = llm_result.reason
+            for (index, *_), payload in zip(pending, payloads):
+                results[index] = payload
 
-            if llm_result.confidence is None:
-                logger.info("LLM did not return confidence for message %s; using rules", message.id)
-                raise ClassificationError("missing confidence")
+        return [results[index] for index in range(len(messages))]
 
-            if llm_result.confidence < self._min_confidence:
-                logger.info(
-                    "LLM confidence %.2f below threshold %.2f for message %s; using rules",
-                    llm_result.confidence,
-                    self._min_confidence,
-                    message.id,
+    def _shortcut(
+        self, message: Message, *, context: str | None = None
+    ) -> tuple[UpdatePayload | None, str | None]:
+        """Resolve ``message`` without the LLM when possible; also return its cache key."""
+
+        if self._rules_short_circuit:
+            with self._metrics.time_stage("rules"):
+                confident = self._rules.classify_confident(
+                    message.combined_text(), min_precision=self._rules_min_precision
+                )
+            if confident is not None:
+                label, precision, phrase = confident
+                self._metrics.rules_bypassed += 1
+                logger.debug("Message %s matched confident rule %r; skipping LLM", message.id, phrase)
+                return (
+                    UpdatePayload(
+                        classification=label,
+                        classified_by="rules",
+                        confidence=precision,
+                        reason=f"matched rule phrase '{phrase}'",
+                    ),
+                    None,
+                )
+
+        if self._local_model is not None:
+            with self._metrics.time_stage("local"):
+                label, probability = self._local_model.predict(message)
+            if probability >= self._local_min_probability:
+                self._metrics.local_model_hits += 1
+                return (
+                    UpdatePayload(
+                        classification=label,
+                        classified_by="rules",
+                        confidence=round(probability, 4),
+                        reason=f"local model probability {probability:.2f}",
+                    ),
+                    None,
+                )
+            self._metrics.local_model_escalations += 1
+
+        if self._cache is None:
+            return None, None
+        key = cache_key(message, self._cache_model, context=context)
+        cached = self._cache.get(key)
+        if cached is not None:
+            logger.debug("Classification cache hit for message %s", message.id)
+        return cached, key
+
+    async def _nearest(
+        self, messages: Sequence[Message]
+    ) -> list[tuple[UpdatePayload | None, list[float] | None]]:
+        """Look ``messages`` up in the embedding index; also return their embeddings.
+
+        A message is resolved when its ``knn_k`` nearest labelled emails share
+        one label and are all at least ``knn_min_similarity`` similar to it.
+        """
+
+        if self._knn is None:
+            return [(None, None)] * len(messages)
+        try:
+            with self._metrics.time_stage("embed"):
+                vectors = await self._llm_client.embed(
+                    [message.combined_text() for message in messages], model=self._embed_model
                 )
-                raise ClassificationError("confidence below threshold")
-            return UpdatePayload(
-                classification=llm_result.label,
+        except OllamaError as exc:
+            self._metrics.knn_embed_errors += 1
+            logger.warning("Skipping the nearest-neighbour tier for %s messages: %s", len(messages), exc)
+            return [(None, None)] * len(messages)
+
+        results: list[tuple[UpdatePayload | None, list[float] | None]] = []
+        for message, vector in zip(messages, vectors):
+            vote = self._knn.vote(vector, k=self._knn_k, min_similarity=self._knn_min_similarity)
+            if vote is None:
+                self._metrics.knn_misses += 1
+                results.append((None, vector))
+                continue
+            label, similarity = vote
+            self._metrics.knn_hits += 1
+            logger.debug("Message %s labelled %s by neighbours (similarity %.3f)", message.id, label, similarity)
+            # The neighbours' labels came from the LLM, which is also what the API should record.
+            payload = UpdatePayload(
+                classification=label,
                 classified_by="llm",
-                confidence=llm_result.confidence,
-                reason=reason,
-                raw_response=json_payload,
+                confidence=round(similarity, 4),
+                reason=f"{self._knn_k} nearest labelled emails agree (similarity >= {similarity:.2f})",
+            )
+            results.append((payload, vector))
+        return results
+
+    async def _classify_with_llm(
+        self,
+        message: Message,
+        key: str | None,
+        vector: list[float] | None = None,
+        *,
+        context: str | None = None,
+        tier: int = 0,
+    ) -> UpdatePayload:
+        """Prompt the LLM, escalating through the cascade from ``tier`` on; rules are the last resort."""
+
+        with self._metrics.time_stage("prompt"):
+            prompt = build_prompt(
+                self._compact(message), include_instructions=not self._use_system_prompt, context=context
+            )
+            self._record_prompt([message], prompt)
+
+        cascade = self._cascade
+        for position in range(tier, len(cascade) - 1):
+            answer = await self._try_tier(message, prompt, cascade[position])
+            if answer is not None:
+                llm_result, json_payload = answer
+                return self._accept(message, llm_result, json_payload, key, vector, tier=cascade[position])
+
+        last = cascade[-1] if cascade else None
+        started = time.perf_counter()
+        payload = await self._final_attempt(message, prompt, key, vector, last)
+        if last is not None:
+            resolved = payload.classified_by == "llm"
+            self._metrics.record_cascade(last.model, time.perf_counter() - started, resolved=resolved)
+            if not resolved:
+                self._metrics.record_cascade("rules", None, resolved=True)
+        return payload
+
+    async def _try_tier(
+        self, message: Message, prompt: str, tier: CascadeTier
+    ) -> tuple[LLMClassification, str] | None:
+        """Ask a cascade model that is not the last one; ``None`` means escalate."""
+
+        started = time.perf_counter()
+        llm_result: LLMClassification | None = None
+        json_payload = ""
+        try:
+            raw_response, _ = await self._generate(
+                prompt,
+                system=SYSTEM_PROMPT,
+                options={"temperature": 0.0, "num_predict": self._num_predict()},
+                expect="object",
+                model=tier.model,
             )
+            with self._metrics.time_stage("parse"):
+                json_payload = extract_first_json_object(raw_response)
+                llm_result = parse_llm(json_payload)
         except (OllamaError, ClassificationError, json.JSONDecodeError) as exc:
+            logger.info("Escalating message %s past %s: %s", message.id, tier.model, exc)
+
+        resolved = llm_result is not None and tier.accepts(llm_result)
+        self._metrics.record_cascade(tier.model, time.perf_counter() - started, resolved=resolved)
+        if llm_result is None or not resolved:
+            if llm_result is not None:
+                logger.debug(
+                    "Escalating message %s past %s: %s confidence %s is below %.2f",
+                    message.id,
+                    tier.model,
+                    llm_result.label,
+                    llm_result.confidence,
+                    tier.threshold(llm_result.label),
+                )
+            return None
+        return llm_result, json_payload
+
+    async def _final_attempt(
+        self,
+        message: Message,
+        prompt: str,
+        key: str | None,
+        vector: list[float] | None,
+        tier: CascadeTier | None,
+    ) -> UpdatePayload:
+        started = time.perf_counter()
+        try:
+            raw_response, stats = await self._generate(
+                prompt,
+                system=SYSTEM_PROMPT,
+                options={"temperature": 0.0, "num_predict": self._num_predict()},
+                expect="object",
+                model=tier.model if tier is not None else None,
+            )
+        except DeadlineExceeded as exc:
+            self._metrics.fallback_deadline += 1
+            logger.warning("Falling back to rules for message %s: %s", message.id, exc)
+            return self._rules_payload(message)
+        except OllamaError as exc:
+            self._metrics.fallback_llm_errors += 1
+            logger.warning("Falling back to rules for message %s: %s", message.id, exc)
+            return self._rules_payload(message)
+
+        if stats is not None:
+            logger.info(
+                "Message %s answer complete after %.2fs and %s tokens (stopped early=%s, up to %s tokens saved)",
+                message.id,
+                stats.time_to_json if stats.time_to_json is not None else stats.elapsed,
+                stats.tokens,
+                stats.stopped_early,
+                stats.tokens_saved,
+            )
+
+        try:
+            with self._metrics.time_stage("parse"):
+                json_payload = extract_first_json_object(raw_response)
+                llm_result = parse_llm(json_payload)
+        except (ClassificationError, json.JSONDecodeError) as exc:
+            # The whole inference is wasted; track it so output formats can be compared.
+            self._metrics.record_parse_failure(time.perf_counter() - started)
+            logger.warning("Falling back to rules for message %s: %s", message.id, exc)
+            return self._rules_payload(message, raw_response=raw_response)
+
+        try:
+            return self._accept(message, llm_result, json_payload, key, vector, tier=tier)
+        except ClassificationError as exc:
+            self._metrics.fallback_low_confidence += 1
             logger.warning("Falling back to rules for message %s: %s", message.id, exc)
-            return UpdatePayload(
-                classification=fallback_label,
-                classified_by="rules",
-                confidence=None,
-                reason=reason,
-                raw_response=raw_response,
+            return self._rules_payload(message, reason=llm_result.reason, raw_response=raw_response)
+
+    async def _classify_llm_batch(
+        self, batch: list[tuple[Message, str | None, list[float] | None]], *, context: str | None = None
+    ) -> list[UpdatePayload]:
+        messages = [message for message, _, _ in batch]
+        # Batches go to the first cascade model; its low-confidence answers escalate one by one.
+        first = self._cascade[0] if self._cascade else None
+        escalate = len(self._cascade) > 1
+        entries: dict[str, object] = {}
+        llm_failed = False
+        started = time.perf_counter()
+        with self._metrics.time_stage("prompt"):
+            prompt = build_batch_prompt(
+                [self._compact(message) for message in messages],
+                include_instructions=not self._use_system_prompt,
+                context=context,
             )
+            self._record_prompt(messages, prompt)
+        try:
+            raw_response, _ = await self._generate(
+                prompt,
+                system=BATCH_SYSTEM_PROMPT,
+                options={"temperature": 0.0, "num_predict": self._num_predict() * len(messages)},
+                expect="array",
+                model=first.model if first is not None else None,
+            )
+            with self._metrics.time_stage("parse"):
+                items = json.loads(extract_first_json_array(raw_response))
+            for item in items:
+                if isinstance(item, dict) and "id" in item:
+                    entries.setdefault(str(item["id"]), item)
+        except OllamaError as exc:
+            if isinstance(exc, DeadlineExceeded):
+                self._metrics.fallback_deadline += len(messages)
+            else:
+                self._metrics.fallback_llm_errors += len(messages)
+            logger.warning("Batch of %s messages failed; using rules: %s", len(messages), exc)
+            llm_failed = True
+        except (ClassificationError, json.JSONDecodeError) as exc:
+            logger.warning("Unparseable batch response for %s messages: %s", len(messages), exc)
+        elapsed_per_message = (time.perf_counter() - started) / len(messages)
+
+        payloads: list[UpdatePayload] = []
+        for message, key, vector in batch:
+            item = entries.get(str(message.id))
+            try:
+                if item is None:
+                    if not llm_failed:
+                        self._metrics.record_parse_failure(elapsed_per_message)
+                    raise ClassificationError("missing from batch response")
+                json_payload = json.dumps(item)
+                try:
+                    llm_result = parse_llm(json_payload)
+                except ClassificationError:
+                    self._metrics.record_parse_failure(elapsed_per_message)
+                    raise
+                if first is not None and escalate and not first.accepts(llm_result):
+                    self._metrics.record_cascade(first.model, elapsed_per_message, resolved=False)
+                    payloads.append(await self._classify_with_llm(message, key, vector, context=context, tier=1))
+                    continue
+                try:
+                    payloads.append(self._accept(message, llm_result, json_payload, key, vector, tier=first))
+                except ClassificationError:
+                    self._metrics.fallback_low_confidence += 1
+                    raise
+                if first is not None:
+                    self._metrics.record_cascade(first.model, elapsed_per_message, resolved=True)
+            except ClassificationError as exc:
+                if llm_failed or self._batch_fallback == "rules":
+                    logger.info("Falling back to rules for message %s: %s", message.id, exc)
+                    payloads.append(self._rules_payload(message))
+                    if first is not None:
+                        self._metrics.record_cascade(first.model, elapsed_per_message, resolved=False)
+                        self._metrics.record_cascade("rules", None, resolved=True)
+                else:
+                    logger.info("Retrying message %s on its own: %s", message.id, exc)
+                    payloads.append(await self._classify_with_llm(message, key, vector, context=context))
+        return payloads
+
+    async def _generate(
+        self,
+        prompt: str,
+        *,
+        system: str,
+        options: dict,
+        expect: Literal["object", "array"],
+        model: str | None = None,
+    ) -> tuple[str, GenerationStats | None]:
+        # Only pass the optional keywords that are enabled, so simpler clients still work.
+        kwargs: dict = {}
+        if model is not None:
+            kwargs["model"] = model
+        if self._use_system_prompt:
+            kwargs["system"] = system
+        if self._output_format == "json" and expect == "object":
+            # Ollama's JSON mode always produces an object, so batches (arrays) skip it.
+            kwargs["format"] = "json"
+        elif self._output_format == "schema":
+            kwargs["format"] = classification_json_schema() if expect == "object" else batch_classification_json_schema()
+
+        async def request() -> tuple[str, GenerationStats | None]:
+            # Hedged duplicates each need their own stats.
+            stats: GenerationStats | None = None
+            if self._stream:
+                stats = GenerationStats()
+                return await self._llm_client.generate(
+                    prompt, options=options, stream=True, stop_after_json=expect, stats=stats, **kwargs
+                ), stats
+            return await self._llm_client.generate(prompt, options=options, **kwargs), stats
 
+        deadline = _deadline.get()
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded("message deadline passed before the LLM call")
+        # Single prompts and batches take very different times, so they are tracked apart.
+        latency_key = f"{model or getattr(self._llm_client, 'model', '')}:{expect}"
+        delay = None
+        if self._hedge_quantile is not None:
+            delay = self._latency.quantile(latency_key, self._hedge_quantile)
+        counter = _generations.get()
+        if counter is not None:
+            counter[0] += 1
+        started = time.perf_counter()
+        timeout = asyncio.timeout(remaining)
+        try:
+            with self._metrics.time_stage("generate"):
+                async with timeout:
+                    if delay is None:
+                        text, stats = await request()
+                    else:
+                        text, stats = await hedged(request, delay=delay, metrics=self._metrics)
+        except TimeoutError as exc:
+            if not timeout.expired():
+                raise
+            raise DeadlineExceeded(f"message deadline passed after {time.perf_counter() - started:.2f}s") from exc
+        self._latency.observe(latency_key, time.perf_counter() - started)
+        return text, stats
+
+    def _compact(self, message: Message) -> Message:
+        return message if self._compactor is None else self._compactor.compact(message)
+
+    def _record_prompt(self, messages: Sequence[Message], prompt: str) -> None:
+        # A batch prompt's tokens are shared evenly by its emails.
+        tokens = estimate_tokens(prompt) / len(messages)
+        for message in messages:
+            self._metrics.prompt_tokens.observe(tokens)
+            logger.debug("Prompt for message %s: about %.0f tokens", message.id, tokens)
 
-def build_prompt(message: Message) -> str:
+    def _num_predict(self) -> int:
+        # A schema-constrained answer cannot run past its closing brace.
+        return SCHEMA_NUM_PREDICT if self._output_format == "schema" else DEFAULT_NUM_PREDICT
+
+    def _accept(
+        self,
+        message: Message,
+        llm_result: LLMClassification,
+        json_payload: str,
+        key: str | None,
+        vector: list[float] | None = None,
+        *,
+        tier: CascadeTier | None = None,
+    ) -> UpdatePayload:
+        if llm_result.confidence is None:
+            logger.info("LLM did not return confidence for message %s; using rules", message.id)
+            raise ClassificationError("missing confidence")
+
+        min_confidence = tier.threshold(llm_result.label) if tier is not None else self._min_confidence
+        if llm_result.confidence < min_confidence:
+            logger.info(
+                "LLM confidence %.2f below threshold %.2f for message %s; using rules",
+                llm_result.confidence,
+                min_confidence,
+                message.id,
+            )
+            raise ClassificationError("confidence below threshold")
+
+        payload = UpdatePayload(
+            classification=llm_result.label,
+            classified_by="llm",
+            confidence=llm_result.confidence,
+            reason=llm_result.reason,
+            raw_response=json_payload,
+        )
+        if key is not None and self._cache is not None:
+            self._cache.put(key, payload)
+        if vector is not None and self._knn is not None and llm_result.confidence >= self._knn_min_confidence:
+            self._knn.add(vector, llm_result.label)
+        return payload
+
+    def _rules_payload(
+        self,
+        message: Message,
+        *,
+        reason: str | None = None,
+        raw_response: str | None = None,
+    ) -> UpdatePayload:
+        with self._metrics.time_stage("rules"):
+            label = self._rules.classify(message.combined_text())
+        return UpdatePayload(
+            classification=label,
+            classified_by="rules",
+            confidence=None,
+            reason=reason,
+            raw_response=raw_response,
+        )
+
+
+DEFAULT_NUM_PREDICT = 256
+# Upper bound for a schema-constrained answer: label and confidence take about
+# 15 tokens with punctuation and the reason is capped at REASON_MAX_LENGTH
+# characters (roughly 40 tokens).
+SCHEMA_NUM_PREDICT = 64
+
+_CATEGORIES = ", ".join(
+    [
+        "offer",
+        "interview_invite",
+        "oa",
+        "recruiter_reply",
+        "rejection",
+        "auto_ack",
+        "not_job_related",
+        "other",
+    ]
+)
+
+
+def _email_block(message: Message) -> str:
     headers = message.raw_headers or {}
     headers_block = "\n".join(f"{k}: {v}" for k, v in headers.items())
     snippet = message.snippet or "(no snippet)"
     subject = message.subject or "(no subject)"
-
-    categories = ", ".join(
-        [
-            "offer",
-            "interview_invite",
-            "oa",
-            "recruiter_reply",
-            "rejection",
-            "auto_ack",
-            "not_job_related",
-            "other",
-        ]
-    )
-
     return (
-        "You are a JSON-only classifier for job search emails.\n"
-        "Return a single-line JSON object with keys 'label', 'confidence', and 'reason'.\n"
-        "Label MUST be one of ["
-        + categories
-        + "]. Confidence must be between 0 and 1.\n"
-        "Do not include any extra text or Markdown.\n"
-        "Example: {\"label\":\"interview_invite\",\"confidence\":0.82,\"reason\":\"mentions scheduling\"}.\n"
-        "Email to classify:\n"
         f"Subject: {subject}\n"
         f"Snippet: {snippet}\n"
         "Headers:\n"
@@ -100,27 +626,49 @@ def build_prompt(message: Message) -> str:
     )
 
 
+# Fixed instructions come first so Ollama can reuse the evaluated prefix
+# between requests; they can also be sent as the separate ``system`` field.
+SYSTEM_PROMPT = (
+    "You are a JSON-only classifier for job search emails.\n"
+    "Return a single-line JSON object with keys 'label', 'confidence', and 'reason'.\n"
+    "Label MUST be one of ["
+    + _CATEGORIES
+    + "]. Confidence must be between 0 and 1.\n"
+    "Do not include any extra text or Markdown.\n"
+    "Example: {\"label\":\"interview_invite\",\"confidence\":0.82,\"reason\":\"mentions scheduling\"}.\n"
+)
+
+BATCH_SYSTEM_PROMPT = (
+    "You are a JSON-only classifier for job search emails.\n"
+    "Return a single JSON array with exactly one object per email, each with keys "
+    "'id', 'label', 'confidence', and 'reason'. Copy 'id' from the email header.\n"
+    "Label MUST be one of ["
+    + _CATEGORIES
+    + "]. Confidence must be between 0 and 1.\n"
+    "Do not include any extra text or Markdown.\n"
+    "Example: [{\"id\":17,\"label\":\"interview_invite\",\"confidence\":0.82,\"reason\":\"mentions scheduling\"}].\n"
+)
+
+
+def _context_line(context: str | None) -> str:
+    return f"Thread context: {context}\n" if context else ""
+
+
+def build_prompt(message: Message, *, include_instructions: bool = True, context: str | None = None) -> str:
+    instructions = SYSTEM_PROMPT if include_instructions else ""
+    return instructions + _context_line(context) + "Email to classify:\n" + _email_block(message)
+
+
+def build_batch_prompt(
+    messages: Sequence[Message], *, include_instructions: bool = True, context: str | None = None
+) -> str:
+    instructions = BATCH_SYSTEM_PROMPT if include_instructions else ""
+    emails = "".join(f"Email id {message.id}:\n{_email_block(message)}\n" for message in messages)
+    return instructions + _context_line(context) + f"Emails to classify ({len(messages)}):\n" + emails
+
+
 def parse_llm(raw_json: str) -> LLMClassification:
     try:
         return LLMClassification.model_validate_json(raw_json)
     except ValidationError as exc:
         raise ClassificationError(str(exc)) from exc
-
-
-def extract_first_json_object(text: str) -> str:
-    """Extract the first top-level JSON object from ``text``."""
-
-    start_index = text.find("{")
-    if start_index == -1:
-        raise ClassificationError("No JSON object found in response")
-
-    depth = 0
-    for index in range(start_index, len(text)):
-        char = text[index]
-        if char == "{":
-            depth += 1
-        elif char == "}":
-            depth -= 1
-            if depth == 0:
-                return text[start_index : index + 1]
-    raise ClassificationError("Unterminated JSON object in response")
@@ -1,9 +1,117 @@
-"""Console script entry point."""
+"""Console script entry points."""
 
 from __future__ import annotations
 
+import argparse
+import asyncio
+import logging
+import sys
+from typing import Sequence
+
+from .api_client import ApiClient
+from .local_model import (
+    LocalModelError,
+    NaiveBayesModel,
+    evaluate,
+    fetch_examples,
+    read_examples,
+    split,
+    write_examples,
+)
+from .models import Message
 from .runner import run
+from .settings import get_settings
+from .supervisor import run_supervisor
+
+# Thresholds shown in the coverage table printed by ``train`` and ``evaluate``.
+_SWEEP = (0.5, 0.7, 0.8, 0.9, 0.95, 0.99)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="inbox-triage-agent", description="Classify Job Copilot emails.")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("run", help="run the worker (default)")
+
+    train = commands.add_parser("train", help="train the local model on LLM-labelled messages")
+    train.add_argument("--output", required=True, help="model file to write")
+    _add_data_arguments(train)
+    train.add_argument("--holdout", type=float, default=0.2, help="share kept for calibration and evaluation")
+    train.add_argument("--alpha", type=float, default=0.5, help="additive smoothing")
+
+    evaluate_parser = commands.add_parser("evaluate", help="score a local model against LLM labels")
+    evaluate_parser.add_argument("--model", required=True, help="model file written by train")
+    _add_data_arguments(evaluate_parser)
+
+    args = parser.parse_args(argv)
+    if args.command in (None, "run"):
+        run()
+        return
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        examples = _load_examples(args)
+        if args.command == "train":
+            _train(args, examples)
+        else:
+            _print_evaluation(NaiveBayesModel.load(args.model), examples, args.threshold)
+    except (LocalModelError, OSError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+
+def supervise() -> None:
+    run_supervisor()
+
+
+def _add_data_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--data", help="JSON lines with subject, snippet and classification (default: the API)")
+    parser.add_argument("--export", help="also write the examples fetched from the API to this JSON lines file")
+    parser.add_argument("--threshold", type=float, default=0.9, help="minimum probability to skip the LLM")
+
+
+def _load_examples(args: argparse.Namespace) -> list[tuple[Message, str]]:
+    if args.data:
+        examples = read_examples(args.data)
+    else:
+        examples = asyncio.run(_fetch_from_api())
+        if args.export:
+            write_examples(args.export, examples)
+    if not examples:
+        raise ValueError("no LLM-labelled messages found")
+    return examples
+
+
+async def _fetch_from_api() -> list[tuple[Message, str]]:
+    settings = get_settings()
+    async with ApiClient(
+        base_url=str(settings.job_copilot_api_url),
+        token=settings.job_copilot_api_token,
+        timeout=settings.http_timeout_seconds,
+        max_retries=settings.max_retries,
+    ) as api_client:
+        return await fetch_examples(api_client)
+
+
+def _train(args: argparse.Namespace, examples: list[tuple[Message, str]]) -> None:
+    training, held_out = split(examples, holdout=args.holdout)
+    # Calibrate on one half of the held-out set and report on the other.
+    calibration, test = held_out[: len(held_out) // 2], held_out[len(held_out) // 2 :]
+    model = NaiveBayesModel(alpha=args.alpha).fit(training)
+    temperature = model.calibrate(calibration)
+    model.save(args.output)
+    print(
+        f"trained on {len(training)} messages, calibrated on {len(calibration)} "
+        f"(temperature {temperature:.2f}), wrote {args.output}"
+    )
+    if test:
+        _print_evaluation(model, test, args.threshold)
 
 
-def main() -> None:
-    run()
+def _print_evaluation(model: NaiveBayesModel, examples: list[tuple[Message, str]], threshold: float) -> None:
+    print(evaluate(model, examples, threshold=threshold).report())
+    for candidate in _SWEEP:
+        result = evaluate(model, examples, threshold=candidate)
+        print(
+            f"  threshold {candidate:.2f}: llm_calls_avoided={result.llm_calls_avoided:6.1%} "
+            f"accuracy_when_confident={result.covered_accuracy:.3f}"
+        )
@@ -0,0 +1,110 @@
+"""Latency-driven timeouts and hedged requests for the LLM calls."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+from .metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class RollingLatency:
+    """Exact quantiles over the last ``window`` latencies of each key (e.g. a model name)."""
+
+    def __init__(self, *, window: int = 200, min_samples: int = 20) -> None:
+        self._window = max(1, window)
+        self._min_samples = max(1, min_samples)
+        self._samples: dict[str, deque[float]] = {}
+
+    def observe(self, key: str, seconds: float) -> None:
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self._window)
+        samples.append(seconds)
+
+    def quantile(self, key: str, q: float) -> float | None:
+        """The ``q`` quantile for ``key``, or ``None`` until ``min_samples`` latencies were seen."""
+
+        samples = self._samples.get(key)
+        if samples is None or len(samples) < self._min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class AdaptiveTimeout:
+    """Request timeouts that follow recent latencies: the ``quantile`` times ``factor``.
+
+    The result never drops below ``minimum`` and never exceeds the static
+    ``maximum``, which also applies until enough requests have completed.
+    """
+
+    def __init__(
+        self,
+        maximum: float,
+        *,
+        factor: float = 3.0,
+        quantile: float = 0.99,
+        minimum: float = 1.0,
+        window: int = 200,
+        min_samples: int = 20,
+    ) -> None:
+        self._maximum = maximum
+        self._factor = factor
+        self._quantile = quantile
+        self._minimum = min(minimum, maximum)
+        self._latency = RollingLatency(window=window, min_samples=min_samples)
+
+    def observe(self, key: str, seconds: float) -> None:
+        self._latency.observe(key, seconds)
+
+    def timeout(self, key: str) -> float:
+        observed = self._latency.quantile(key, self._quantile)
+        if observed is None:
+            return self._maximum
+        return min(self._maximum, max(self._minimum, observed * self._factor))
+
+
+async def hedged(call: Callable[[], Awaitable[T]], *, delay: float, metrics: Metrics) -> T:
+    """Await ``call()``; if it is still running after ``delay`` seconds, race a second ``call()``.
+
+    The first successful result wins and the other request is cancelled; its
+    elapsed time is counted as wasted work. An error only surfaces once both
+    requests have failed. Cancelling the caller cancels both requests.
+    """
+
+    loop = asyncio.get_running_loop()
+    first = asyncio.ensure_future(call())
+    started = {first: loop.time()}
+    pending = {first}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return first.result()
+        metrics.hedge_requests += 1
+        second = asyncio.ensure_future(call())
+        started[second] = loop.time()
+        pending.add(second)
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is second:
+                        metrics.hedge_wins += 1
+                    for loser in pending:
+                        metrics.hedge_wasted_seconds += loop.time() - started[loser]
+                    return task.result()
+                error = task.exception()
+                logger.debug("Hedged request failed: %s", error)
+        assert error is not None
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,131 @@
+"""Minimal asyncio HTTP/1.1 server for the agent's local endpoints."""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Union
+from urllib.parse import parse_qsl
+
+logger = logging.getLogger(__name__)
+
+_REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+@dataclass
+class HttpRequest:
+    method: str
+    path: str
+    headers: dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+    query: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class HttpResponse:
+    status: int
+    body: bytes = b""
+    content_type: str = "application/json"
+
+
+Handler = Callable[[HttpRequest], Union[HttpResponse, Awaitable[HttpResponse]]]
+
+
+class TinyHttpServer:
+    """One request per connection, no keep-alive, no chunked bodies.
+
+    Enough for a health probe, a scrape or a webhook on a private interface;
+    not meant to face the internet.
+    """
+
+    def __init__(
+        self,
+        handler: Handler,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        max_body_bytes: int = 64 * 1024,
+        read_timeout: float = 5.0,
+    ) -> None:
+        self._handler = handler
+        self._host = host
+        self._port = port
+        self._max_body_bytes = max_body_bytes
+        self._read_timeout = read_timeout
+        self._server: asyncio.Server | None = None
+
+    @property
+    def port(self) -> int:
+        """The bound port, which differs from the configured one when that was ``0``."""
+
+        if self._server is None or not self._server.sockets:
+            return self._port
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self._host, self._port)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await asyncio.wait_for(self._read_request(reader), timeout=self._read_timeout)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            response = HttpResponse(400, b'{"error": "malformed request"}')
+        else:
+            if isinstance(request, HttpResponse):
+                response = request
+            else:
+                try:
+                    response = self._handler(request)
+                    if inspect.isawaitable(response):
+                        response = await response
+                except Exception:  # noqa: BLE001
+                    logger.exception("Error handling %s %s", request.method, request.path)
+                    response = HttpResponse(500, b'{"error": "internal error"}')
+
+        head = (
+            f"HTTP/1.1 {response.status} {_REASONS.get(response.status, '')}\r\n"
+            f"Content-Type: {response.content_type}\r\n"
+            f"Content-Length: {len(response.body)}\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        try:
+            writer.write(head.encode("latin-1") + response.body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> HttpRequest | HttpResponse:
+        method, target, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+        headers: dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length") or 0)
+        if length > self._max_body_bytes:
+            return HttpResponse(413, b'{"error": "body too large"}')
+        body = await reader.readexactly(length) if length else b""
+        path, _, query = target.partition("?")
+        return HttpRequest(method, path, headers, body, dict(parse_qsl(query)))
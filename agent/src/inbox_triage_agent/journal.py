@@ -0,0 +1,98 @@
+"""Durable journal of classifications that still have to be written to the API."""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Collection, Sequence
+
+from .metrics import Metrics
+from .models import UpdatePayload
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateJournal:
+    """SQLite journal (WAL mode) of update payloads waiting to be posted.
+
+    Every payload is written here before the API sees it and removed once the
+    API has answered for it, so an outage or a crash never costs an inference:
+    whatever is left is posted by the pipeline's flusher, also after a restart.
+    A newer payload for the same message replaces the older one.
+    """
+
+    def __init__(self, path: str | Path, *, metrics: Metrics | None = None) -> None:
+        self._metrics = metrics or Metrics()
+        self._db = sqlite3.connect(str(path))
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL only risks the last commits on power loss, never on a process crash.
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pending_updates ("
+            " message_id INTEGER PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.commit()
+        self._ids = {row[0] for row in self._db.execute("SELECT message_id FROM pending_updates")}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, message_id: object) -> bool:
+        return message_id in self._ids
+
+    @property
+    def message_ids(self) -> set[int]:
+        return set(self._ids)
+
+    def append(self, updates: Sequence[tuple[int, UpdatePayload]]) -> None:
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO pending_updates (message_id, payload, created_at) VALUES (?, ?, ?)",
+            [(message_id, payload.model_dump_json(), now) for message_id, payload in updates],
+        )
+        self._db.commit()
+        self._ids.update(message_id for message_id, _ in updates)
+        self._metrics.journal_appended += len(updates)
+
+    def pending(self, limit: int, *, exclude: Collection[int] = ()) -> list[tuple[int, UpdatePayload]]:
+        """Return up to ``limit`` of the oldest entries whose ids are not in ``exclude``."""
+
+        entries: list[tuple[int, UpdatePayload]] = []
+        unreadable: list[int] = []
+        rows = self._db.execute("SELECT message_id, payload FROM pending_updates ORDER BY created_at, message_id")
+        for message_id, raw in rows:
+            if message_id in exclude:
+                continue
+            try:
+                entries.append((message_id, UpdatePayload.model_validate_json(raw)))
+            except ValueError:
+                logger.warning("Discarding unreadable journal entry for message %s", message_id)
+                unreadable.append(message_id)
+                continue
+            if len(entries) >= limit:
+                break
+        if unreadable:
+            self.remove(unreadable)
+        return entries
+
+    def record_attempt(self, message_ids: Sequence[int]) -> None:
+        self._db.executemany(
+            "UPDATE pending_updates SET attempts = attempts + 1 WHERE message_id = ?",
+            [(message_id,) for message_id in message_ids],
+        )
+        self._db.commit()
+
+    def remove(self, message_ids: Sequence[int]) -> None:
+        self._db.executemany(
+            "DELETE FROM pending_updates WHERE message_id = ?", [(message_id,) for message_id in message_ids]
+        )
+        self._db.commit()
+        self._ids.difference_update(message_ids)
+
+    def close(self) -> None:
+        self._db.close()
@@ -0,0 +1,88 @@
+"""Locate the first top-level JSON value in free-form model output."""
+
+from __future__ import annotations
+
+from .models import ClassificationError
+
+
+class IncrementalJsonExtractor:
+    """Find the first balanced JSON object or array in text fed chunk by chunk.
+
+    Brackets inside JSON strings are ignored, so the extractor can tell when a
+    streamed answer is complete without waiting for the model to stop.
+    """
+
+    def __init__(self, opener: str = "{") -> None:
+        if opener not in "{[" or len(opener) != 1:
+            raise ValueError("opener must be '{' or '['")
+        self._opener = opener
+        self._text = ""
+        self._position = 0
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._result: str | None = None
+
+    @property
+    def started(self) -> bool:
+        return self._start != -1
+
+    @property
+    def result(self) -> str | None:
+        return self._result
+
+    def feed(self, chunk: str) -> str | None:
+        """Consume ``chunk`` and return the JSON text once it is balanced."""
+
+        if self._result is not None:
+            return self._result
+        self._text += chunk
+        text = self._text
+        for index in range(self._position, len(text)):
+            char = text[index]
+            if self._start == -1:
+                if char == self._opener:
+                    self._start = index
+                    self._depth = 1
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._result = text[self._start : index + 1]
+                    return self._result
+        self._position = len(text)
+        return None
+
+
+def extract_first_json_object(text: str) -> str:
+    """Extract the first top-level JSON object from ``text``."""
+
+    return _extract_first(text, "{", "object")
+
+
+def extract_first_json_array(text: str) -> str:
+    """Extract the first top-level JSON array from ``text``."""
+
+    return _extract_first(text, "[", "array")
+
+
+def _extract_first(text: str, opener: str, kind: str) -> str:
+    extractor = IncrementalJsonExtractor(opener)
+    result = extractor.feed(text)
+    if result is not None:
+        return result
+    if not extractor.started:
+        raise ClassificationError(f"No JSON {kind} found in response")
+    raise ClassificationError(f"Unterminated JSON {kind} in response")
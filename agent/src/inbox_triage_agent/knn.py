@@ -0,0 +1,158 @@
+"""Nearest-neighbour label lookup over embeddings of already classified emails."""
+
+from __future__ import annotations
+
+import logging
+import os
+from pathlib import Path
+from typing import Sequence
+
+from .metrics import Metrics
+from .models import LABELS
+
+try:  # NumPy is an optional dependency: pip install inbox-triage-agent[knn]
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without the extra
+    np = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingIndex:
+    """Bounded cosine-similarity index of labelled embeddings.
+
+    Vectors are normalized on insert and kept in one preallocated matrix, so a
+    query is a single matrix-vector product. Once ``capacity`` entries are
+    stored the oldest entry is overwritten. With ``path`` the index is loaded
+    at startup and saved as a NumPy ``.npz`` file every ``save_every`` inserts
+    and on :meth:`close`.
+    """
+
+    def __init__(
+        self,
+        *,
+        capacity: int = 20_000,
+        path: str | Path | None = None,
+        save_every: int = 100,
+        metrics: Metrics | None = None,
+    ) -> None:
+        if np is None:
+            raise RuntimeError("The embedding index needs NumPy: pip install 'inbox-triage-agent[knn]'")
+        self._capacity = max(1, capacity)
+        self._path = Path(path) if path is not None else None
+        self._save_every = max(1, save_every)
+        self._metrics = metrics or Metrics()
+        self._vectors: np.ndarray | None = None
+        self._labels = np.zeros(self._capacity, dtype=np.int8)
+        self._size = 0
+        self._next = 0
+        self._unsaved = 0
+        if self._path is not None and self._path.exists():
+            self._load(self._path)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def dimensions(self) -> int | None:
+        return None if self._vectors is None else self._vectors.shape[1]
+
+    def add(self, vector: Sequence[float], label: str) -> None:
+        normalized = _normalize(vector)
+        if normalized is None:
+            return
+        if self._vectors is None:
+            self._vectors = np.zeros((self._capacity, normalized.shape[0]), dtype=np.float32)
+        elif normalized.shape[0] != self._vectors.shape[1]:
+            # A different embedding model was configured; the old vectors are meaningless now.
+            logger.warning(
+                "Embedding size changed from %s to %s; clearing the index", self._vectors.shape[1], normalized.shape[0]
+            )
+            self._vectors = np.zeros((self._capacity, normalized.shape[0]), dtype=np.float32)
+            self._size = self._next = 0
+        if self._size == self._capacity:
+            self._metrics.knn_evictions += 1
+        self._vectors[self._next] = normalized
+        self._labels[self._next] = LABELS.index(label)
+        self._next = (self._next + 1) % self._capacity
+        self._size = min(self._size + 1, self._capacity)
+        self._metrics.knn_added += 1
+        self._unsaved += 1
+        if self._path is not None and self._unsaved >= self._save_every:
+            self.save()
+
+    def nearest(self, vector: Sequence[float], k: int) -> list[tuple[str, float]]:
+        """Return up to ``k`` ``(label, cosine similarity)`` pairs, most similar first."""
+
+        normalized = _normalize(vector)
+        if normalized is None or self._vectors is None or normalized.shape[0] != self._vectors.shape[1]:
+            return []
+        k = min(k, self._size)
+        if k <= 0:
+            return []
+        similarities = self._vectors[: self._size] @ normalized
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [(LABELS[self._labels[index]], float(similarities[index])) for index in top]
+
+    def vote(self, vector: Sequence[float], *, k: int, min_similarity: float) -> tuple[str, float] | None:
+        """Return ``(label, lowest similarity)`` when the ``k`` nearest neighbours agree.
+
+        Every neighbour must have a cosine similarity of at least
+        ``min_similarity`` to ``vector`` and carry the same label; otherwise
+        ``None``.
+        """
+
+        neighbours = self.nearest(vector, k)
+        if len(neighbours) < k:
+            return None
+        labels = {label for label, _ in neighbours}
+        lowest = neighbours[-1][1]
+        if len(labels) != 1 or lowest < min_similarity:
+            return None
+        return neighbours[0][0], lowest
+
+    def save(self) -> None:
+        if self._path is None or self._vectors is None:
+            return
+        # Write next to the target and rename, so a crash never leaves half a file.
+        temporary = self._path.with_name(self._path.name + ".tmp")
+        with open(temporary, "wb") as handle:
+            np.savez(
+                handle,
+                vectors=self._vectors[: self._size],
+                labels=self._labels[: self._size],
+                next=np.array(self._next),
+            )
+        os.replace(temporary, self._path)
+        self._unsaved = 0
+
+    def close(self) -> None:
+        if self._unsaved:
+            self.save()
+
+    def _load(self, path: Path) -> None:
+        try:
+            with np.load(path) as data:
+                vectors = data["vectors"].astype(np.float32)
+                labels = data["labels"].astype(np.int8)
+                position = int(data["next"])
+        except (OSError, KeyError, ValueError) as exc:
+            logger.warning("Ignoring unreadable embedding index %s: %s", path, exc)
+            return
+        # Keep the newest entries when the capacity shrank since the file was written.
+        order = np.roll(np.arange(len(vectors)), -position)[-self._capacity :]
+        self._vectors = np.zeros((self._capacity, vectors.shape[1]), dtype=np.float32)
+        self._size = len(order)
+        self._vectors[: self._size] = vectors[order]
+        self._labels[: self._size] = labels[order]
+        self._next = self._size % self._capacity
+        logger.info("Loaded %s labelled embeddings from %s", self._size, path)
+
+
+def _normalize(vector: Sequence[float]) -> np.ndarray | None:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    if array.ndim != 1 or norm == 0.0:
+        return None
+    return array / norm
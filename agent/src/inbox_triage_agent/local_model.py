@@ -0,0 +1,252 @@
+"""Hashed bag-of-words naive Bayes trained on labels the LLM already produced."""
+
+from __future__ import annotations
+
+import json
+import math
+import random
+import re
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Sequence
+
+from .models import LABELS, Message
+
+if TYPE_CHECKING:
+    from .api_client import ApiClient
+
+DEFAULT_FEATURES = 1 << 18
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_DIGITS = re.compile(r"\d")
+# Candidate temperatures for calibration; above 1 flattens naive Bayes' overconfidence.
+_TEMPERATURES = tuple(round(0.5 + 0.25 * step, 2) for step in range(79))
+
+
+def message_features(message: Message, *, n_features: int = DEFAULT_FEATURES) -> dict[int, int]:
+    """Hash subject and snippet words, word bigrams and the sender domain into feature counts."""
+
+    words = [_DIGITS.sub("0", word) for word in _TOKEN.findall(message.combined_text().lower())]
+    tokens = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    sender = next((str(value) for name, value in (message.raw_headers or {}).items() if name.lower() == "from"), "")
+    if "@" in sender:
+        tokens.append("from:" + sender.rsplit("@", 1)[1].strip(" >").lower())
+
+    counts: dict[int, int] = {}
+    for token in tokens:
+        # crc32 is stable across processes, unlike hash() on str.
+        index = zlib.crc32(token.encode("utf-8")) % n_features
+        counts[index] = counts.get(index, 0) + 1
+    return counts
+
+
+class LocalModelError(RuntimeError):
+    """Raised when a local model file cannot be used."""
+
+
+class NaiveBayesModel:
+    """Multinomial naive Bayes over hashed features with temperature calibration.
+
+    Raw naive Bayes posteriors are far too confident. :meth:`calibrate` picks
+    the temperature that minimizes log loss on held-out examples, so
+    :meth:`predict` returns probabilities a threshold can be set against.
+    """
+
+    def __init__(self, *, n_features: int = DEFAULT_FEATURES, alpha: float = 0.5) -> None:
+        self.n_features = n_features
+        self.alpha = alpha
+        self.temperature = 1.0
+        self.documents = {label: 0 for label in LABELS}
+        self.feature_counts: dict[str, dict[int, int]] = {label: {} for label in LABELS}
+        self.totals = {label: 0 for label in LABELS}
+        self._log_prior: dict[str, float] = {}
+        self._log_denominator: dict[str, float] = {}
+
+    def fit(self, examples: Iterable[tuple[Message, str]]) -> "NaiveBayesModel":
+        for message, label in examples:
+            if label not in self.documents:
+                raise ValueError(f"unknown label {label!r}")
+            self.documents[label] += 1
+            counts = self.feature_counts[label]
+            for index, count in message_features(message, n_features=self.n_features).items():
+                counts[index] = counts.get(index, 0) + count
+                self.totals[label] += count
+        self._prepare()
+        return self
+
+    def predict(self, message: Message) -> tuple[str, float]:
+        """Return the most likely label and its calibrated probability."""
+
+        scores = self._scores(message)
+        if not scores:
+            raise LocalModelError("model has not been trained")
+        return _softmax_top(scores, self.temperature)
+
+    def calibrate(self, examples: Sequence[tuple[Message, str]]) -> float:
+        """Fit :attr:`temperature` on held-out ``examples`` and return it."""
+
+        if not examples:
+            return self.temperature
+        raw = [(self._scores(message), label) for message, label in examples]
+        best_loss = math.inf
+        for temperature in _TEMPERATURES:
+            loss = 0.0
+            for scores, label in raw:
+                if label not in scores:
+                    continue
+                top = max(scores.values())
+                normalizer = sum(math.exp((score - top) / temperature) for score in scores.values())
+                loss -= (scores[label] - top) / temperature - math.log(normalizer)
+            if loss < best_loss:
+                best_loss, self.temperature = loss, temperature
+        return self.temperature
+
+    def save(self, path: str | Path) -> None:
+        data = {
+            "version": 1,
+            "n_features": self.n_features,
+            "alpha": self.alpha,
+            "temperature": self.temperature,
+            "documents": self.documents,
+            "totals": self.totals,
+            # JSON keys are strings; hashed indices are restored to ints on load.
+            "feature_counts": {
+                label: {str(index): count for index, count in counts.items()}
+                for label, counts in self.feature_counts.items()
+            },
+        }
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(data, handle, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str | Path) -> "NaiveBayesModel":
+        try:
+            with open(path, encoding="utf-8") as handle:
+                data = json.load(handle)
+            model = cls(n_features=int(data["n_features"]), alpha=float(data["alpha"]))
+            model.temperature = float(data["temperature"])
+            model.documents.update({label: int(count) for label, count in data["documents"].items()})
+            model.totals.update({label: int(count) for label, count in data["totals"].items()})
+            for label, counts in data["feature_counts"].items():
+                model.feature_counts[label] = {int(index): int(count) for index, count in counts.items()}
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            raise LocalModelError(f"Cannot load local model from {path}: {exc}") from exc
+        model._prepare()
+        return model
+
+    def _scores(self, message: Message) -> dict[str, float]:
+        features = message_features(message, n_features=self.n_features)
+        return {label: self._log_likelihood(label, features) for label in self._log_prior}
+
+    def _log_likelihood(self, label: str, features: dict[int, int]) -> float:
+        counts = self.feature_counts[label]
+        alpha = self.alpha
+        score = self._log_prior[label] - self._log_denominator[label] * sum(features.values())
+        for index, count in features.items():
+            score += count * math.log(counts.get(index, 0) + alpha)
+        return score
+
+    def _prepare(self) -> None:
+        total_documents = sum(self.documents.values())
+        # Labels never seen in training cannot be predicted.
+        self._log_prior = {
+            label: math.log(count / total_documents) for label, count in self.documents.items() if count
+        }
+        self._log_denominator = {
+            label: math.log(self.totals[label] + self.alpha * self.n_features) for label in self._log_prior
+        }
+
+
+def _softmax_top(scores: dict[str, float], temperature: float) -> tuple[str, float]:
+    label = max(scores, key=scores.__getitem__)
+    top = scores[label]
+    normalizer = sum(math.exp((score - top) / temperature) for score in scores.values())
+    return label, 1.0 / normalizer
+
+
+@dataclass
+class Evaluation:
+    examples: int
+    accuracy: float
+    covered: int
+    covered_accuracy: float
+    threshold: float
+
+    @property
+    def llm_calls_avoided(self) -> float:
+        return self.covered / self.examples if self.examples else 0.0
+
+    def report(self) -> str:
+        return (
+            f"examples={self.examples} accuracy={self.accuracy:.3f} "
+            f"threshold={self.threshold:.2f} llm_calls_avoided={self.llm_calls_avoided:.1%} "
+            f"accuracy_when_confident={self.covered_accuracy:.3f}"
+        )
+
+
+def evaluate(model: NaiveBayesModel, examples: Sequence[tuple[Message, str]], *, threshold: float) -> Evaluation:
+    """Compare predictions with the LLM labels in ``examples``."""
+
+    correct = covered = covered_correct = 0
+    for message, label in examples:
+        predicted, probability = model.predict(message)
+        hit = predicted == label
+        correct += hit
+        if probability >= threshold:
+            covered += 1
+            covered_correct += hit
+    return Evaluation(
+        examples=len(examples),
+        accuracy=correct / len(examples) if examples else 0.0,
+        covered=covered,
+        covered_accuracy=covered_correct / covered if covered else 0.0,
+        threshold=threshold,
+    )
+
+
+def split(
+    examples: Sequence[tuple[Message, str]], *, holdout: float, seed: int = 13
+) -> tuple[list[tuple[Message, str]], list[tuple[Message, str]]]:
+    """Shuffle and split ``examples`` into training and held-out lists."""
+
+    shuffled = list(examples)
+    random.Random(seed).shuffle(shuffled)
+    cut = len(shuffled) - int(len(shuffled) * holdout)
+    return shuffled[:cut], shuffled[cut:]
+
+
+def read_examples(path: str | Path) -> list[tuple[Message, str]]:
+    """Read JSON lines of messages with a ``classification`` (or ``label``) field."""
+
+    examples = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            label = row.get("classification") or row.get("label")
+            if label in LABELS:
+                examples.append((Message.model_validate({"id": 0, **row}), label))
+    return examples
+
+
+async def fetch_examples(api_client: "ApiClient", *, max_per_label: int = 5_000) -> list[tuple[Message, str]]:
+    """Page through the API and collect messages whose label was set by the LLM."""
+
+    examples = []
+    for label in LABELS:
+        offset = 0
+        while offset < max_per_label:
+            page = await api_client.fetch_messages(classification=label, limit=100, offset=offset)
+            examples.extend((message, label) for message in page if message.classification_source == "llm")
+            if len(page) < 100:
+                break
+            offset += len(page)
+    return examples
+
+
+def write_examples(path: str | Path, examples: Iterable[tuple[Message, str]]) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        for message, label in examples:
+            row = message.model_dump(include={"id", "subject", "snippet", "raw_headers"})
+            handle.write(json.dumps({**row, "classification": label}) + "\n")
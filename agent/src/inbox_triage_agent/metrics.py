@@ -0,0 +1,728 @@
+"""In-process counters describing the worker's progress."""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds; the last bucket catches everything slower.
+LATENCY_BUCKETS: tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+
+@dataclass
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; quantiles are bucket upper bounds."""
+
+    buckets: tuple[float, ...] = LATENCY_BUCKETS
+    counts: list[int] = field(default_factory=list)
+    total_seconds: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * len(self.buckets)
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.total_seconds += seconds
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+    @property
+    def mean(self) -> float:
+        return _mean(self.total_seconds, self.count)
+
+
+class _StageTimer:
+    """Context manager adding the elapsed time of a block to a histogram."""
+
+    __slots__ = ("_histogram", "_started")
+
+    def __init__(self, histogram: LatencyHistogram) -> None:
+        self._histogram = histogram
+        self._started = 0.0
+
+    def __enter__(self) -> None:
+        self._started = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._histogram.observe(time.perf_counter() - self._started)
+
+
+# Upper bounds for estimated prompt tokens per message.
+PROMPT_TOKEN_BUCKETS: tuple[float, ...] = (64, 128, 256, 512, 1024, 2048, 4096, 8192, float("inf"))
+
+# Upper bounds for the scheduler's message priority scores.
+PRIORITY_SCORE_BUCKETS: tuple[float, ...] = (0, 25, 50, 75, 100, 125, float("inf"))
+
+# Upper bounds in seconds from fetch to written label; backlogged mail can wait far longer than one stage.
+TIME_TO_LABEL_BUCKETS: tuple[float, ...] = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, float("inf"))
+
+# Pipeline stages with a latency histogram, in processing order.
+STAGES: tuple[str, ...] = ("fetch", "claim", "local", "embed", "prompt", "generate", "parse", "rules", "update")
+
+
+@dataclass
+class Metrics:
+    processed: int = 0
+    classified_via_llm: int = 0
+    classified_via_rules: int = 0
+    failed: int = 0
+    last_error: str | None = None
+
+    rules_bypassed: int = 0
+    local_model_hits: int = 0
+    local_model_escalations: int = 0
+
+    api_requests: int = 0
+
+    fallback_parse_errors: int = 0
+    fallback_parse_error_seconds: float = 0.0
+    fallback_low_confidence: int = 0
+    fallback_llm_errors: int = 0
+    fallback_deadline: int = 0
+
+    ollama_cold_requests: int = 0
+    ollama_cold_seconds: float = 0.0
+    ollama_warm_requests: int = 0
+    ollama_warm_seconds: float = 0.0
+    ollama_warm_up_seconds: float | None = None
+    ollama_prompt_eval_tokens: int = 0
+    ollama_prompt_eval_seconds: float = 0.0
+
+    prompt_tokens: LatencyHistogram = field(default_factory=lambda: LatencyHistogram(PROMPT_TOKEN_BUCKETS))
+    prompt_headers_dropped: int = 0
+    prompt_snippets_truncated: int = 0
+
+    stream_requests: int = 0
+    stream_stopped_early: int = 0
+    stream_tokens: int = 0
+    stream_tokens_saved: int = 0
+    time_to_label_seconds: float = 0.0
+    time_to_label_count: int = 0
+
+    cache_hits: int = 0
+    cache_misses: int = 0
+    cache_evictions: int = 0
+
+    knn_hits: int = 0
+    knn_misses: int = 0
+    knn_added: int = 0
+    knn_evictions: int = 0
+    knn_embed_errors: int = 0
+
+    threads_seen: int = 0
+    thread_groups: int = 0
+    thread_messages: int = 0
+    thread_reused: int = 0
+    thread_llm_calls: int = 0
+    thread_evictions: int = 0
+
+    adaptive_batch_size: int = 0
+    adaptive_interval_seconds: float = 0.0
+    adaptive_throughput: float = 0.0
+    adaptive_grow: int = 0
+    adaptive_backoff: int = 0
+    adaptive_throughput_capped: int = 0
+
+    push_notifications: int = 0
+    push_ids: int = 0
+
+    journal_appended: int = 0
+    journal_flushed: int = 0
+    journal_flush_failures: int = 0
+    journal_replayed: int = 0
+    push_to_label: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    priority_scores: LatencyHistogram = field(default_factory=lambda: LatencyHistogram(PRIORITY_SCORE_BUCKETS))
+    # Seconds from fetch to written label, per label.
+    time_to_label: dict[str, LatencyHistogram] = field(default_factory=dict)
+
+    # Per cascade tier (model name, or "rules" for the final fallback), in the order first seen.
+    cascade_resolved: dict[str, int] = field(default_factory=dict)
+    cascade_escalated: dict[str, int] = field(default_factory=dict)
+    cascade_latency: dict[str, LatencyHistogram] = field(default_factory=dict)
+
+    ollama_node_latency: dict[str, LatencyHistogram] = field(default_factory=dict)
+    ollama_node_failures: dict[str, int] = field(default_factory=dict)
+    ollama_node_ejections: dict[str, int] = field(default_factory=dict)
+    # Requests cut off by the (adaptive) Ollama timeout.
+    ollama_timeouts: int = 0
+    # Duplicate generations, how often the duplicate answered first, and the seconds the losers ran.
+    hedge_requests: int = 0
+    hedge_wins: int = 0
+    hedge_wasted_seconds: float = 0.0
+
+    stage_latency: dict[str, LatencyHistogram] = field(
+        default_factory=lambda: {stage: LatencyHistogram() for stage in STAGES}
+    )
+    retries: dict[str, int] = field(default_factory=dict)
+    retry_budget_exhausted: dict[str, int] = field(default_factory=dict)
+    # Per dependency: current state, (dependency, state) transitions, and calls refused while open.
+    breaker_state: dict[str, str] = field(default_factory=dict)
+    breaker_transitions: dict[tuple[str, str], int] = field(default_factory=dict)
+    breaker_rejected: dict[str, int] = field(default_factory=dict)
+    # Live gauges such as queue depths, read when metrics are exported.
+    gauges: dict[str, Callable[[], float]] = field(default_factory=dict)
+
+    @property
+    def rules_bypass_rate(self) -> float:
+        return self.rules_bypassed / self.processed if self.processed else 0.0
+
+    @property
+    def knn_hit_rate(self) -> float:
+        lookups = self.knn_hits + self.knn_misses
+        return self.knn_hits / lookups if lookups else 0.0
+
+    @property
+    def llm_calls_per_thread(self) -> float:
+        return _mean(self.thread_llm_calls, self.threads_seen)
+
+    @property
+    def parse_error_fallback_share(self) -> float:
+        total = (
+            self.fallback_parse_errors
+            + self.fallback_low_confidence
+            + self.fallback_llm_errors
+            + self.fallback_deadline
+        )
+        return self.fallback_parse_errors / total if total else 0.0
+
+    def time_stage(self, stage: str) -> _StageTimer:
+        """Time a block into the ``stage`` histogram: ``with metrics.time_stage("parse"): ...``."""
+
+        histogram = self.stage_latency.get(stage)
+        if histogram is None:
+            histogram = self.stage_latency[stage] = LatencyHistogram()
+        return _StageTimer(histogram)
+
+    def record_retry(self, dependency: str) -> None:
+        self.retries[dependency] = self.retries.get(dependency, 0) + 1
+
+    def log_progress(self) -> None:
+        """One-line snapshot for the periodic progress log."""
+
+        generate = self.stage_latency.get("generate") or LatencyHistogram()
+        gauges = " ".join(f"{name}={read():g}" for name, read in sorted(self.gauges.items()))
+        logger.info(
+            "Progress processed=%s llm=%s rules=%s failed=%s generate_p50<=%ss generate_p95<=%ss retries=%s %s",
+            self.processed,
+            self.classified_via_llm,
+            self.classified_via_rules,
+            self.failed,
+            generate.quantile(0.5),
+            generate.quantile(0.95),
+            sum(self.retries.values()),
+            gauges,
+        )
+
+    def record_parse_failure(self, seconds: float) -> None:
+        self.fallback_parse_errors += 1
+        self.fallback_parse_error_seconds += seconds
+
+    def record_generation(self, seconds: float, *, cold: bool) -> None:
+        if cold:
+            self.ollama_cold_requests += 1
+            self.ollama_cold_seconds += seconds
+        else:
+            self.ollama_warm_requests += 1
+            self.ollama_warm_seconds += seconds
+
+    def record_cascade(self, tier: str, seconds: float | None, *, resolved: bool) -> None:
+        if seconds is not None:
+            self.cascade_latency.setdefault(tier, LatencyHistogram()).observe(seconds)
+        counts = self.cascade_resolved if resolved else self.cascade_escalated
+        counts[tier] = counts.get(tier, 0) + 1
+
+    def record_time_to_label(self, label: str, seconds: float) -> None:
+        self.time_to_label.setdefault(label, LatencyHistogram(TIME_TO_LABEL_BUCKETS)).observe(seconds)
+
+    def cascade_share(self, tier: str) -> float:
+        """Share of cascade-classified messages that ``tier`` settled."""
+
+        return _mean(self.cascade_resolved.get(tier, 0), sum(self.cascade_resolved.values()))
+
+    def record_prompt_eval(self, tokens: int, seconds: float) -> None:
+        self.ollama_prompt_eval_tokens += tokens
+        self.ollama_prompt_eval_seconds += seconds
+
+    def record_node_request(self, node: str, seconds: float | None) -> None:
+        """Record a pool request to ``node``; ``seconds`` is ``None`` for failures."""
+
+        if seconds is None:
+            self.ollama_node_failures[node] = self.ollama_node_failures.get(node, 0) + 1
+            return
+        self.ollama_node_latency.setdefault(node, LatencyHistogram()).observe(seconds)
+
+    def record_stream(
+        self,
+        *,
+        tokens: int,
+        tokens_saved: int,
+        stopped_early: bool,
+        time_to_label: float | None,
+    ) -> None:
+        self.stream_requests += 1
+        self.stream_tokens += tokens
+        self.stream_tokens_saved += tokens_saved
+        if stopped_early:
+            self.stream_stopped_early += 1
+        if time_to_label is not None:
+            self.time_to_label_seconds += time_to_label
+            self.time_to_label_count += 1
+
+    def log_summary(self) -> None:
+        logger.info(
+            "Processed=%s success_llm=%s success_rules=%s failed=%s",
+            self.processed,
+            self.classified_via_llm,
+            self.classified_via_rules,
+            self.failed,
+        )
+        logger.info(
+            "API requests=%s (%.2f per processed message)",
+            self.api_requests,
+            _mean(self.api_requests, self.processed),
+        )
+        logger.info(
+            "LLM bypassed by confident rules=%s (%.1f%% of processed)",
+            self.rules_bypassed,
+            self.rules_bypass_rate * 100,
+        )
+        if self.local_model_hits or self.local_model_escalations:
+            logger.info(
+                "Local model decided=%s escalated=%s (%.1f%% of LLM calls avoided)",
+                self.local_model_hits,
+                self.local_model_escalations,
+                _mean(self.local_model_hits, self.local_model_hits + self.local_model_escalations) * 100,
+            )
+        logger.info(
+            "Fallbacks parse_errors=%s (%.1f%% of fallbacks, %.1fs of inference wasted) "
+            "low_confidence=%s llm_errors=%s deadline=%s",
+            self.fallback_parse_errors,
+            self.parse_error_fallback_share * 100,
+            self.fallback_parse_error_seconds,
+            self.fallback_low_confidence,
+            self.fallback_llm_errors,
+            self.fallback_deadline,
+        )
+        if self.ollama_timeouts or self.hedge_requests:
+            logger.info(
+                "Ollama timeouts=%s hedged=%s (duplicate won %s, %.1fs of inference wasted)",
+                self.ollama_timeouts,
+                self.hedge_requests,
+                self.hedge_wins,
+                self.hedge_wasted_seconds,
+            )
+        logger.info(
+            "Ollama cold=%s (mean %.2fs) warm=%s (mean %.2fs) warm_up=%s",
+            self.ollama_cold_requests,
+            _mean(self.ollama_cold_seconds, self.ollama_cold_requests),
+            self.ollama_warm_requests,
+            _mean(self.ollama_warm_seconds, self.ollama_warm_requests),
+            "n/a" if self.ollama_warm_up_seconds is None else f"{self.ollama_warm_up_seconds:.2f}s",
+        )
+        if self.prompt_tokens.count:
+            logger.info(
+                "Prompts mean=%.0f tokens p95<=%s headers_dropped=%s snippets_truncated=%s "
+                "ollama_prompt_eval tokens=%s seconds=%.2f",
+                self.prompt_tokens.mean,
+                self.prompt_tokens.quantile(0.95),
+                self.prompt_headers_dropped,
+                self.prompt_snippets_truncated,
+                self.ollama_prompt_eval_tokens,
+                self.ollama_prompt_eval_seconds,
+            )
+        if self.stream_requests:
+            logger.info(
+                "Streamed=%s stopped_early=%s tokens=%s tokens_saved<=%s mean_time_to_label=%.2fs",
+                self.stream_requests,
+                self.stream_stopped_early,
+                self.stream_tokens,
+                self.stream_tokens_saved,
+                _mean(self.time_to_label_seconds, self.time_to_label_count),
+            )
+        logger.info(
+            "Classification cache hits=%s misses=%s evictions=%s",
+            self.cache_hits,
+            self.cache_misses,
+            self.cache_evictions,
+        )
+        if self.knn_hits or self.knn_misses:
+            logger.info(
+                "Nearest-neighbour tier hits=%s misses=%s (%.1f%% of lookups) added=%s evictions=%s embed_errors=%s",
+                self.knn_hits,
+                self.knn_misses,
+                self.knn_hit_rate * 100,
+                self.knn_added,
+                self.knn_evictions,
+                self.knn_embed_errors,
+            )
+        if self.thread_groups:
+            logger.info(
+                "Threads seen=%s groups=%s messages=%s reused=%s llm_calls=%s (%.2f per thread) evictions=%s",
+                self.threads_seen,
+                self.thread_groups,
+                self.thread_messages,
+                self.thread_reused,
+                self.thread_llm_calls,
+                self.llm_calls_per_thread,
+                self.thread_evictions,
+            )
+        if self.adaptive_batch_size:
+            logger.info(
+                "Adaptive polling batch_size=%s interval=%.2fs throughput=%.2f msg/s grew=%s backed_off=%s capped=%s",
+                self.adaptive_batch_size,
+                self.adaptive_interval_seconds,
+                self.adaptive_throughput,
+                self.adaptive_grow,
+                self.adaptive_backoff,
+                self.adaptive_throughput_capped,
+            )
+        if self.push_notifications:
+            logger.info(
+                "Push notifications=%s ids=%s labelled=%s push_to_label p50<=%ss p95<=%ss",
+                self.push_notifications,
+                self.push_ids,
+                self.push_to_label.count,
+                self.push_to_label.quantile(0.5),
+                self.push_to_label.quantile(0.95),
+            )
+        if self.journal_appended or self.journal_replayed:
+            logger.info(
+                "Update journal appended=%s flushed=%s flush_failures=%s replayed=%s",
+                self.journal_appended,
+                self.journal_flushed,
+                self.journal_flush_failures,
+                self.journal_replayed,
+            )
+        for label, histogram in sorted(self.time_to_label.items()):
+            logger.info(
+                "Time to label %s count=%s mean=%.1fs p50<=%ss p95<=%ss",
+                label,
+                histogram.count,
+                histogram.mean,
+                histogram.quantile(0.5),
+                histogram.quantile(0.95),
+            )
+        for tier in dict.fromkeys([*self.cascade_latency, *self.cascade_resolved, *self.cascade_escalated]):
+            histogram = self.cascade_latency.get(tier, LatencyHistogram())
+            logger.info(
+                "Cascade tier %s resolved=%s (%.1f%% of messages) escalated=%s mean=%.2fs p95<=%ss",
+                tier,
+                self.cascade_resolved.get(tier, 0),
+                self.cascade_share(tier) * 100,
+                self.cascade_escalated.get(tier, 0),
+                histogram.mean,
+                histogram.quantile(0.95),
+            )
+        for dependency, state in sorted(self.breaker_state.items()):
+            logger.info(
+                "Circuit breaker %s state=%s opened=%s rejected=%s retry_budget_exhausted=%s",
+                dependency,
+                state,
+                self.breaker_transitions.get((dependency, "open"), 0),
+                self.breaker_rejected.get(dependency, 0),
+                self.retry_budget_exhausted.get(dependency, 0),
+            )
+        for node in sorted(set(self.ollama_node_latency) | set(self.ollama_node_failures)):
+            histogram = self.ollama_node_latency.get(node, LatencyHistogram())
+            logger.info(
+                "Ollama node %s requests=%s failures=%s ejections=%s mean=%.2fs p50<=%ss p95<=%ss",
+                node,
+                histogram.count,
+                self.ollama_node_failures.get(node, 0),
+                self.ollama_node_ejections.get(node, 0),
+                histogram.mean,
+                histogram.quantile(0.5),
+                histogram.quantile(0.95),
+            )
+
+
+def _mean(total: float, count: int) -> float:
+    return total / count if count else 0.0
+
+
+def render_prometheus(metrics: Metrics, *, prefix: str = "inbox_triage") -> str:
+    """Render ``metrics`` in the Prometheus text exposition format."""
+
+    lines: list[str] = []
+
+    def metric(name: str, kind: str, help_text: str, samples: list[tuple[dict[str, str], float]]) -> None:
+        full_name = f"{prefix}_{name}"
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{full_name}{_labels(labels)} {_number(value)}")
+
+    def histogram(name: str, help_text: str, series: list[tuple[dict[str, str], LatencyHistogram]]) -> None:
+        full_name = f"{prefix}_{name}"
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} histogram")
+        for labels, hist in series:
+            cumulative = 0
+            for bound, count in zip(hist.buckets, hist.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{full_name}_bucket{_labels({**labels, 'le': le})} {cumulative}")
+            lines.append(f"{full_name}_sum{_labels(labels)} {_number(hist.total_seconds)}")
+            lines.append(f"{full_name}_count{_labels(labels)} {hist.count}")
+
+    metric("processed_total", "counter", "Messages classified and written back.", [({}, metrics.processed)])
+    metric(
+        "classified_total",
+        "counter",
+        "Processed messages by classifier.",
+        [({"via": "llm"}, metrics.classified_via_llm), ({"via": "rules"}, metrics.classified_via_rules)],
+    )
+    metric("failed_total", "counter", "Messages that failed in any stage.", [({}, metrics.failed)])
+    metric("rules_bypassed_total", "counter", "Messages decided by confident rules.", [({}, metrics.rules_bypassed)])
+    metric(
+        "local_model_total",
+        "counter",
+        "Local model decisions and escalations to the LLM.",
+        [({"result": "decided"}, metrics.local_model_hits), ({"result": "escalated"}, metrics.local_model_escalations)],
+    )
+    metric(
+        "fallback_total",
+        "counter",
+        "LLM answers replaced by rules, by cause.",
+        [
+            ({"reason": "parse_error"}, metrics.fallback_parse_errors),
+            ({"reason": "low_confidence"}, metrics.fallback_low_confidence),
+            ({"reason": "llm_error"}, metrics.fallback_llm_errors),
+            ({"reason": "deadline"}, metrics.fallback_deadline),
+        ],
+    )
+    metric(
+        "ollama_timeouts_total", "counter", "Ollama requests that hit their timeout.", [({}, metrics.ollama_timeouts)]
+    )
+    metric(
+        "hedged_requests_total",
+        "counter",
+        "Generations duplicated after the hedge delay, by which request answered first.",
+        [
+            ({"winner": "original"}, metrics.hedge_requests - metrics.hedge_wins),
+            ({"winner": "hedge"}, metrics.hedge_wins),
+        ],
+    )
+    metric(
+        "hedge_wasted_seconds_total",
+        "counter",
+        "Seconds the cancelled request of each hedged pair had been running.",
+        [({}, metrics.hedge_wasted_seconds)],
+    )
+    metric("api_requests_total", "counter", "HTTP attempts against the API.", [({}, metrics.api_requests)])
+    metric(
+        "retries_total",
+        "counter",
+        "Retried network calls by dependency.",
+        [({"dependency": name}, count) for name, count in sorted(metrics.retries.items())],
+    )
+    metric(
+        "retry_budget_exhausted_total",
+        "counter",
+        "Retries skipped because the dependency's retry budget was empty.",
+        [({"dependency": name}, count) for name, count in sorted(metrics.retry_budget_exhausted.items())],
+    )
+    metric(
+        "circuit_breaker_state",
+        "gauge",
+        "1 for each dependency's current circuit breaker state, 0 for the others.",
+        [
+            ({"dependency": name, "state": state}, float(current == state))
+            for name, current in sorted(metrics.breaker_state.items())
+            for state in ("closed", "open", "half_open")
+        ],
+    )
+    metric(
+        "circuit_breaker_transitions_total",
+        "counter",
+        "Circuit breaker state changes by dependency and new state.",
+        [
+            ({"dependency": name, "state": state}, count)
+            for (name, state), count in sorted(metrics.breaker_transitions.items())
+        ],
+    )
+    metric(
+        "circuit_breaker_rejected_total",
+        "counter",
+        "Calls failed fast because the dependency's circuit breaker was open.",
+        [({"dependency": name}, count) for name, count in sorted(metrics.breaker_rejected.items())],
+    )
+    metric(
+        "cache_total",
+        "counter",
+        "Classification cache lookups and evictions.",
+        [
+            ({"result": "hit"}, metrics.cache_hits),
+            ({"result": "miss"}, metrics.cache_misses),
+            ({"result": "eviction"}, metrics.cache_evictions),
+        ],
+    )
+    metric(
+        "knn_total",
+        "counter",
+        "Nearest-neighbour tier lookups and index changes.",
+        [
+            ({"result": "hit"}, metrics.knn_hits),
+            ({"result": "miss"}, metrics.knn_misses),
+            ({"result": "added"}, metrics.knn_added),
+            ({"result": "eviction"}, metrics.knn_evictions),
+            ({"result": "embed_error"}, metrics.knn_embed_errors),
+        ],
+    )
+    metric(
+        "thread_messages_total",
+        "counter",
+        "Messages classified as part of a Gmail thread, by how they were resolved.",
+        [
+            ({"result": "classified"}, metrics.thread_messages - metrics.thread_reused),
+            ({"result": "reused"}, metrics.thread_reused),
+        ],
+    )
+    metric(
+        "thread_cache_total",
+        "counter",
+        "Per-thread classification state entries created and evicted.",
+        [({"result": "created"}, metrics.threads_seen), ({"result": "evicted"}, metrics.thread_evictions)],
+    )
+    metric(
+        "thread_llm_calls_total",
+        "counter",
+        "LLM generations made while classifying thread groups.",
+        [({}, metrics.thread_llm_calls)],
+    )
+    metric(
+        "ollama_requests_total",
+        "counter",
+        "Ollama generations by model state.",
+        [({"state": "cold"}, metrics.ollama_cold_requests), ({"state": "warm"}, metrics.ollama_warm_requests)],
+    )
+    metric(
+        "prompt_compaction_total",
+        "counter",
+        "Headers dropped and snippets truncated before prompting.",
+        [
+            ({"result": "header_dropped"}, metrics.prompt_headers_dropped),
+            ({"result": "snippet_truncated"}, metrics.prompt_snippets_truncated),
+        ],
+    )
+    metric(
+        "ollama_prompt_eval_tokens_total",
+        "counter",
+        "Prompt tokens evaluated by Ollama.",
+        [({}, metrics.ollama_prompt_eval_tokens)],
+    )
+    metric(
+        "ollama_prompt_eval_seconds_total",
+        "counter",
+        "Seconds Ollama spent evaluating prompts.",
+        [({}, metrics.ollama_prompt_eval_seconds)],
+    )
+    metric("stream_tokens_saved_total", "counter", "Tokens not generated thanks to early stops.", [({}, metrics.stream_tokens_saved)])
+    metric("push_ids_total", "counter", "Message ids received through push notifications.", [({}, metrics.push_ids)])
+    metric(
+        "journal_total",
+        "counter",
+        "Update payloads written to, flushed from and replayed out of the durable journal.",
+        [
+            ({"result": "appended"}, metrics.journal_appended),
+            ({"result": "flushed"}, metrics.journal_flushed),
+            ({"result": "replayed"}, metrics.journal_replayed),
+        ],
+    )
+    metric(
+        "journal_flush_failures_total",
+        "counter",
+        "Journal flushes that failed because the API was unavailable.",
+        [({}, metrics.journal_flush_failures)],
+    )
+    metric(
+        "cascade_total",
+        "counter",
+        "Messages each cascade tier resolved or escalated.",
+        [({"tier": tier, "result": "resolved"}, count) for tier, count in metrics.cascade_resolved.items()]
+        + [({"tier": tier, "result": "escalated"}, count) for tier, count in metrics.cascade_escalated.items()],
+    )
+    metric(
+        "ollama_node_failures_total",
+        "counter",
+        "Failed requests per Ollama node.",
+        [({"node": node}, count) for node, count in sorted(metrics.ollama_node_failures.items())],
+    )
+    metric(
+        "ollama_node_ejections_total",
+        "counter",
+        "Times an Ollama node was taken out of rotation.",
+        [({"node": node}, count) for node, count in sorted(metrics.ollama_node_ejections.items())],
+    )
+    metric(
+        "adaptive",
+        "gauge",
+        "Current adaptive polling decisions.",
+        [
+            ({"value": "batch_size"}, metrics.adaptive_batch_size),
+            ({"value": "interval_seconds"}, metrics.adaptive_interval_seconds),
+            ({"value": "throughput"}, metrics.adaptive_throughput),
+        ],
+    )
+    metric(
+        "gauge",
+        "gauge",
+        "Live pipeline gauges such as queue depths.",
+        [({"name": name}, read()) for name, read in sorted(metrics.gauges.items())],
+    )
+    histogram(
+        "stage_seconds",
+        "Latency of each pipeline stage.",
+        [({"stage": stage}, hist) for stage, hist in metrics.stage_latency.items()],
+    )
+    histogram(
+        "ollama_node_seconds",
+        "Generation latency per Ollama node.",
+        [({"node": node}, hist) for node, hist in sorted(metrics.ollama_node_latency.items())],
+    )
+    histogram("prompt_tokens", "Estimated prompt tokens per message.", [({}, metrics.prompt_tokens)])
+    histogram(
+        "cascade_tier_seconds",
+        "Latency of each cascade tier's answer.",
+        [({"tier": tier}, hist) for tier, hist in metrics.cascade_latency.items()],
+    )
+    histogram("push_to_label_seconds", "Time from push notification to written label.", [({}, metrics.push_to_label)])
+    histogram(
+        "time_to_label_seconds",
+        "Time from fetch to written label, per label.",
+        [({"label": label}, hist) for label, hist in sorted(metrics.time_to_label.items())],
+    )
+    histogram("priority_score", "Scheduler priority scores of queued message groups.", [({}, metrics.priority_scores)])
+    return "\n".join(lines) + "\n"
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,48 @@
+"""Prometheus scrape endpoint for the in-process metrics."""
+
+from __future__ import annotations
+
+import logging
+
+from .httpd import HttpRequest, HttpResponse, TinyHttpServer
+from .metrics import Metrics, render_prometheus
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsServer:
+    """Serves ``GET /metrics``; rendering happens per scrape, never on the hot path."""
+
+    def __init__(self, metrics: Metrics, *, host: str = "127.0.0.1", port: int = 9464) -> None:
+        self._metrics = metrics
+        self._host = host
+        self._server = TinyHttpServer(self._dispatch, host=host, port=port)
+
+    @property
+    def port(self) -> int:
+        return self._server.port
+
+    async def start(self) -> None:
+        await self._server.start()
+        logger.info("Serving metrics on http://%s:%s/metrics", self._host, self.port)
+
+    async def close(self) -> None:
+        await self._server.close()
+
+    async def __aenter__(self) -> "MetricsServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:  # type: ignore[override]
+        await self.close()
+
+    def _dispatch(self, request: HttpRequest) -> HttpResponse:
+        if request.method != "GET":
+            return HttpResponse(405, b"use GET\n", CONTENT_TYPE)
+        if request.path == "/metrics":
+            return HttpResponse(200, render_prometheus(self._metrics).encode(), CONTENT_TYPE)
+        if request.path == "/health":
+            return HttpResponse(200, b"ok\n", CONTENT_TYPE)
+        return HttpResponse(404, b"not found\n", CONTENT_TYPE)
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from datetime import datetime
 from typing import ClassVar, Literal
 
 from pydantic import BaseModel, Field, ValidationError, field_validator
@@ -33,9 +34,15 @@ class Message(BaseModel):
     id: int
     subject: str = ""
     snippet: str = ""
+    # Only the headers the agent uses; the API leaves out transport headers.
     raw_headers: dict | None = None
+    # When Gmail received the message.
+    internal_ts: datetime | None = None
     gmail_message_id: str | None = None
     gmail_thread_id: str | None = None
+    # Current label and who set it ("llm" or "rules"), as listed by the API.
+    classification: str | None = None
+    classification_source: str | None = None
 
     def combined_text(self) -> str:
         parts = [self.subject or "", self.snippet or ""]
@@ -46,6 +53,19 @@ class ClaimResponse(BaseModel):
     triage_in_progress: bool | None = None
 
 
+class BulkResult(BaseModel):
+    """One entry of a ``bulk_claim`` or ``bulk_update`` response."""
+
+    id: int
+    status: str
+    triage_in_progress: bool | None = None
+    error: str | None = None
+
+
+class BulkResponse(BaseModel):
+    results: list[BulkResult]
+
+
 class UpdatePayload(BaseModel):
     classification: ClassificationLabel
     classified_by: Literal["llm", "rules"]
@@ -72,6 +92,36 @@ class LLMClassification(BaseModel):
         return normalized
 
 
+# Keeps schema-constrained answers short enough for a small ``num_predict``.
+REASON_MAX_LENGTH = 160
+
+
+def classification_json_schema() -> dict:
+    """JSON schema for Ollama's ``format`` parameter, derived from ``LLMClassification``."""
+
+    schema = LLMClassification.model_json_schema()
+    schema["properties"] = {
+        "label": {"type": "string", "enum": list(LABELS)},
+        "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+        "reason": {"type": "string", "maxLength": REASON_MAX_LENGTH},
+    }
+    schema["required"] = ["label", "confidence", "reason"]
+    return schema
+
+
+def batch_classification_json_schema() -> dict:
+    """Schema for batched answers: a bare ``[{id, label, confidence, reason}, ...]`` array.
+
+    The same shape the batch prompt asks for and early stopping waits for.
+    """
+
+    item = classification_json_schema()
+    item["properties"] = {"id": {"type": "integer"}, **item["properties"]}
+    item["required"] = ["id", *item["required"]]
+    item.pop("title", None)
+    return {"type": "array", "items": item}
+
+
 class ClassificationError(RuntimeError):
     """Raised when we cannot classify a message."""
 
@@ -2,14 +2,48 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import time
+from dataclasses import dataclass, fields
+from typing import Awaitable, Callable, Literal, Sequence, TypeVar
 
 import httpx
-from tenacity import AsyncRetrying, RetryError, retry_if_exception_type, stop_after_attempt, wait_exponential
+from tenacity import AsyncRetrying, RetryError, retry_if_exception_type, wait_exponential
+
+from .breaker import CircuitBreaker, RetryBudget, retry_stop
+from .deadlines import AdaptiveTimeout
+from .json_extract import IncrementalJsonExtractor
+from .metrics import Metrics
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# A generation whose model load took longer than this started from a cold model.
+COLD_LOAD_SECONDS = 0.25
+# Streams cancelled early carry no load_duration; treat a slow first token as cold.
+COLD_FIRST_TOKEN_SECONDS = 2.0
+
+
+@dataclass
+class GenerationStats:
+    """Timing and token counts for one streamed generation."""
+
+    elapsed: float = 0.0
+    time_to_first_token: float | None = None
+    time_to_json: float | None = None
+    tokens: int = 0
+    tokens_saved: int = 0
+    stopped_early: bool = False
+
+    def reset(self) -> None:
+        """Forget a failed attempt, so a retried generation reports only the attempt that answered."""
+
+        for field in fields(self):
+            setattr(self, field.name, field.default)
+
 
 class OllamaError(RuntimeError):
     """Raised when the Ollama request ultimately fails."""
@@ -22,14 +56,25 @@ class OllamaClient:
         model: str,
         timeout: float,
         max_retries: int,
+        keep_alive: str | None = None,
+        metrics: Metrics | None = None,
+        *,
+        breaker: CircuitBreaker | None = None,
+        retry_budget: RetryBudget | None = None,
+        adaptive_timeout: AdaptiveTimeout | None = None,
     ) -> None:
         self.model = model
+        self._keep_alive = _parse_keep_alive(keep_alive)
+        self._metrics = metrics or Metrics()
         self._client = httpx.AsyncClient(base_url=base_url, timeout=timeout)
+        self._breaker = breaker
+        self._retry_budget = retry_budget
+        self._adaptive_timeout = adaptive_timeout
         self._retry = AsyncRetrying(
-            reraise=True,
-            stop=stop_after_attempt(max(1, max_retries)),
+            stop=retry_stop(max_retries, breaker=breaker, budget=retry_budget),
             wait=wait_exponential(multiplier=1, min=1, max=timeout),
             retry=retry_if_exception_type(httpx.RequestError),
+            before_sleep=lambda _state: self._metrics.record_retry("ollama"),
         )
 
     async def close(self) -> None:
@@ -41,28 +86,247 @@ class OllamaClient:
     async def __aexit__(self, exc_type, exc, tb) -> None:  # type: ignore[override]
         await self.close()
 
-    async def generate(self, prompt: str, *, options: dict | None = None) -> str:
+    async def warm_up(self, *, model: str | None = None) -> float:
+        """Load ``model`` (default: the generation model) ahead of the first message.
+
+        Ollama loads a model without generating anything when the prompt is
+        empty. Returns the elapsed seconds.
+        """
+
+        payload: dict = {"model": model or self.model, "prompt": "", "stream": False}
+        if self._keep_alive is not None:
+            payload["keep_alive"] = self._keep_alive
+
+        started = time.perf_counter()
+        try:
+            response = await self._client.post("/api/generate", json=payload)
+            response.raise_for_status()
+        except httpx.HTTPError as exc:
+            raise OllamaError(f"Warm-up failed: {exc}") from exc
+        elapsed = time.perf_counter() - started
+        self._metrics.ollama_warm_up_seconds = elapsed
+        logger.info("Warmed up Ollama model %s in %.2fs", payload["model"], elapsed)
+        return elapsed
+
+    async def ping(self) -> None:
+        """Cheap liveness check that does not touch the model."""
+
+        try:
+            response = await self._client.get("/api/version")
+            response.raise_for_status()
+        except httpx.HTTPError as exc:
+            raise OllamaError(f"Ping failed: {exc}") from exc
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        model: str | None = None,
+        options: dict | None = None,
+        system: str | None = None,
+        format: str | dict | None = None,
+        stream: bool = False,
+        stop_after_json: Literal["object", "array"] | None = None,
+        stats: GenerationStats | None = None,
+    ) -> str:
+        """Generate a completion for ``prompt`` with ``model`` or the client's model.
+
+        With ``stream`` the NDJSON response is consumed incrementally and, when
+        ``stop_after_json`` is given, the request is cancelled as soon as the
+        first top-level JSON value of that kind is complete.
+        """
+
         payload = {
-            "model": self.model,
+            "model": model or self.model,
             "prompt": prompt,
-            "stream": False,
+            "stream": stream,
         }
+        if system:
+            payload["system"] = system
+        if format:
+            payload["format"] = format
         if options:
             payload["options"] = options
+        if self._keep_alive is not None:
+            payload["keep_alive"] = self._keep_alive
+
+        async def attempt() -> str:
+            if stream:
+                return await self._generate_streaming(payload, stop_after_json, stats or GenerationStats())
+            started = time.perf_counter()
+            response = await self._client.post("/api/generate", json=payload)
+            response.raise_for_status()
+            data = response.json()
+            text = data.get("response")
+            if not isinstance(text, str):
+                raise OllamaError("Ollama response missing 'response' field")
+            self._record_timing(data, time.perf_counter() - started)
+            return text
+
+        try:
+            return await self._call(attempt, key=payload["model"])
+        except json.JSONDecodeError as exc:
+            raise OllamaError(f"Invalid JSON from Ollama: {exc}") from exc
+        except httpx.HTTPError as exc:
+            raise OllamaError(f"Generation request failed: {exc}") from exc
 
+    async def embed(self, texts: Sequence[str], *, model: str | None = None) -> list[list[float]]:
+        """Embed ``texts`` in one ``/api/embed`` request, using ``model`` or the generation model."""
+
+        payload: dict = {"model": model or self.model, "input": list(texts)}
+        if self._keep_alive is not None:
+            payload["keep_alive"] = self._keep_alive
+
+        # Embeddings are much faster than generations, so they keep their own latency history.
+        key = f"embed:{payload['model']}"
+
+        async def attempt() -> list[list[float]]:
+            response = await self._client.post("/api/embed", json=payload)
+            response.raise_for_status()
+            embeddings = response.json().get("embeddings")
+            if not isinstance(embeddings, list) or len(embeddings) != len(payload["input"]):
+                raise OllamaError("Ollama embed response has the wrong number of embeddings")
+            return embeddings
+
+        try:
+            return await self._call(attempt, key=key)
+        except json.JSONDecodeError as exc:
+            raise OllamaError(f"Invalid JSON from Ollama: {exc}") from exc
+        except httpx.HTTPError as exc:
+            # Typically the embedding model has not been pulled (404).
+            raise OllamaError(f"Embedding request failed: {exc}") from exc
+
+    async def _call(self, attempt_fn: Callable[[], Awaitable[T]], *, key: str) -> T:
+        """Run ``attempt_fn`` with retries, behind the circuit breaker and the retry budget.
+
+        With an adaptive timeout, each attempt as a whole (a streamed generation
+        included) must finish within the current limit for ``key``, and
+        successful attempts feed that limit.
+        """
+
+        breaker = self._breaker
+        if breaker is not None and not breaker.allow():
+            raise OllamaError(f"Ollama circuit breaker is {breaker.state}; retry in {breaker.retry_after:.1f}s")
+        if self._retry_budget is not None:
+            self._retry_budget.record_request()
         try:
             async for attempt in self._retry:
                 with attempt:
-                    response = await self._client.post("/api/generate", json=payload)
-                    response.raise_for_status()
-                    data = response.json()
-                    text = data.get("response")
-                    if not isinstance(text, str):
-                        raise OllamaError("Ollama response missing 'response' field")
-                    return text
+                    started = time.perf_counter()
+                    try:
+                        result = await self._within_timeout(attempt_fn, key)
+                    except Exception as exc:
+                        if isinstance(exc, httpx.TimeoutException):
+                            self._metrics.ollama_timeouts += 1
+                        self._record_outcome(exc)
+                        raise
+                    self._record_outcome(None)
+                    if self._adaptive_timeout is not None:
+                        self._adaptive_timeout.observe(key, time.perf_counter() - started)
+                    return result
         except RetryError as exc:
-            raise OllamaError(str(exc.last_attempt.exception())) from exc
-        except json.JSONDecodeError as exc:
-            raise OllamaError(f"Invalid JSON from Ollama: {exc}") from exc
+            error = exc.last_attempt.exception()
+            raise OllamaError(str(error)) from error
 
         raise OllamaError("Ollama request failed without raising an exception")
+
+    def _record_outcome(self, exc: BaseException | None) -> None:
+        if self._breaker is None:
+            return
+        # A 4xx (e.g. a model that was never pulled) is a configuration problem, not an outage.
+        if exc is None or (isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code < 500):
+            self._breaker.record_success()
+        else:
+            self._breaker.record_failure()
+
+    async def _generate_streaming(
+        self,
+        payload: dict,
+        stop_after_json: Literal["object", "array"] | None,
+        stats: GenerationStats,
+    ) -> str:
+        extractor: IncrementalJsonExtractor | None = None
+        if stop_after_json is not None:
+            extractor = IncrementalJsonExtractor("[" if stop_after_json == "array" else "{")
+
+        stats.reset()
+        parts: list[str] = []
+        final: dict | None = None
+        started = time.perf_counter()
+        # Leaving the block closes the connection, which makes Ollama stop generating.
+        async with self._client.stream("POST", "/api/generate", json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if "error" in data:
+                    raise OllamaError(f"Ollama stream error: {data['error']}")
+                chunk = data.get("response") or ""
+                if chunk:
+                    if stats.time_to_first_token is None:
+                        stats.time_to_first_token = time.perf_counter() - started
+                    parts.append(chunk)
+                    stats.tokens += 1
+                if extractor is not None and stats.time_to_json is None and extractor.feed(chunk) is not None:
+                    stats.time_to_json = time.perf_counter() - started
+                if data.get("done"):
+                    final = data
+                    break
+                if stats.time_to_json is not None:
+                    stats.stopped_early = True
+                    break
+
+        stats.elapsed = time.perf_counter() - started
+        if final is not None:
+            stats.tokens = final.get("eval_count") or stats.tokens
+            self._record_timing(final, stats.elapsed)
+        else:
+            cold = (stats.time_to_first_token or 0.0) >= COLD_FIRST_TOKEN_SECONDS
+            self._metrics.record_generation(stats.elapsed, cold=cold)
+        if stats.stopped_early:
+            budget = (payload.get("options") or {}).get("num_predict")
+            if budget:
+                stats.tokens_saved = max(0, budget - stats.tokens)
+        self._metrics.record_stream(
+            tokens=stats.tokens,
+            tokens_saved=stats.tokens_saved,
+            stopped_early=stats.stopped_early,
+            time_to_label=stats.time_to_json,
+        )
+        return "".join(parts)
+
+    async def _within_timeout(self, attempt_fn: Callable[[], Awaitable[T]], key: str) -> T:
+        # Without an adaptive timeout the client's static (per read) timeout applies.
+        if self._adaptive_timeout is None:
+            return await attempt_fn()
+        limit = self._adaptive_timeout.timeout(key)
+        timeout = asyncio.timeout(limit)
+        try:
+            async with timeout:
+                return await attempt_fn()
+        except TimeoutError as exc:
+            if not timeout.expired():
+                raise
+            # Retried and counted by the breaker like any other timeout.
+            raise httpx.ReadTimeout(f"Ollama request exceeded the adaptive timeout of {limit:.2f}s") from exc
+
+    def _record_timing(self, data: dict, elapsed: float) -> None:
+        load_seconds = (data.get("load_duration") or 0) / 1e9
+        cold = load_seconds >= COLD_LOAD_SECONDS
+        self._metrics.record_generation(elapsed, cold=cold)
+        if data.get("prompt_eval_count"):
+            self._metrics.record_prompt_eval(data["prompt_eval_count"], (data.get("prompt_eval_duration") or 0) / 1e9)
+        if cold:
+            logger.info("Ollama model %s was cold; load took %.2fs of %.2fs", self.model, load_seconds, elapsed)
+
+
+def _parse_keep_alive(value: str | None) -> str | float | None:
+    """Ollama accepts durations such as ``"30m"`` or a number of seconds (negative keeps the model loaded)."""
+
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return value
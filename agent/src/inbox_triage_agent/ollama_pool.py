@@ -0,0 +1,232 @@
+"""Route generations across several Ollama servers."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Sequence, TypeVar
+
+import httpx
+
+from .breaker import RetryBudget
+from .deadlines import AdaptiveTimeout
+from .metrics import Metrics
+from .ollama_client import OllamaClient, OllamaError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def parse_node_specs(value: str, *, default_concurrency: int = 1) -> list[tuple[str, int]]:
+    """Parse ``"http://a:11434=2,http://b:11434"`` into ``[(url, concurrency), ...]``."""
+
+    nodes: list[tuple[str, int]] = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        url, separator, concurrency = item.rpartition("=")
+        if not separator or not concurrency.isdigit():
+            url, concurrency = item, str(default_concurrency)
+        nodes.append((url, max(1, int(concurrency))))
+    if not nodes:
+        raise ValueError("no Ollama nodes configured")
+    return nodes
+
+
+class OllamaNode:
+    """One Ollama server with its concurrency cap and health state."""
+
+    def __init__(self, url: str, client: OllamaClient, concurrency: int) -> None:
+        self.url = url
+        self.client = client
+        self.concurrency = concurrency
+        self.active = 0
+        self.consecutive_failures = 0
+        self.healthy = True
+
+    @property
+    def load(self) -> float:
+        return self.active / self.concurrency
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and self.active < self.concurrency
+
+
+class OllamaPool:
+    """Drop-in replacement for :class:`OllamaClient` backed by several servers.
+
+    Each ``generate`` goes to the healthy node with the lowest share of its
+    concurrency cap in use, and waits when every healthy node is at its cap.
+    A node is ejected after ``eject_after`` consecutive failures and probed in
+    the background until it answers again, which makes ejection the per-node
+    circuit breaker. A failed request is retried once on each other healthy
+    node before the error reaches the caller; 4xx replies reach it at once and
+    do not count against the node. All nodes draw their own retries
+    from the shared ``retry_budget`` and share one ``adaptive_timeout``.
+    """
+
+    def __init__(
+        self,
+        nodes: Sequence[tuple[str, int]],
+        model: str,
+        timeout: float,
+        max_retries: int,
+        keep_alive: str | None = None,
+        metrics: Metrics | None = None,
+        *,
+        eject_after: int = 3,
+        probe_interval: float = 15.0,
+        retry_budget: RetryBudget | None = None,
+        adaptive_timeout: AdaptiveTimeout | None = None,
+    ) -> None:
+        if not nodes:
+            raise ValueError("OllamaPool needs at least one node")
+        self.model = model
+        self._metrics = metrics or Metrics()
+        self._eject_after = max(1, eject_after)
+        self._probe_interval = probe_interval
+        self._nodes = [
+            OllamaNode(
+                url,
+                OllamaClient(
+                    url,
+                    model,
+                    timeout,
+                    max_retries,
+                    keep_alive=keep_alive,
+                    metrics=self._metrics,
+                    retry_budget=retry_budget,
+                    adaptive_timeout=adaptive_timeout,
+                ),
+                max(1, concurrency),
+            )
+            for url, concurrency in nodes
+        ]
+        self._changed = asyncio.Condition()
+        self._probes: dict[str, asyncio.Task[None]] = {}
+
+    @property
+    def nodes(self) -> tuple[OllamaNode, ...]:
+        return tuple(self._nodes)
+
+    async def close(self) -> None:
+        for task in self._probes.values():
+            task.cancel()
+        await asyncio.gather(*self._probes.values(), return_exceptions=True)
+        self._probes.clear()
+        await asyncio.gather(*(node.client.close() for node in self._nodes))
+
+    async def __aenter__(self) -> "OllamaPool":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:  # type: ignore[override]
+        await self.close()
+
+    async def warm_up(self, *, model: str | None = None) -> float:
+        """Warm every node concurrently; fails only when no node could be warmed."""
+
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(node.client.warm_up(model=model) for node in self._nodes), return_exceptions=True
+        )
+        failures = [(node, result) for node, result in zip(self._nodes, results) if isinstance(result, BaseException)]
+        for node, exc in failures:
+            logger.warning("Warm-up failed for Ollama node %s: %s", node.url, exc)
+        if len(failures) == len(self._nodes):
+            raise OllamaError("Warm-up failed on every Ollama node")
+        elapsed = time.perf_counter() - started
+        self._metrics.ollama_warm_up_seconds = elapsed
+        return elapsed
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        return await self._dispatch(lambda client: client.generate(prompt, **kwargs))
+
+    async def embed(self, texts: Sequence[str], *, model: str | None = None) -> list[list[float]]:
+        return await self._dispatch(lambda client: client.embed(texts, model=model))
+
+    async def _dispatch(self, call: Callable[[OllamaClient], Awaitable[T]]) -> T:
+        tried: set[str] = set()
+        last_error: BaseException | None = None
+        while True:
+            node = await self._acquire(exclude=tried)
+            if node is None:
+                if last_error is not None:
+                    raise OllamaError(str(last_error)) from last_error
+                raise OllamaError("No healthy Ollama nodes")
+            tried.add(node.url)
+            started = time.perf_counter()
+            try:
+                result = await call(node.client)
+            except (OllamaError, httpx.HTTPError) as exc:
+                if _is_client_error(exc):
+                    # A 4xx (e.g. a model this node has not pulled) says nothing about the node's health.
+                    raise
+                last_error = exc
+                await self._record_failure(node, exc)
+            else:
+                node.consecutive_failures = 0
+                self._metrics.record_node_request(node.url, time.perf_counter() - started)
+                return result
+            finally:
+                await self._release(node)
+
+    async def _acquire(self, *, exclude: set[str]) -> OllamaNode | None:
+        async with self._changed:
+            while True:
+                candidates = [node for node in self._nodes if node.healthy and node.url not in exclude]
+                if not candidates:
+                    return None
+                available = [node for node in candidates if node.active < node.concurrency]
+                if available:
+                    node = min(available, key=lambda candidate: candidate.load)
+                    node.active += 1
+                    return node
+                await self._changed.wait()
+
+    async def _release(self, node: OllamaNode) -> None:
+        async with self._changed:
+            node.active -= 1
+            self._changed.notify_all()
+
+    async def _record_failure(self, node: OllamaNode, exc: BaseException) -> None:
+        self._metrics.record_node_request(node.url, None)
+        node.consecutive_failures += 1
+        logger.warning("Ollama node %s failed (%s in a row): %s", node.url, node.consecutive_failures, exc)
+        if node.healthy and node.consecutive_failures >= self._eject_after:
+            node.healthy = False
+            self._metrics.ollama_node_ejections[node.url] = self._metrics.ollama_node_ejections.get(node.url, 0) + 1
+            logger.error("Ejecting Ollama node %s after %s consecutive failures", node.url, node.consecutive_failures)
+            self._probes[node.url] = asyncio.create_task(self._probe(node))
+            async with self._changed:
+                # Waiters must re-check: their only candidate may be gone.
+                self._changed.notify_all()
+
+    async def _probe(self, node: OllamaNode) -> None:
+        while True:
+            await asyncio.sleep(self._probe_interval)
+            try:
+                await node.client.ping()
+            except OllamaError as exc:
+                logger.debug("Ollama node %s still unhealthy: %s", node.url, exc)
+                continue
+            async with self._changed:
+                node.healthy = True
+                node.consecutive_failures = 0
+                self._changed.notify_all()
+            self._probes.pop(node.url, None)
+            logger.info("Re-admitted Ollama node %s", node.url)
+            return
+
+
+def _is_client_error(exc: BaseException | None) -> bool:
+    """Whether ``exc`` (or the error it wraps) is an HTTP 4xx response."""
+
+    while exc is not None:
+        if isinstance(exc, httpx.HTTPStatusError):
+            return exc.response.status_code < 500
+        exc = exc.__cause__
+    return False
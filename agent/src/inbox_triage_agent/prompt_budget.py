@@ -0,0 +1,109 @@
+"""Prompt compaction: keep informative headers and fit snippets into a token budget."""
+
+from __future__ import annotations
+
+from .metrics import Metrics
+from .models import Message
+
+# Headers that say who sent the mail and whether it is bulk or automated.
+INFORMATIVE_HEADERS = frozenset(
+    {
+        "from",
+        "reply-to",
+        "sender",
+        "list-unsubscribe",
+        "list-id",
+        "precedence",
+        "auto-submitted",
+        "x-auto-response-suppress",
+        "x-mailer",
+    }
+)
+# Fragments of ``X-`` header names set by applicant tracking systems and job boards.
+ATS_MARKERS = (
+    "ashby",
+    "bamboohr",
+    "greenhouse",
+    "icims",
+    "indeed",
+    "jobvite",
+    "lever",
+    "linkedin",
+    "smartrecruiters",
+    "successfactors",
+    "taleo",
+    "teamtailor",
+    "workable",
+    "workday",
+)
+# Kept header values are cut to this many characters; List-Unsubscribe URLs run long.
+HEADER_VALUE_CHARS = 160
+# Llama-family tokenizers average about four characters of English per token.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token count estimate from the character length."""
+
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Cut ``text`` at a word boundary so it fits in about ``budget`` tokens."""
+
+    if estimate_tokens(text) <= budget:
+        return text
+    limit = max(0, budget) * CHARS_PER_TOKEN
+    space = text.rfind(" ", 0, limit)
+    if space > limit // 2:
+        limit = space
+    return text[:limit].rstrip() + " …"
+
+
+def is_informative_header(name: str) -> bool:
+    lowered = name.lower()
+    return lowered in INFORMATIVE_HEADERS or (
+        lowered.startswith("x-") and any(marker in lowered for marker in ATS_MARKERS)
+    )
+
+
+class PromptCompactor:
+    """Shrink a message before it is rendered into a prompt.
+
+    Transport headers (DKIM signatures, ARC chains, ``Received`` hops) carry
+    no label signal but can cost thousands of prompt tokens, so only
+    :func:`is_informative_header` headers are kept with ``prune_headers``.
+    Snippets longer than ``snippet_tokens`` are truncated.
+    """
+
+    def __init__(
+        self,
+        *,
+        snippet_tokens: int | None = 256,
+        prune_headers: bool = True,
+        metrics: Metrics | None = None,
+    ) -> None:
+        self._snippet_tokens = snippet_tokens if snippet_tokens and snippet_tokens > 0 else None
+        self._prune_headers = prune_headers
+        self._metrics = metrics or Metrics()
+
+    def compact(self, message: Message) -> Message:
+        update: dict = {}
+        if self._prune_headers and message.raw_headers:
+            kept = {
+                name: _clip(value) for name, value in message.raw_headers.items() if is_informative_header(name)
+            }
+            self._metrics.prompt_headers_dropped += len(message.raw_headers) - len(kept)
+            update["raw_headers"] = kept
+        if self._snippet_tokens is not None and message.snippet:
+            snippet = truncate_to_tokens(message.snippet, self._snippet_tokens)
+            if snippet != message.snippet:
+                self._metrics.prompt_snippets_truncated += 1
+                update["snippet"] = snippet
+        return message.model_copy(update=update) if update else message
+
+
+def _clip(value: object) -> object:
+    if isinstance(value, str) and len(value) > HEADER_VALUE_CHARS:
+        return value[:HEADER_VALUE_CHARS] + "…"
+    return value
@@ -0,0 +1,76 @@
+"""Local HTTP receiver for new-message notifications from the Rails API."""
+
+from __future__ import annotations
+
+import hmac
+import json
+import logging
+from typing import Callable
+
+from .httpd import HttpRequest, HttpResponse, TinyHttpServer
+
+logger = logging.getLogger(__name__)
+
+
+class PushReceiver:
+    """Accepts ``POST /notify`` with ``{"message_ids": [...]}`` and hands the ids to ``on_ids``.
+
+    It is meant to listen on localhost or a private network, next to the API
+    that calls it; set ``token`` to require a bearer token.
+    """
+
+    def __init__(
+        self,
+        on_ids: Callable[[list[int]], None],
+        *,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        token: str | None = None,
+    ) -> None:
+        self._on_ids = on_ids
+        self._host = host
+        self._token = token
+        self._server = TinyHttpServer(self._dispatch, host=host, port=port)
+
+    @property
+    def port(self) -> int:
+        return self._server.port
+
+    async def start(self) -> None:
+        await self._server.start()
+        logger.info("Listening for push notifications on http://%s:%s/notify", self._host, self.port)
+
+    async def close(self) -> None:
+        await self._server.close()
+
+    async def __aenter__(self) -> "PushReceiver":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:  # type: ignore[override]
+        await self.close()
+
+    def _dispatch(self, request: HttpRequest) -> HttpResponse:
+        if request.path == "/health" and request.method == "GET":
+            return _json(200, {"status": "ok"})
+        if request.path != "/notify":
+            return _json(404, {"error": "not found"})
+        if request.method != "POST":
+            return _json(405, {"error": "use POST"})
+        authorization = request.headers.get("authorization", "")
+        if self._token and not hmac.compare_digest(authorization, f"Bearer {self._token}"):
+            return _json(401, {"error": "invalid token"})
+
+        try:
+            ids = json.loads(request.body or b"{}").get("message_ids")
+        except (json.JSONDecodeError, AttributeError):
+            ids = None
+        if not isinstance(ids, list) or not all(isinstance(item, int) and not isinstance(item, bool) for item in ids):
+            return _json(400, {"error": "message_ids must be a list of integers"})
+
+        self._on_ids(ids)
+        return _json(202, {"accepted": len(ids)})
+
+
+def _json(status: int, body: dict) -> HttpResponse:
+    return HttpResponse(status, json.dumps(body).encode())
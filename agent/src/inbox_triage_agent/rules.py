@@ -2,35 +2,246 @@
 
 from __future__ import annotations
 
+import json
 import re
-from typing import Pattern
+from dataclasses import dataclass
+from functools import lru_cache
+from importlib import resources
+from pathlib import Path
+from typing import Any, Sequence
 
 from .models import LABELS
 
-_RULES: dict[str, Pattern[str]] = {
-    "offer": re.compile(r"\boffer\b|compensation|package", re.I),
-    "interview_invite": re.compile(r"\b(interview|invite|phone screen|onsite|loop)\b", re.I),
-    "oa": re.compile(r"(hacker ?rank|codility|codesignal|karat|online assessment|challenge|take-?home)", re.I),
-    "recruiter_reply": re.compile(r"(connect|schedule|chat|next steps|availability)", re.I),
-    "rejection": re.compile(r"(regret to inform|unfortunately|not moving forward)", re.I),
-    "auto_ack": re.compile(r"(thank you for applying|we received your application|application received)", re.I),
-    "not_job_related": re.compile(r"unsubscribe|newsletter|promo", re.I),
-}
-
-_PRIORITY: tuple[str, ...] = (
-    "offer",
-    "interview_invite",
-    "oa",
-    "recruiter_reply",
-    "rejection",
-    "auto_ack",
-    "not_job_related",
-)
-
-
-def classify_with_rules(text: str) -> str:
-    haystack = text or ""
-    for label in _PRIORITY:
-        if _RULES[label].search(haystack):
-            return label
-    return "other"
+
+@dataclass(frozen=True)
+class RuleGroup:
+    """Literal phrases (or one raw pattern) that point at a label with one precision."""
+
+    label: str
+    phrases: tuple[str, ...] = ()
+    words: bool = False
+    pattern: str | None = None
+    precision: float | None = None
+
+
+@dataclass(frozen=True)
+class RuleMatch:
+    label: str
+    start: int
+    end: int
+    text: str
+    precision: float | None = None
+
+
+class _TrieNode:
+    __slots__ = ("children", "terminals")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        # (marker group name, whole-word match, phrase length)
+        self.terminals: list[tuple[str, bool, int]] = []
+
+
+def _render_trie(node: _TrieNode) -> str:
+    """Render a phrase trie as one regular expression.
+
+    Shared prefixes are matched once and each phrase ends in an empty named
+    group identifying its rule, so the cost of a scan stays flat as phrases
+    are added instead of growing with every extra alternative.
+    """
+
+    branches = [re.escape(char) + _render_trie(child) for char, child in sorted(node.children.items())]
+    ends = []
+    for name, words, length in node.terminals:
+        if words:
+            # Whole word: no word character right after the phrase or right before it.
+            ends.append(rf"(?!\w)(?<!\w[\s\S]{{{length}}})(?P<{name}>)")
+        else:
+            ends.append(f"(?P<{name}>)")
+    # Longer phrases are tried before the phrases they extend.
+    alternatives = branches + ends
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return "(?:" + "|".join(alternatives) + ")"
+
+
+class RuleSet:
+    """Rule groups compiled into a single expression scanned once per message.
+
+    Text is lowercased once and matched case-sensitively, so raw ``patterns``
+    in a rules file must be written in lowercase. The expression only finds
+    where matches start; every phrase and pattern matching at that character
+    is then reported, so that priority decides between overlapping phrases.
+    """
+
+    def __init__(self, groups: Sequence[RuleGroup], priority: Sequence[str]) -> None:
+        unknown = {group.label for group in groups} - set(priority)
+        if unknown:
+            raise ValueError(f"rules reference labels missing from priority: {sorted(unknown)}")
+        invalid = set(priority) - set(LABELS)
+        if invalid:
+            raise ValueError(f"priority contains unknown labels: {sorted(invalid)}")
+
+        self._priority = tuple(priority)
+        rank = {label: index for index, label in enumerate(self._priority)}
+        # Most important and most precise groups first, so that they win when
+        # the same phrase is listed for several groups.
+        ordered = sorted(
+            groups,
+            key=lambda group: (rank[group.label], -(group.precision if group.precision is not None else -1.0)),
+        )
+        self._groups = tuple(ordered)
+        # Every phrase ends in its own marker group; map markers back to rules.
+        self._markers: dict[str, tuple[RuleGroup, int]] = {}
+        self._patterns: list[tuple[str, re.Pattern[str]]] = []
+
+        root = _TrieNode()
+        seen: set[tuple[str, bool]] = set()
+        alternatives: list[str] = []
+        for group in self._groups:
+            group_rank = rank[group.label]
+            if group.pattern is not None:
+                name = f"m{len(self._markers)}"
+                self._markers[name] = (group, group_rank)
+                alternatives.append(f"(?:{group.pattern})(?P<{name}>)")
+                self._patterns.append((name, re.compile(group.pattern)))
+                continue
+            for phrase in group.phrases:
+                phrase = phrase.lower()
+                if not phrase or (phrase, group.words) in seen:
+                    continue
+                seen.add((phrase, group.words))
+                node = root
+                for char in phrase:
+                    node = node.children.setdefault(char, _TrieNode())
+                name = f"m{len(self._markers)}"
+                self._markers[name] = (group, group_rank)
+                node.terminals.append((name, group.words, len(phrase)))
+        self._root = root
+        if root.children:
+            alternatives.insert(0, _render_trie(root))
+        self._pattern = re.compile("|".join(alternatives) if alternatives else "(?!)")
+
+    @property
+    def priority(self) -> tuple[str, ...]:
+        return self._priority
+
+    @property
+    def groups(self) -> tuple[RuleGroup, ...]:
+        return self._groups
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "RuleSet":
+        groups: list[RuleGroup] = []
+        for entry in data.get("rules", []):
+            label = entry["label"]
+            precision = entry.get("precision")
+            if entry.get("phrases"):
+                groups.append(RuleGroup(label, phrases=tuple(entry["phrases"]), precision=precision))
+            if entry.get("words"):
+                groups.append(RuleGroup(label, phrases=tuple(entry["words"]), words=True, precision=precision))
+            for pattern in entry.get("patterns", []):
+                groups.append(RuleGroup(label, pattern=pattern, precision=precision))
+        return cls(groups, data["priority"])
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "RuleSet":
+        with open(path, encoding="utf-8") as handle:
+            return cls.from_dict(json.load(handle))
+
+    def scan(self, text: str, *, stop_at_top: bool = False) -> list[RuleMatch]:
+        """Return every rule match in ``text``, in order of start position."""
+
+        haystack = (text or "").lower()
+        matches: list[RuleMatch] = []
+        search = self._pattern.search
+        position = 0
+        while True:
+            found = search(haystack, position)
+            if found is None:
+                break
+            start = found.start()
+            top = False
+            for name, end in self._matches_at(haystack, start):
+                group, group_rank = self._markers[name]
+                matches.append(RuleMatch(group.label, start, end, haystack[start:end], group.precision))
+                top = top or group_rank == 0
+            if stop_at_top and top:
+                break
+            # Resume just after the start so overlapping phrases are still seen.
+            position = start + 1
+        return matches
+
+    def _matches_at(self, haystack: str, start: int) -> list[tuple[str, int]]:
+        """Markers and end offsets of every phrase and pattern matching at ``start``.
+
+        The compiled expression reports only the longest phrase, so shorter
+        phrases ending inside it are collected by walking the trie.
+        """
+
+        found: list[tuple[str, int]] = []
+        word_before = start > 0 and _is_word_char(haystack[start - 1])
+        node = self._root
+        end = start
+        while end < len(haystack):
+            node = node.children.get(haystack[end])  # type: ignore[assignment]
+            if node is None:
+                break
+            end += 1
+            for name, words, _length in node.terminals:
+                if words and (word_before or (end < len(haystack) and _is_word_char(haystack[end]))):
+                    continue
+                found.append((name, end))
+        for name, pattern in self._patterns:
+            match = pattern.match(haystack, start)
+            if match is not None:
+                found.append((name, match.end()))
+        return found
+
+    def classify(self, text: str) -> str:
+        matches = self.scan(text, stop_at_top=True)
+        if not matches:
+            return "other"
+        return min((match.label for match in matches), key=self._priority.index)
+
+    def classify_confident(self, text: str, *, min_precision: float) -> tuple[str, float, str] | None:
+        matches = self.scan(text)
+        # A phrase for any other label vetoes the shortcut, precise or not.
+        if len({match.label for match in matches}) != 1:
+            return None
+        precise = [match for match in matches if match.precision is not None]
+        if not precise:
+            return None
+        match = max(precise, key=lambda candidate: candidate.precision)  # type: ignore[arg-type, return-value]
+        if match.precision < min_precision:  # type: ignore[operator]
+            return None
+        return match.label, match.precision, match.text  # type: ignore[return-value]
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+@lru_cache(maxsize=1)
+def default_rules() -> RuleSet:
+    data = resources.files(__package__).joinpath("data", "rules.json").read_text(encoding="utf-8")
+    return RuleSet.from_dict(json.loads(data))
+
+
+def classify_with_rules(text: str, *, rules: RuleSet | None = None) -> str:
+    return (rules or default_rules()).classify(text)
+
+
+def classify_with_confident_rules(
+    text: str,
+    *,
+    min_precision: float,
+    rules: RuleSet | None = None,
+) -> tuple[str, float, str] | None:
+    """Return ``(label, precision, phrase)`` when a high-precision phrase decides the label.
+
+    Returns ``None`` when nothing matches, when the strongest match is below
+    ``min_precision`` or when phrases for different labels match.
+    """
+
+    return (rules or default_rules()).classify_confident(text, min_precision=min_precision)
@@ -5,114 +5,841 @@ from __future__ import annotations
 import asyncio
 import logging
 import signal
-from dataclasses import dataclass
+import time
+from typing import Callable, TypeVar
 
+from .adaptive import AdaptiveController
 from .api_client import ApiClient, ApiError
-from .classifier import ClassificationEngine
-from .models import Message
-from .ollama_client import OllamaClient
-from .settings import get_settings
+from .backlog import BacklogScanner
+from .breaker import CircuitBreaker, RetryBudget
+from .cache import ClassificationCache
+from .cascade import CascadeTier, parse_cascade
+from .classifier import ClassificationEngine, count_generations, message_deadline
+from .deadlines import AdaptiveTimeout
+from .journal import UpdateJournal
+from .knn import EmbeddingIndex
+from .local_model import NaiveBayesModel
+from .metrics import Metrics
+from .metrics_server import MetricsServer
+from .models import Message, UpdatePayload
+from .ollama_client import OllamaClient, OllamaError
+from .ollama_pool import OllamaPool, parse_node_specs
+from .priority import PriorityScheduler, PriorityScorer
+from .prompt_budget import PromptCompactor
+from .push import PushReceiver
+from .rules import RuleSet
+from .settings import Settings, get_settings
+from .threads import ThreadCache, dequoted
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
 
-@dataclass
-class Metrics:
-    processed: int = 0
-    classified_via_llm: int = 0
-    classified_via_rules: int = 0
-    failed: int = 0
-    last_error: str | None = None
-
-    def log_summary(self) -> None:
-        logger.info(
-            "Processed=%s success_llm=%s success_rules=%s failed=%s",
-            self.processed,
-            self.classified_via_llm,
-            self.classified_via_rules,
-            self.failed,
-        )
+# The API caps ``limit`` at 100 rows per request.
+MAX_FETCH_LIMIT = 100
+# Most replies of one thread sent to the LLM in a single prompt.
+MAX_THREAD_PROMPT = 10
 
 
 async def worker_loop(stop_event: asyncio.Event) -> None:
     settings = get_settings()
     logger.info(
-        "Starting inbox triage agent with batch_size=%s poll_interval=%s",
+        "Starting inbox triage agent with batch_size=%s poll_interval=%s classify_concurrency=%s api_concurrency=%s",
         settings.batch_size,
         settings.poll_interval_seconds,
+        settings.classify_concurrency,
+        settings.api_concurrency,
     )
 
     metrics = Metrics()
+    cascade: list[CascadeTier] = []
+    if settings.llm_cascade:
+        cascade = parse_cascade(settings.llm_cascade, default_confidence=settings.llm_min_confidence)
+        logger.info("Classifying with the model cascade %s", " -> ".join(tier.model for tier in cascade))
 
     async with ApiClient(
         base_url=str(settings.job_copilot_api_url),
         token=settings.job_copilot_api_token,
         timeout=settings.http_timeout_seconds,
         max_retries=settings.max_retries,
-    ) as api_client, OllamaClient(
+        metrics=metrics,
+        shard=(settings.shard_index, settings.shard_count),
+        breaker=_breaker("api", settings, metrics),
+        retry_budget=_retry_budget("api", settings, metrics),
+    ) as api_client, _build_llm_client(settings, metrics) as ollama_client:
+        if settings.ollama_warm_up:
+            try:
+                if cascade:
+                    for tier in cascade:
+                        await ollama_client.warm_up(model=tier.model)
+                else:
+                    await ollama_client.warm_up()
+            except OllamaError as exc:
+                logger.warning("Ollama warm-up failed; continuing cold: %s", exc)
+
+        cache: ClassificationCache | None = None
+        if settings.classification_cache_size > 0:
+            cache = ClassificationCache(
+                max_entries=settings.classification_cache_size,
+                path=settings.classification_cache_path,
+                max_rows=settings.classification_cache_max_rows,
+                max_age_seconds=settings.classification_cache_ttl_seconds,
+                metrics=metrics,
+            )
+        knn_index: EmbeddingIndex | None = None
+        if settings.knn_enabled:
+            knn_index = EmbeddingIndex(
+                capacity=settings.knn_capacity,
+                path=settings.knn_index_path,
+                metrics=metrics,
+            )
+        rules = RuleSet.from_file(settings.rules_path) if settings.rules_path else None
+        engine = ClassificationEngine(
+            ollama_client,
+            min_confidence=settings.llm_min_confidence,
+            cache=cache,
+            rules_short_circuit=settings.rules_short_circuit,
+            rules_min_precision=settings.rules_min_precision,
+            metrics=metrics,
+            rules=rules,
+            batch_fallback=settings.llm_batch_fallback,
+            use_system_prompt=settings.ollama_system_prompt,
+            stream=settings.ollama_stream,
+            output_format=settings.ollama_format,
+            knn_index=knn_index,
+            embed_model=settings.ollama_embed_model,
+            knn_k=settings.knn_k,
+            knn_min_similarity=settings.knn_min_similarity,
+            knn_min_confidence=settings.knn_min_confidence,
+            local_model=NaiveBayesModel.load(settings.local_model_path) if settings.local_model_path else None,
+            local_min_probability=settings.local_model_min_probability,
+            cascade=cascade,
+            compactor=PromptCompactor(
+                snippet_tokens=settings.prompt_snippet_tokens,
+                prune_headers=settings.prompt_header_whitelist,
+                metrics=metrics,
+            ),
+            hedge_quantile=settings.ollama_hedge_quantile if settings.ollama_hedge else None,
+        )
+        journal: UpdateJournal | None = None
+        if settings.journal_path:
+            journal = UpdateJournal(settings.journal_path, metrics=metrics)
+        pipeline = ClassificationPipeline(api_client, engine, metrics, settings, journal=journal, rules=rules)
+        receiver: PushReceiver | None = None
+        metrics_server: MetricsServer | None = None
+        progress: asyncio.Task[None] | None = None
+        try:
+            if settings.metrics_port is not None:
+                metrics_server = MetricsServer(metrics, host=settings.metrics_host, port=settings.metrics_port)
+                await metrics_server.start()
+            if settings.metrics_log_interval_seconds > 0:
+                progress = asyncio.create_task(_log_progress(metrics, settings.metrics_log_interval_seconds))
+            if settings.push_enabled:
+                receiver = PushReceiver(
+                    pipeline.notify,
+                    host=settings.push_host,
+                    port=settings.push_port,
+                    token=settings.push_token,
+                )
+                await receiver.start()
+            await pipeline.run(stop_event)
+        finally:
+            if progress is not None:
+                progress.cancel()
+            if metrics_server is not None:
+                await metrics_server.close()
+            if receiver is not None:
+                await receiver.close()
+            if cache is not None:
+                cache.close()
+            if knn_index is not None:
+                knn_index.close()
+            if journal is not None:
+                if len(journal):
+                    logger.info("Leaving %s journaled updates for the next start", len(journal))
+                journal.close()
+
+        metrics.log_summary()
+
+
+def _build_llm_client(settings: Settings, metrics: Metrics) -> OllamaClient | OllamaPool:
+    timeout = settings.ollama_timeout_seconds or settings.http_timeout_seconds
+    adaptive_timeout: AdaptiveTimeout | None = None
+    if settings.ollama_adaptive_timeout:
+        adaptive_timeout = AdaptiveTimeout(
+            timeout,
+            factor=settings.ollama_timeout_factor,
+            quantile=settings.ollama_timeout_quantile,
+            minimum=settings.ollama_min_timeout_seconds,
+        )
+        metrics.gauges["ollama_timeout_seconds"] = lambda: adaptive_timeout.timeout(settings.ollama_model)
+    if settings.ollama_urls:
+        nodes = parse_node_specs(settings.ollama_urls, default_concurrency=settings.ollama_node_concurrency)
+        logger.info("Routing generations across %s Ollama nodes", len(nodes))
+        return OllamaPool(
+            nodes,
+            model=settings.ollama_model,
+            timeout=timeout,
+            max_retries=settings.max_retries,
+            keep_alive=settings.ollama_keep_alive,
+            metrics=metrics,
+            eject_after=settings.ollama_eject_after,
+            probe_interval=settings.ollama_probe_interval_seconds,
+            retry_budget=_retry_budget("ollama", settings, metrics),
+            adaptive_timeout=adaptive_timeout,
+        )
+    return OllamaClient(
         base_url=str(settings.ollama_url),
         model=settings.ollama_model,
-        timeout=settings.http_timeout_seconds,
+        timeout=timeout,
         max_retries=settings.max_retries,
-    ) as ollama_client:
-        engine = ClassificationEngine(ollama_client, min_confidence=settings.llm_min_confidence)
+        keep_alive=settings.ollama_keep_alive,
+        metrics=metrics,
+        breaker=_breaker("ollama", settings, metrics),
+        retry_budget=_retry_budget("ollama", settings, metrics),
+        adaptive_timeout=adaptive_timeout,
+    )
+
+
+def _breaker(name: str, settings: Settings, metrics: Metrics) -> CircuitBreaker | None:
+    if settings.breaker_failure_threshold <= 0:
+        return None
+    return CircuitBreaker(
+        name,
+        failure_threshold=settings.breaker_failure_threshold,
+        reset_seconds=settings.breaker_reset_seconds,
+        metrics=metrics,
+    )
+
+
+def _retry_budget(name: str, settings: Settings, metrics: Metrics) -> RetryBudget:
+    return RetryBudget(
+        name,
+        ratio=settings.retry_budget_ratio,
+        min_per_second=settings.retry_budget_min_per_second,
+        metrics=metrics,
+    )
+
+
+class ClassificationPipeline:
+    """Staged fetch -> claim -> classify -> update pipeline.
+
+    Each stage runs its own pool of workers and hands messages to the next one
+    through a bounded queue, so claims and updates for neighbouring batches
+    overlap with LLM inference instead of waiting on it.
+    """
 
+    def __init__(
+        self,
+        api_client: ApiClient,
+        engine: ClassificationEngine,
+        metrics: Metrics,
+        settings: Settings,
+        *,
+        journal: UpdateJournal | None = None,
+        rules: RuleSet | None = None,
+    ) -> None:
+        self._api_client = api_client
+        self._engine = engine
+        self._metrics = metrics
+        self._settings = settings
+
+        queue_size = max(1, settings.pipeline_queue_size)
+        # Messages travel in groups up to classification: one Gmail thread, or a single message.
+        self._claim_queue: asyncio.Queue[list[Message]]
+        self._classify_queue: asyncio.Queue[list[Message]]
+        # Each message is scored once, when it is fetched; both queues reuse the score.
+        self._scorer: PriorityScorer | None = None
+        self._priorities: dict[int, float] = {}
+        if settings.priority_scheduling:
+            self._scorer = PriorityScorer(rules=rules)
+            # Unclaimed messages can wait without a claim expiring, so the first queue is the wide
+            # window the scheduler picks from.
+            self._claim_queue = PriorityScheduler(
+                self._priority,
+                maxsize=max(queue_size, settings.priority_queue_size),
+                aging=settings.priority_aging,
+                metrics=metrics,
+            )
+            # The claim queue already recorded these groups' scores.
+            self._classify_queue = PriorityScheduler(self._priority, maxsize=queue_size, aging=settings.priority_aging)
+        else:
+            self._claim_queue = asyncio.Queue(maxsize=queue_size)
+            self._classify_queue = asyncio.Queue(maxsize=queue_size)
+        self._update_queue: asyncio.Queue[tuple[Message, UpdatePayload]] = asyncio.Queue(maxsize=queue_size)
+        self._bulk_size = min(max(1, settings.api_bulk_size), MAX_FETCH_LIMIT)
+        self._in_flight: set[int] = set()
+        # Pushed ids waiting to be fetched, and when each pushed message arrived.
+        self._pushed: dict[int, float] = {}
+        self._push_times: dict[int, float] = {}
+        self._push_event = asyncio.Event()
+        self._fetched_at: dict[int, float] = {}
+        self._head_fetched_at = 0.0
+        self._backlog_idle = False
+        self._journal = journal
+        # Ids an update worker is posting right now; the journal flusher leaves them alone.
+        self._posting: set[int] = set()
+        self._journal_event = asyncio.Event()
+        self._api_down = False
+        if journal is not None:
+            metrics.gauges["journal_pending"] = journal.__len__
+        metrics.gauges.update(
+            claim_queue=self._claim_queue.qsize,
+            classify_queue=self._classify_queue.qsize,
+            update_queue=self._update_queue.qsize,
+            in_flight=lambda: len(self._in_flight),
+            pushed_pending=lambda: len(self._pushed),
+        )
+        self._adaptive: AdaptiveController | None = None
+        if settings.adaptive_polling:
+            self._adaptive = AdaptiveController(
+                batch_size=min(settings.batch_size, MAX_FETCH_LIMIT),
+                interval=settings.poll_interval_seconds,
+                max_batch_size=min(settings.max_batch_size, MAX_FETCH_LIMIT),
+                max_interval=settings.max_poll_interval_seconds,
+                claim_ttl=settings.claim_ttl_seconds,
+                metrics=metrics,
+            )
+        self._threads: ThreadCache | None = None
+        if settings.thread_aware:
+            threads = ThreadCache(
+                ttl=settings.thread_cache_ttl_seconds,
+                max_threads=settings.thread_cache_size,
+                metrics=metrics,
+            )
+            metrics.gauges["thread_cache"] = threads.__len__
+            self._threads = threads
+        self._scanner: BacklogScanner | None = None
+        if settings.backlog_scan:
+            self._scanner = BacklogScanner(
+                memory_size=settings.backlog_memory_size,
+                revisit_after=settings.backlog_revisit_seconds,
+            )
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    @property
+    def backlog_exhausted(self) -> bool:
+        return self._scanner is not None and self._scanner.exhausted
+
+    def notify(self, message_ids: list[int]) -> None:
+        """Queue ids announced by the API; the fetch loop picks them up immediately."""
+
+        now = time.monotonic()
+        shard_count = self._settings.shard_count
+        if shard_count > 1:
+            message_ids = [
+                message_id for message_id in message_ids if message_id % shard_count == self._settings.shard_index
+            ]
+        self._metrics.push_notifications += 1
+        self._metrics.push_ids += len(message_ids)
+        for message_id in message_ids:
+            if message_id not in self._in_flight:
+                self._pushed.setdefault(message_id, now)
+        self._push_event.set()
+
+    async def run(self, stop_event: asyncio.Event) -> None:
+        api_workers = max(1, self._settings.api_concurrency)
+        classify_workers = max(1, self._settings.classify_concurrency)
+        workers = [
+            *(asyncio.create_task(self._claim_worker(stop_event)) for _ in range(api_workers)),
+            *(asyncio.create_task(self._classify_worker()) for _ in range(classify_workers)),
+            *(asyncio.create_task(self._update_worker()) for _ in range(api_workers)),
+        ]
+        if self._journal is not None:
+            replayed = self._journal.message_ids
+            if replayed:
+                logger.info("Replaying %s journaled updates from a previous run", len(replayed))
+                self._metrics.journal_replayed += len(replayed)
+                # Journaled messages still look unclassified to the API; keep them out of fetches.
+                self._in_flight.update(replayed)
+            workers.append(asyncio.create_task(self._flush_journal(self._journal)))
+        try:
+            await self._fetch_loop(stop_event)
+            # Drain: unclaimed messages are dropped, claimed ones are finished.
+            for queue in (self._claim_queue, self._classify_queue, self._update_queue):
+                await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _fetch_loop(self, stop_event: asyncio.Event) -> None:
+        settings = self._settings
         while not stop_event.is_set():
             try:
-                messages = await api_client.fetch_messages(classification="other", limit=settings.batch_size)
+                with self._metrics.time_stage("fetch"):
+                    if self._pushed:
+                        fresh, idle = await self._fetch_pushed()
+                    else:
+                        fresh, idle = await self._fetch_batch()
+                        self._backlog_idle = idle
             except ApiError as exc:
-                metrics.failed += 1
-                metrics.last_error = str(exc)
+                if exc.retry_after is not None:
+                    # The API is known to be down: wait for the breaker's probe instead of polling.
+                    logger.warning("Pausing fetches for %.1fs: %s", exc.retry_after, exc)
+                    await _sleep_until_stopped(stop_event, max(exc.retry_after, settings.poll_interval_seconds))
+                    continue
+                self._record_failure(exc)
                 logger.error("Failed fetching messages: %s", exc)
-                await asyncio.sleep(settings.poll_interval_seconds)
-                continue
-
-            if not messages:
-                await asyncio.sleep(settings.poll_interval_seconds)
+                await _sleep_until_stopped(stop_event, settings.poll_interval_seconds)
                 continue
 
-            for message in messages:
+            for group in self._group_by_thread(fresh):
                 if stop_event.is_set():
                     break
+                now = time.monotonic()
+                for message in group:
+                    self._in_flight.add(message.id)
+                    self._fetched_at[message.id] = now
+                    if self._scorer is not None:
+                        self._priorities[message.id] = self._scorer.score(message)
+                await self._claim_queue.put(group)
 
-                if settings.claim_messages:
-                    try:
-                        claimed = await api_client.claim_message(message.id)
-                    except ApiError as exc:
-                        metrics.failed += 1
-                        metrics.last_error = str(exc)
-                        logger.warning("Unable to claim message %s: %s", message.id, exc)
-                        continue
+            if idle:
+                await self._wait_for_work(stop_event, self._idle_interval())
+
+    def _priority(self, message: Message) -> float:
+        score = self._priorities.get(message.id)
+        if score is None and self._scorer is not None:
+            score = self._priorities[message.id] = self._scorer.score(message)
+        return score or 0.0
+
+    def _idle_interval(self) -> float:
+        settings = self._settings
+        if settings.push_enabled:
+            # Polling is only a reconciliation sweep for missed notifications.
+            return settings.push_reconcile_seconds
+        if self._adaptive is not None:
+            return self._adaptive.next_delay()
+        return settings.poll_interval_seconds
+
+    async def _wait_for_work(self, stop_event: asyncio.Event, seconds: float) -> None:
+        if self._pushed:
+            return
+        waiters = [asyncio.create_task(stop_event.wait()), asyncio.create_task(self._push_event.wait())]
+        try:
+            await asyncio.wait(waiters, timeout=seconds, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+    async def _fetch_pushed(self) -> tuple[list[Message], bool]:
+        pushed, self._pushed = self._pushed, {}
+        self._push_event.clear()
+        ids = [message_id for message_id in pushed if message_id not in self._in_flight]
+        messages: list[Message] = []
+        try:
+            for start in range(0, len(ids), MAX_FETCH_LIMIT):
+                chunk = ids[start : start + MAX_FETCH_LIMIT]
+                messages += await self._api_client.fetch_messages(classification="other", limit=len(chunk), ids=chunk)
+        except ApiError:
+            for message_id, pushed_at in pushed.items():
+                self._pushed.setdefault(message_id, pushed_at)
+            raise
+
+        scanner = self._scanner
+        # Ignore ids the API returns without being asked for; the regular sweep picks them up.
+        fresh = [
+            message
+            for message in messages
+            if message.id in pushed
+            and message.id not in self._in_flight
+            and (scanner is None or not scanner.is_processed(message.id))
+        ]
+        for message in fresh:
+            self._push_times[message.id] = pushed[message.id]
+        # Only wait afterwards if the regular sweep had nothing to do either.
+        return fresh, self._backlog_idle
+
+    async def _fetch_batch(self) -> tuple[list[Message], bool]:
+        """Fetch the next batch of work and report whether the backlog looks idle."""
+
+        adaptive = self._adaptive
+        if adaptive is not None:
+            batch_size = adaptive.fetch_limit(len(self._in_flight))
+        else:
+            batch_size = self._settings.batch_size
+        scanner = self._scanner
+        if scanner is None:
+            # Messages still in flight are reported as "other" until they are
+            # updated, so over-fetch by that amount to find new work.
+            limit = min(batch_size + len(self._in_flight), MAX_FETCH_LIMIT)
+            messages = await self._api_client.fetch_messages(classification="other", limit=limit)
+            fresh = [message for message in messages if message.id not in self._in_flight]
+            idle = not fresh or len(messages) < limit
+            inbox_empty = not fresh
+        else:
+            limit = min(batch_size, MAX_FETCH_LIMIT)
+            # Deeper pages of a backlog can hold nothing new while the inbox is anything but empty.
+            inbox_empty = scanner.offset == 0
+            head: list[Message] = []
+            if self._settings.priority_scheduling and scanner.offset > 0 and self._head_due():
+                # New mail lands on the first page; let the scheduler rank it against the backlog
+                # instead of waiting for the scan to wrap around.
+                head = await self._api_client.fetch_messages(classification="other", limit=limit)
+            messages = await self._api_client.fetch_messages(
+                classification="other",
+                limit=limit,
+                offset=scanner.offset,
+            )
+            fresh = [
+                message
+                for message in messages
+                if message.id not in self._in_flight and not scanner.is_processed(message.id)
+            ]
+            idle = scanner.advance(returned=len(messages), fresh=len(fresh), limit=limit)
+            seen = {message.id for message in fresh}
+            fresh = [
+                message
+                for message in head
+                if message.id not in self._in_flight and message.id not in seen and not scanner.is_processed(message.id)
+            ] + fresh
+            inbox_empty = inbox_empty and not fresh
 
-                    if not claimed:
-                        logger.debug("Message %s skipped (not claimed)", message.id)
+        if adaptive is not None:
+            adaptive.record_fetch(fresh=len(fresh), limit=min(batch_size, MAX_FETCH_LIMIT), inbox_empty=inbox_empty)
+        return fresh, idle
+
+    def _head_due(self) -> bool:
+        now = time.monotonic()
+        if now - self._head_fetched_at < self._settings.poll_interval_seconds:
+            return False
+        self._head_fetched_at = now
+        return True
+
+    async def _claim_worker(self, stop_event: asyncio.Event) -> None:
+        while True:
+            # Thread groups hold several messages; the claim covers about ``_bulk_size`` ids.
+            groups = await _take_batch(self._claim_queue, self._bulk_size, 0.0, size=len)
+            batch = [message for group in groups for message in group]
+            forwarded: set[int] = set()
+            try:
+                claimed = set() if stop_event.is_set() else {message.id for message in await self._claim(batch)}
+                for group in groups:
+                    kept = [message for message in group if message.id in claimed]
+                    if kept:
+                        await self._classify_queue.put(kept)
+                        forwarded.update(message.id for message in kept)
+            except Exception as exc:  # noqa: BLE001
+                self._record_failure(exc)
+                logger.exception("Unexpected error claiming %s messages", len(batch))
+            finally:
+                for message in batch:
+                    if message.id not in forwarded:
+                        self._release(message.id)
+                for _ in groups:
+                    self._claim_queue.task_done()
+
+    async def _claim(self, batch: list[Message]) -> list[Message]:
+        if not self._settings.claim_messages:
+            return batch
+
+        try:
+            with self._metrics.time_stage("claim"):
+                if len(batch) == 1:
+                    results = {batch[0].id: await self._api_client.claim_message(batch[0].id)}
+                else:
+                    results = await self._api_client.claim_messages([message.id for message in batch])
+        except ApiError as exc:
+            self._record_failure(exc)
+            logger.warning("Unable to claim messages %s: %s", [message.id for message in batch], exc)
+            return []
+
+        claimed = [message for message in batch if results.get(message.id)]
+        if len(claimed) < len(batch):
+            logger.debug("Skipped %s of %s messages (not claimed)", len(batch) - len(claimed), len(batch))
+        return claimed
+
+    def _group_by_thread(self, messages: list[Message]) -> list[list[Message]]:
+        if self._threads is None:
+            return [[message] for message in messages]
+        groups: dict[str | int, list[Message]] = {}
+        for message in messages:
+            groups.setdefault(message.gmail_thread_id or message.id, []).append(message)
+        return [sorted(group, key=lambda message: message.id) for group in groups.values()]
+
+    async def _classify_worker(self) -> None:
+        batch_size = max(1, self._settings.llm_batch_size)
+        while True:
+            groups = await _take_batch(self._classify_queue, batch_size, 0.0)
+            try:
+                pooled: list[Message] = []
+                for group in groups:
+                    if self._threads is not None and group[0].gmail_thread_id:
+                        await self._classify_group(group, thread_id=group[0].gmail_thread_id)
+                    else:
+                        pooled.extend(group)
+                if pooled:
+                    await self._classify_group(pooled)
+            finally:
+                for _ in groups:
+                    self._classify_queue.task_done()
+
+    async def _classify_group(self, messages: list[Message], *, thread_id: str | None = None) -> None:
+        try:
+            with message_deadline(self._deadline()):
+                if thread_id is not None and self._threads is not None:
+                    payloads = await self._classify_thread(self._threads, thread_id, messages)
+                elif len(messages) == 1:
+                    payloads = [await self._engine.classify_message(messages[0])]
+                else:
+                    payloads = await self._engine.classify_batch(messages)
+        except Exception as exc:  # noqa: BLE001
+            for message in messages:
+                self._record_failure(exc)
+                logger.exception("Unexpected error processing message %s", message.id)
+                self._release(message.id)
+        else:
+            for message, payload in zip(messages, payloads):
+                await self._update_queue.put((message, payload))
+
+    def _deadline(self) -> float | None:
+        """``MESSAGE_DEADLINE_SECONDS`` from now, as classification starts.
+
+        Time spent waiting in the claim and classify queues does not count, so
+        a backlog does not push healthy classifications onto the rules.
+        """
+
+        seconds = self._settings.message_deadline_seconds
+        return None if seconds is None else time.monotonic() + seconds
+
+    async def _classify_thread(
+        self, threads: ThreadCache, thread_id: str, messages: list[Message]
+    ) -> list[UpdatePayload]:
+        """Classify one thread's replies together, on their new text only.
+
+        Replies share prompts of up to ``LLM_BATCH_SIZE`` messages (at most
+        ``MAX_THREAD_PROMPT``), so a batch size of 1 still prompts one by one.
+        Quoted history is stripped before prompting, and the thread's latest
+        label goes into the prompt as context. Replies that add no text since
+        the thread was last classified reuse that label without an LLM call.
+        """
+
+        metrics = self._metrics
+        state = threads.get(thread_id)
+        results: dict[int, UpdatePayload] = {}
+        pending: list[Message] = []
+        for message in messages:
+            if state is not None and state.reusable and not state.is_new(message):
+                results[message.id] = state.reused_payload()
+                metrics.thread_reused += 1
+            else:
+                pending.append(message)
+
+        calls = 0
+        chunk_size = max(1, min(self._settings.llm_batch_size, MAX_THREAD_PROMPT))
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start : start + chunk_size]
+            context = state.context() if state is not None else None
+            with count_generations() as counter:
+                if len(chunk) == 1:
+                    payloads = [await self._engine.classify_message(dequoted(chunk[0]), context=context)]
+                else:
+                    payloads = await self._engine.classify_batch(
+                        [dequoted(message) for message in chunk], context=context
+                    )
+            calls += counter[0]
+            results.update((message.id, payload) for message, payload in zip(chunk, payloads))
+            # Later chunks build on what the earlier replies were labelled.
+            state = threads.record(thread_id, chunk, payloads, llm_calls=counter[0])
+
+        metrics.thread_groups += 1
+        metrics.thread_messages += len(messages)
+        metrics.thread_llm_calls += calls
+        logger.debug(
+            "Thread %s: %s messages, %s reused, %s LLM calls (%s for the thread so far)",
+            thread_id,
+            len(messages),
+            len(messages) - len(pending),
+            calls,
+            state.llm_calls if state is not None else 0,
+        )
+        return [results[message.id] for message in messages]
+
+    async def _update_worker(self) -> None:
+        journal = self._journal
+        while True:
+            # The batch doubles as the flush buffer: it is sent when full or
+            # once the first update has waited ``update_flush_seconds``.
+            batch = await _take_batch(self._update_queue, self._bulk_size, self._settings.update_flush_seconds)
+            updates = [(message.id, payload) for message, payload in batch]
+            # Ids whose payload stays in the journal for the flusher to post.
+            deferred: set[int] = set()
+            try:
+                if journal is not None:
+                    journal.append(updates)
+                    deferred = {message_id for message_id, _ in updates}
+                    if self._api_down:
+                        # The flusher is backing off; classification must not wait for the API.
+                        self._journal_event.set()
                         continue
+                self._posting.update(deferred)
+                try:
+                    errors = await self._post_updates(updates)
+                except ApiError as exc:
+                    if journal is not None:
+                        raise
+                    errors = {message_id: str(exc) for message_id, _ in updates}
+                self._record_results(updates, errors)
+                if journal is not None:
+                    journal.remove(list(deferred))
+                    deferred.clear()
+            except Exception as exc:  # noqa: BLE001
+                if deferred:
+                    self._api_down = True
+                    self._journal_event.set()
+                    logger.warning("Keeping %s updates in the journal after a failed update: %s", len(batch), exc)
+                else:
+                    for message, _ in batch:
+                        self._record_failure(exc)
+                        logger.exception("Unexpected error processing message %s", message.id)
+            finally:
+                self._posting.difference_update(message_id for message_id, _ in updates)
+                for message_id, _ in updates:
+                    if message_id not in deferred:
+                        self._finish(message_id)
+                    self._update_queue.task_done()
 
-                await _classify_and_update(message, engine, api_client, metrics)
+    async def _flush_journal(self, journal: UpdateJournal) -> None:
+        """Post updates left in the journal, backing off while the API is unavailable."""
 
-        metrics.log_summary()
+        settings = self._settings
+        delay = settings.journal_retry_seconds
+        while True:
+            entries = journal.pending(self._bulk_size, exclude=self._posting)
+            if not entries:
+                self._journal_event.clear()
+                await self._journal_event.wait()
+                continue
+            ids = [message_id for message_id, _ in entries]
+            journal.record_attempt(ids)
+            try:
+                errors = await self._post_updates(entries)
+            except Exception as exc:  # noqa: BLE001
+                self._api_down = True
+                self._metrics.journal_flush_failures += 1
+                logger.warning(
+                    "Journal flush of %s updates failed (%s pending); retrying in %.1fs: %s",
+                    len(entries),
+                    len(journal),
+                    delay,
+                    exc,
+                )
+                await asyncio.sleep(max(delay, getattr(exc, "retry_after", None) or 0.0))
+                delay = min(delay * 2, settings.journal_max_retry_seconds)
+                continue
+            self._api_down = False
+            delay = settings.journal_retry_seconds
+            self._record_results(entries, errors)
+            journal.remove(ids)
+            self._metrics.journal_flushed += len(ids)
+            for message_id in ids:
+                self._finish(message_id)
 
+    async def _post_updates(self, updates: list[tuple[int, UpdatePayload]]) -> dict[int, str | None]:
+        """Post ``updates`` and return the per-message errors; raises when the request itself fails."""
 
-async def _classify_and_update(message: Message, engine: ClassificationEngine, api_client: ApiClient, metrics: Metrics) -> None:
-    try:
-        payload = await engine.classify_message(message)
-        await api_client.update_message(message.id, payload)
+        try:
+            with self._metrics.time_stage("update"):
+                if len(updates) == 1:
+                    message_id, payload = updates[0]
+                    await self._api_client.update_message(message_id, payload)
+                    return {message_id: None}
+                return await self._api_client.update_messages(updates)
+        except ApiError as exc:
+            status = exc.status_code
+            if status is None or status >= 500 or status == 429:
+                raise
+            # The API rejected the payloads themselves; posting them again would not help.
+            return {message_id: str(exc) for message_id, _ in updates}
+
+    def _record_results(self, updates: list[tuple[int, UpdatePayload]], errors: dict[int, str | None]) -> None:
+        for message_id, payload in updates:
+            error = errors.get(message_id, "missing from bulk response")
+            if error is None:
+                self._record_success(message_id, payload)
+            else:
+                self._record_failure(ApiError(error))
+                logger.error("Failed to update message %s: %s", message_id, error)
+
+    def _finish(self, message_id: int) -> None:
+        self._release(message_id)
+        if self._adaptive is not None:
+            self._adaptive.record_completion()
+
+    def _record_success(self, message_id: int, payload: UpdatePayload) -> None:
+        if self._scanner is not None:
+            self._scanner.mark_processed(message_id, payload.classification)
+        metrics = self._metrics
+        pushed_at = self._push_times.pop(message_id, None)
+        if pushed_at is not None:
+            metrics.push_to_label.observe(time.monotonic() - pushed_at)
+        self._priorities.pop(message_id, None)
+        fetched_at = self._fetched_at.pop(message_id, None)
+        if fetched_at is not None:
+            metrics.record_time_to_label(payload.classification, time.monotonic() - fetched_at)
         metrics.processed += 1
         if payload.classified_by == "llm":
             metrics.classified_via_llm += 1
         else:
             metrics.classified_via_rules += 1
         logger.info(
-            "Message %s classified as %s via %s", message.id, payload.classification, payload.classified_by
+            "Message %s classified as %s via %s", message_id, payload.classification, payload.classified_by
         )
-    except ApiError as exc:
-        metrics.failed += 1
-        metrics.last_error = str(exc)
-        logger.error("Failed to update message %s: %s", message.id, exc)
-    except Exception as exc:  # noqa: BLE001
-        metrics.failed += 1
-        metrics.last_error = str(exc)
-        logger.exception("Unexpected error processing message %s", message.id)
+
+    def _record_failure(self, exc: BaseException) -> None:
+        self._metrics.failed += 1
+        self._metrics.last_error = str(exc)
+
+    def _release(self, message_id: int) -> None:
+        self._in_flight.discard(message_id)
+        self._push_times.pop(message_id, None)
+        self._fetched_at.pop(message_id, None)
+        self._priorities.pop(message_id, None)
+
+
+async def _take_batch(
+    queue: asyncio.Queue[T], max_items: int, max_wait: float, *, size: Callable[[T], int] | None = None
+) -> list[T]:
+    """Wait for one item, then keep collecting until ``max_items`` or ``max_wait`` seconds pass.
+
+    With ``size``, items count as ``size(item)`` towards ``max_items``.
+    """
+
+    batch = [await queue.get()]
+    total = size(batch[0]) if size is not None else 1
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_wait
+    while total < max_items:
+        try:
+            item = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+        batch.append(item)
+        total += size(item) if size is not None else 1
+    return batch
+
+
+async def _log_progress(metrics: Metrics, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        metrics.log_progress()
+
+
+async def _sleep_until_stopped(stop_event: asyncio.Event, seconds: float) -> None:
+    try:
+        await asyncio.wait_for(stop_event.wait(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
 
 
 async def _main_async() -> None:
@@ -21,15 +21,111 @@ class Settings(BaseSettings):
         alias="OLLAMA_URL",
         description="Base URL of the local Ollama instance",
     )
+    ollama_urls: str | None = Field(
+        None,
+        alias="OLLAMA_URLS",
+        description="Comma-separated Ollama base URLs, each optionally suffixed with =<concurrency>",
+    )
+    ollama_node_concurrency: int = Field(1, alias="OLLAMA_NODE_CONCURRENCY")
+    ollama_eject_after: int = Field(3, alias="OLLAMA_EJECT_AFTER")
+    ollama_probe_interval_seconds: float = Field(15.0, alias="OLLAMA_PROBE_INTERVAL_SECONDS")
     ollama_model: str = Field("llama3.1", alias="OLLAMA_MODEL")
+    ollama_keep_alive: str | None = Field("30m", alias="OLLAMA_KEEP_ALIVE")
+    ollama_warm_up: bool = Field(True, alias="OLLAMA_WARM_UP")
+    ollama_system_prompt: bool = Field(True, alias="OLLAMA_SYSTEM_PROMPT")
+    ollama_stream: bool = Field(True, alias="OLLAMA_STREAM")
+    ollama_format: Literal["none", "json", "schema"] = Field("json", alias="OLLAMA_FORMAT")
+    ollama_timeout_seconds: float | None = Field(
+        None,
+        alias="OLLAMA_TIMEOUT_SECONDS",
+        description="Timeout for Ollama requests; defaults to HTTP_TIMEOUT_SECONDS",
+    )
+    ollama_adaptive_timeout: bool = Field(False, alias="OLLAMA_ADAPTIVE_TIMEOUT")
+    ollama_timeout_quantile: float = Field(0.99, alias="OLLAMA_TIMEOUT_QUANTILE")
+    ollama_timeout_factor: float = Field(3.0, alias="OLLAMA_TIMEOUT_FACTOR")
+    ollama_min_timeout_seconds: float = Field(2.0, alias="OLLAMA_MIN_TIMEOUT_SECONDS")
+    ollama_hedge: bool = Field(False, alias="OLLAMA_HEDGE")
+    ollama_hedge_quantile: float = Field(0.95, alias="OLLAMA_HEDGE_QUANTILE")
 
     poll_interval_seconds: float = Field(15.0, alias="POLL_INTERVAL_SECONDS")
     batch_size: int = Field(10, alias="BATCH_SIZE")
+    adaptive_polling: bool = Field(True, alias="ADAPTIVE_POLLING")
+    max_batch_size: int = Field(100, alias="MAX_BATCH_SIZE")
+    max_poll_interval_seconds: float = Field(120.0, alias="MAX_POLL_INTERVAL_SECONDS")
+    claim_ttl_seconds: float = Field(600.0, alias="CLAIM_TTL_SECONDS")
     claim_messages: bool = Field(True, alias="CLAIM_MESSAGES")
     llm_min_confidence: float = Field(0.5, alias="LLM_MIN_CONFIDENCE")
+    llm_cascade: str | None = Field(
+        None,
+        alias="LLM_CASCADE",
+        description="Models tried in order, e.g. 'qwen2.5:1.5b@0.85,offer=0.95;llama3.1@0.5'",
+    )
+    rules_path: str | None = Field(None, alias="RULES_PATH")
+    rules_short_circuit: bool = Field(False, alias="RULES_SHORT_CIRCUIT")
+    rules_min_precision: float = Field(0.9, alias="RULES_MIN_PRECISION")
+
+    local_model_path: str | None = Field(None, alias="LOCAL_MODEL_PATH")
+    local_model_min_probability: float = Field(0.9, alias="LOCAL_MODEL_MIN_PROBABILITY")
+
+    prompt_header_whitelist: bool = Field(True, alias="PROMPT_HEADER_WHITELIST")
+    prompt_snippet_tokens: int = Field(256, alias="PROMPT_SNIPPET_TOKENS")
+
+    llm_batch_size: int = Field(1, alias="LLM_BATCH_SIZE")
+    llm_batch_fallback: Literal["retry", "rules"] = Field("retry", alias="LLM_BATCH_FALLBACK")
+
+    classify_concurrency: int = Field(2, alias="CLASSIFY_CONCURRENCY")
+    api_concurrency: int = Field(4, alias="API_CONCURRENCY")
+    pipeline_queue_size: int = Field(20, alias="PIPELINE_QUEUE_SIZE")
+    api_bulk_size: int = Field(25, alias="API_BULK_SIZE")
+    update_flush_seconds: float = Field(0.5, alias="UPDATE_FLUSH_SECONDS")
+    priority_scheduling: bool = Field(True, alias="PRIORITY_SCHEDULING")
+    priority_queue_size: int = Field(200, alias="PRIORITY_QUEUE_SIZE")
+    priority_aging: float = Field(1.0, alias="PRIORITY_AGING")
+    message_deadline_seconds: float | None = Field(None, alias="MESSAGE_DEADLINE_SECONDS")
+    journal_path: str | None = Field(None, alias="JOURNAL_PATH")
+    journal_retry_seconds: float = Field(1.0, alias="JOURNAL_RETRY_SECONDS")
+    journal_max_retry_seconds: float = Field(300.0, alias="JOURNAL_MAX_RETRY_SECONDS")
+
+    backlog_scan: bool = Field(True, alias="BACKLOG_SCAN")
+    backlog_memory_size: int = Field(50_000, alias="BACKLOG_MEMORY_SIZE")
+    backlog_revisit_seconds: float | None = Field(None, alias="BACKLOG_REVISIT_SECONDS")
+
+    thread_aware: bool = Field(True, alias="THREAD_AWARE")
+    thread_cache_ttl_seconds: float = Field(3600.0, alias="THREAD_CACHE_TTL_SECONDS")
+    thread_cache_size: int = Field(5_000, alias="THREAD_CACHE_SIZE")
+
+    shard_index: int = Field(0, alias="SHARD_INDEX")
+    shard_count: int = Field(1, alias="SHARD_COUNT")
+    supervisor_restart_seconds: float = Field(1.0, alias="SUPERVISOR_RESTART_SECONDS")
+    supervisor_max_restart_seconds: float = Field(60.0, alias="SUPERVISOR_MAX_RESTART_SECONDS")
+
+    push_enabled: bool = Field(False, alias="PUSH_ENABLED")
+    push_host: str = Field("127.0.0.1", alias="PUSH_HOST")
+    push_port: int = Field(8765, alias="PUSH_PORT")
+    push_token: str | None = Field(None, alias="PUSH_TOKEN")
+    push_reconcile_seconds: float = Field(300.0, alias="PUSH_RECONCILE_SECONDS")
+    classification_cache_size: int = Field(10_000, alias="CLASSIFICATION_CACHE_SIZE")
+    classification_cache_path: str | None = Field(None, alias="CLASSIFICATION_CACHE_PATH")
+    classification_cache_max_rows: int = Field(100_000, alias="CLASSIFICATION_CACHE_MAX_ROWS")
+    classification_cache_ttl_seconds: float | None = Field(2_592_000.0, alias="CLASSIFICATION_CACHE_TTL_SECONDS")
+
+    knn_enabled: bool = Field(False, alias="KNN_ENABLED")
+    ollama_embed_model: str = Field("nomic-embed-text", alias="OLLAMA_EMBED_MODEL")
+    knn_k: int = Field(3, alias="KNN_K")
+    knn_min_similarity: float = Field(0.92, alias="KNN_MIN_SIMILARITY")
+    knn_min_confidence: float = Field(0.8, alias="KNN_MIN_CONFIDENCE")
+    knn_capacity: int = Field(20_000, alias="KNN_CAPACITY")
+    knn_index_path: str | None = Field(None, alias="KNN_INDEX_PATH")
 
+    metrics_port: int | None = Field(None, alias="METRICS_PORT")
+    metrics_host: str = Field("127.0.0.1", alias="METRICS_HOST")
+    metrics_log_interval_seconds: float = Field(60.0, alias="METRICS_LOG_INTERVAL_SECONDS")
     http_timeout_seconds: float = Field(30.0, alias="HTTP_TIMEOUT_SECONDS")
     max_retries: int = Field(3, alias="MAX_RETRIES")
+    retry_budget_ratio: float = Field(0.2, alias="RETRY_BUDGET_RATIO")
+    retry_budget_min_per_second: float = Field(1.0, alias="RETRY_BUDGET_MIN_PER_SECOND")
+    breaker_failure_threshold: int = Field(5, alias="BREAKER_FAILURE_THRESHOLD")
+    breaker_reset_seconds: float = Field(30.0, alias="BREAKER_RESET_SECONDS")
 
     log_level: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = Field(
         "INFO", alias="LOG_LEVEL"
@@ -0,0 +1,190 @@
+"""Run one agent process per shard and restart the ones that crash."""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from multiprocessing.context import BaseContext
+from typing import Any, Callable
+
+from .runner import run
+from .settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# A shard that ran at least this long before crashing restarts without back-off.
+STABLE_AFTER_SECONDS = 60.0
+
+
+def run_shard(index: int, count: int) -> None:
+    """Process entry point: run the agent restricted to ``id % count == index``."""
+
+    os.environ["SHARD_INDEX"] = str(index)
+    os.environ["SHARD_COUNT"] = str(count)
+    get_settings.cache_clear()
+    settings = get_settings()
+    # Every shard serves its own push and metrics endpoints on consecutive ports.
+    if settings.push_enabled:
+        os.environ["PUSH_PORT"] = str(settings.push_port + index)
+    if settings.metrics_port is not None:
+        os.environ["METRICS_PORT"] = str(settings.metrics_port + index)
+    get_settings.cache_clear()
+    run()
+
+
+@dataclass
+class _Shard:
+    index: int
+    process: Any = None
+    started_at: float = 0.0
+    restart_at: float | None = None
+    crashes: int = 0
+    restarts: int = 0
+    finished: bool = False
+
+
+class ShardSupervisor:
+    """Keep ``shard_count`` worker processes alive until asked to stop.
+
+    A worker that exits non-zero is restarted after ``restart_delay`` seconds,
+    doubling up to ``max_restart_delay`` while it keeps crashing soon after
+    starting. A clean exit is final.
+    """
+
+    def __init__(
+        self,
+        shard_count: int,
+        *,
+        target: Callable[[int, int], None] = run_shard,
+        context: BaseContext | None = None,
+        restart_delay: float = 1.0,
+        max_restart_delay: float = 60.0,
+        stable_after: float = STABLE_AFTER_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if shard_count < 1:
+            raise ValueError("shard_count must be at least 1")
+        self._count = shard_count
+        self._target = target
+        # Spawned children start without the supervisor's signal handlers and state.
+        self._context = context or multiprocessing.get_context("spawn")
+        self._restart_delay = max(0.0, restart_delay)
+        self._max_restart_delay = max(self._restart_delay, max_restart_delay)
+        self._stable_after = stable_after
+        self._clock = clock
+        self._shards = [_Shard(index) for index in range(shard_count)]
+        self._stopping = False
+
+    @property
+    def restarts(self) -> dict[int, int]:
+        return {shard.index: shard.restarts for shard in self._shards}
+
+    @property
+    def running(self) -> bool:
+        return not self._stopping and not all(shard.finished for shard in self._shards)
+
+    def start(self) -> None:
+        for shard in self._shards:
+            self._spawn(shard)
+
+    def request_stop(self, *_args: object) -> None:
+        self._stopping = True
+
+    def poll(self, timeout: float) -> None:
+        """Wait up to ``timeout`` seconds for exits, then reap and restart workers."""
+
+        alive = [shard.process.sentinel for shard in self._shards if shard.process is not None]
+        due = [shard.restart_at for shard in self._shards if shard.restart_at is not None]
+        if due:
+            timeout = max(0.0, min(timeout, min(due) - self._clock()))
+        if alive:
+            wait(alive, timeout)
+        elif timeout > 0:
+            time.sleep(timeout)
+
+        now = self._clock()
+        for shard in self._shards:
+            process = shard.process
+            if process is not None and process.exitcode is not None:
+                process.join()
+                shard.process = None
+                self._on_exit(shard, process.exitcode, now)
+            if shard.restart_at is not None and shard.restart_at <= now and not self._stopping:
+                shard.restarts += 1
+                self._spawn(shard)
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Ask every worker to shut down, killing the ones that do not within ``timeout``."""
+
+        self._stopping = True
+        processes = [shard.process for shard in self._shards if shard.process is not None]
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = self._clock() + timeout
+        for process in processes:
+            process.join(max(0.0, deadline - self._clock()))
+            if process.is_alive():
+                logger.warning("Worker pid %s did not stop in time; killing it", process.pid)
+                process.kill()
+                process.join()
+        for shard in self._shards:
+            shard.process = None
+            shard.restart_at = None
+
+    def run(self, poll_interval: float = 1.0) -> None:
+        self.start()
+        try:
+            while self.running:
+                self.poll(poll_interval)
+        finally:
+            self.stop()
+
+    def _spawn(self, shard: _Shard) -> None:
+        process = self._context.Process(
+            target=self._target,
+            args=(shard.index, self._count),
+            name=f"inbox-triage-shard-{shard.index}",
+        )
+        process.start()
+        shard.process = process
+        shard.started_at = self._clock()
+        shard.restart_at = None
+        logger.info("Started shard %s/%s as pid %s", shard.index, self._count, process.pid)
+
+    def _on_exit(self, shard: _Shard, exitcode: int, now: float) -> None:
+        if exitcode == 0 or self._stopping:
+            logger.info("Shard %s exited with code %s", shard.index, exitcode)
+            shard.finished = True
+            return
+        if now - shard.started_at >= self._stable_after:
+            shard.crashes = 0
+        delay = min(self._max_restart_delay, self._restart_delay * 2**shard.crashes)
+        shard.crashes += 1
+        shard.restart_at = now + delay
+        logger.error("Shard %s crashed with exit code %s; restarting in %.1fs", shard.index, exitcode, delay)
+
+
+def run_supervisor() -> None:
+    """Entry point used by the supervisor console script."""
+
+    settings = get_settings()
+    logging.basicConfig(
+        level=settings.log_level,
+        format="%(asctime)s %(levelname)s %(processName)s %(name)s: %(message)s",
+    )
+    supervisor = ShardSupervisor(
+        max(1, settings.shard_count),
+        restart_delay=settings.supervisor_restart_seconds,
+        max_restart_delay=settings.supervisor_max_restart_seconds,
+    )
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, supervisor.request_stop)
+    logger.info("Supervising %s agent shards", settings.shard_count)
+    supervisor.run()
+    logger.info("All shards stopped; restarts per shard: %s", supervisor.restarts)
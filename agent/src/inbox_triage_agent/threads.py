@@ -0,0 +1,153 @@
+"""Per-thread classification state shared by the replies of one Gmail thread."""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable
+
+from .metrics import Metrics
+from .models import Message, UpdatePayload
+
+# Where a reply starts quoting the previous message, e.g.
+# "On Mon, Jan 5, 2026 at 9:14 AM Jane <jane@acme.com> wrote:" or Outlook's banner.
+_QUOTE_START = re.compile(
+    r"\bOn\b[^\n]{0,300}?\bwrote:|-{2,}\s*Original Message\s*-{2,}|^From: [^\n]+\n(?:Sent|Date): ",
+    re.IGNORECASE | re.MULTILINE,
+)
+_WHITESPACE = re.compile(r"\s+")
+# Fingerprints of already classified text kept per thread.
+_MAX_SEEN = 64
+
+
+def strip_quoted(text: str | None) -> str:
+    """Drop ``>``-quoted lines and everything from the first reply banner on."""
+
+    kept = "\n".join(line for line in (text or "").splitlines() if not line.lstrip().startswith(">"))
+    match = _QUOTE_START.search(kept)
+    if match is not None:
+        kept = kept[: match.start()]
+    return kept.strip()
+
+
+def dequoted(message: Message) -> Message:
+    """Return a copy of ``message`` whose snippet carries only the new text."""
+
+    snippet = strip_quoted(message.snippet)
+    return message if snippet == message.snippet else message.model_copy(update={"snippet": snippet})
+
+
+def _fingerprint(message: Message) -> str:
+    text = _WHITESPACE.sub(" ", strip_quoted(message.snippet).casefold()).strip()
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ThreadState:
+    """The latest classification in a thread and what it was based on."""
+
+    payload: UpdatePayload
+    message_id: int
+    updated_at: float
+    messages: int = 0
+    llm_calls: int = 0
+    seen: OrderedDict[str, None] = field(default_factory=OrderedDict)
+
+    @property
+    def reusable(self) -> bool:
+        # Rule fallbacks are guesses; a thread only inherits what the LLM decided.
+        return self.payload.classified_by == "llm"
+
+    def is_new(self, message: Message) -> bool:
+        """Whether ``message`` adds text the thread was not classified on yet."""
+
+        return bool(strip_quoted(message.snippet)) and _fingerprint(message) not in self.seen
+
+    def context(self) -> str | None:
+        if not self.reusable:
+            return None
+        reason = f" ({self.payload.reason})" if self.payload.reason else ""
+        return (
+            f"Earlier messages in this thread were classified as {self.payload.classification}{reason}. "
+            "Label the email below on its own content; the label may move on as the thread progresses."
+        )
+
+    def reused_payload(self) -> UpdatePayload:
+        return self.payload.model_copy(
+            update={"reason": f"no new text since message {self.message_id} in this thread", "raw_response": None}
+        )
+
+    def remember(self, message: Message) -> None:
+        self.seen[_fingerprint(message)] = None
+        while len(self.seen) > _MAX_SEEN:
+            self.seen.popitem(last=False)
+
+
+class ThreadCache:
+    """In-memory thread states, expired ``ttl`` seconds after their last update.
+
+    At most ``max_threads`` states are kept; the least recently updated thread
+    is dropped first.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float = 3600.0,
+        max_threads: int = 5_000,
+        metrics: Metrics | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._ttl = ttl
+        self._max_threads = max(1, max_threads)
+        self._metrics = metrics or Metrics()
+        self._clock = clock
+        self._states: OrderedDict[str, ThreadState] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __contains__(self, thread_id: object) -> bool:
+        return isinstance(thread_id, str) and self.get(thread_id) is not None
+
+    def get(self, thread_id: str) -> ThreadState | None:
+        state = self._states.get(thread_id)
+        if state is not None and self._clock() - state.updated_at > self._ttl:
+            del self._states[thread_id]
+            self._metrics.thread_evictions += 1
+            return None
+        return state
+
+    def record(
+        self,
+        thread_id: str,
+        messages: list[Message],
+        payloads: list[UpdatePayload],
+        *,
+        llm_calls: int = 0,
+    ) -> ThreadState:
+        """Fold a classified group into the thread; the newest message's result wins."""
+
+        latest = max(range(len(messages)), key=lambda index: messages[index].id)
+        state = self.get(thread_id)
+        now = self._clock()
+        if state is None:
+            state = ThreadState(payload=payloads[latest], message_id=messages[latest].id, updated_at=now)
+            self._metrics.threads_seen += 1
+        elif messages[latest].id >= state.message_id:
+            state.payload, state.message_id = payloads[latest], messages[latest].id
+        state.updated_at = now
+        state.messages += len(messages)
+        state.llm_calls += llm_calls
+        for message in messages:
+            state.remember(message)
+
+        self._states[thread_id] = state
+        self._states.move_to_end(thread_id)
+        while len(self._states) > self._max_threads:
+            self._states.popitem(last=False)
+            self._metrics.thread_evictions += 1
+        return state
@@ -0,0 +1,86 @@
+import asyncio
+
+from inbox_triage_agent.api_client import ApiError
+from inbox_triage_agent.models import Message, UpdatePayload
+from inbox_triage_agent.settings import Settings
+
+
+def make_settings(**overrides) -> Settings:
+    values = {
+        "JOB_COPILOT_API_TOKEN": "test-token",
+        "POLL_INTERVAL_SECONDS": 0.01,
+        "BATCH_SIZE": 4,
+        "CLASSIFY_CONCURRENCY": 3,
+        "API_CONCURRENCY": 2,
+        "PIPELINE_QUEUE_SIZE": 2,
+        "UPDATE_FLUSH_SECONDS": 0.01,
+    }
+    values.update(overrides)
+    return Settings(**values)
+
+
+class FakeApiClient:
+    def __init__(self, messages, *, stop_event, fail_updates=()):
+        self._pending = list(messages)
+        self._stop_event = stop_event
+        self._fail_updates = set(fail_updates)
+        self.claimed: list[int] = []
+        self.updated: dict[int, UpdatePayload] = {}
+        self.requests = 0
+
+    async def fetch_messages(self, *, classification: str, limit: int, offset: int = 0) -> list[Message]:
+        return self._pending[offset : offset + limit]
+
+    async def claim_message(self, message_id: int) -> bool:
+        self.requests += 1
+        return await self._claim_one(message_id)
+
+    async def claim_messages(self, message_ids) -> dict[int, bool]:
+        self.requests += 1
+        return {message_id: await self._claim_one(message_id) for message_id in message_ids}
+
+    async def update_messages(self, updates) -> dict[int, str | None]:
+        self.requests += 1
+        errors: dict[int, str | None] = {}
+        for message_id, payload in updates:
+            try:
+                await self._update_one(message_id, payload)
+                errors[message_id] = None
+            except ApiError as exc:
+                errors[message_id] = str(exc)
+        return errors
+
+    async def _claim_one(self, message_id: int) -> bool:
+        self.claimed.append(message_id)
+        if message_id % 5 == 0:
+            self._finish(message_id)
+            return False
+        return True
+
+    async def update_message(self, message_id: int, payload: UpdatePayload) -> None:
+        self.requests += 1
+        await self._update_one(message_id, payload)
+
+    async def _update_one(self, message_id: int, payload: UpdatePayload) -> None:
+        self._finish(message_id)
+        if message_id in self._fail_updates:
+            raise ApiError("boom")
+        self.updated[message_id] = payload
+
+    def _finish(self, message_id: int) -> None:
+        self._pending = [m for m in self._pending if m.id != message_id]
+        if not self._pending:
+            self._stop_event.set()
+
+
+class SlowEngine:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    async def classify_message(self, message: Message) -> UpdatePayload:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return UpdatePayload(classification="offer", classified_by="llm", confidence=0.9)
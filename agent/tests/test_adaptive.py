@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from inbox_triage_agent.adaptive import AdaptiveController
+from inbox_triage_agent.metrics import Metrics
+from inbox_triage_agent.models import Message
+from inbox_triage_agent.runner import ClassificationPipeline
+from fakes import FakeApiClient, SlowEngine, make_settings
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_controller(**overrides):
+    values = dict(
+        batch_size=10,
+        interval=15.0,
+        max_batch_size=100,
+        max_interval=120.0,
+        rng=lambda: 0.5,
+    )
+    values.update(overrides)
+    return AdaptiveController(**values)
+
+
+def test_full_batches_grow_and_empty_batches_back_off():
+    metrics = Metrics()
+    controller = make_controller(metrics=metrics)
+
+    for _ in range(5):
+        controller.record_fetch(fresh=controller.batch_size, limit=controller.batch_size, inbox_empty=False)
+    assert controller.batch_size == 100
+    # The runner does not sleep between full fetches, so the interval stays put.
+    assert controller.interval == 15.0
+
+    intervals = []
+    for _ in range(5):
+        controller.record_fetch(fresh=0, limit=controller.batch_size, inbox_empty=True)
+        intervals.append(controller.interval)
+    assert intervals == [15.0, 30.0, 60.0, 120.0, 120.0]
+    assert controller.batch_size == 10
+    assert metrics.adaptive_grow == 5
+    assert metrics.adaptive_backoff == 5
+    assert metrics.adaptive_interval_seconds == 120.0
+
+
+def test_backlog_pages_without_new_work_do_not_back_off():
+    metrics = Metrics()
+    controller = make_controller(metrics=metrics)
+    for _ in range(3):
+        controller.record_fetch(fresh=controller.batch_size, limit=controller.batch_size, inbox_empty=False)
+
+    controller.record_fetch(fresh=0, limit=controller.batch_size, inbox_empty=False)
+
+    assert (controller.batch_size, controller.interval) == (80, 15.0)
+    assert metrics.adaptive_backoff == 0
+
+
+@pytest.mark.asyncio
+async def test_scanning_past_messages_in_flight_keeps_the_batch_size():
+    messages = [Message(id=i, subject="Offer letter") for i in range(1, 31)]
+    api = FakeApiClient(messages, stop_event=asyncio.Event())
+    metrics = Metrics()
+    pipeline = ClassificationPipeline(api, SlowEngine(), metrics, make_settings(BATCH_SIZE=10))
+
+    fresh, _ = await pipeline._fetch_batch()
+    assert len(fresh) == 10 and metrics.adaptive_batch_size == 20
+    # The next page of the backlog is all being worked on already.
+    pipeline._in_flight.update(range(1, 31))
+    fresh, _ = await pipeline._fetch_batch()
+
+    assert fresh == []
+    assert metrics.adaptive_batch_size == 20
+    assert metrics.adaptive_backoff == 0
+
+
+def test_next_delay_applies_jitter():
+    low = make_controller(rng=lambda: 0.0, jitter=0.2)
+    high = make_controller(rng=lambda: 1.0, jitter=0.2)
+
+    assert low.next_delay() == pytest.approx(12.0)
+    assert high.next_delay() == pytest.approx(18.0)
+
+
+def test_fetch_limit_respects_claim_expiry_at_measured_throughput():
+    clock = FakeClock()
+    metrics = Metrics()
+    controller = make_controller(batch_size=100, clock=clock, claim_ttl=600.0, safety=0.5, metrics=metrics)
+
+    assert controller.fetch_limit(in_flight=0) == 100
+    # One message every 10 seconds: 30 messages fit in half the claim expiry.
+    for _ in range(6):
+        clock.now += 10
+        controller.record_completion()
+
+    assert controller.throughput() == pytest.approx(0.12, rel=0.01)
+    assert controller.fetch_limit(in_flight=10) == 26
+    assert controller.fetch_limit(in_flight=50) == 1
+    assert metrics.adaptive_throughput_capped == 2
@@ -0,0 +1,102 @@
+import json
+
+import httpx
+import pytest
+import respx
+
+from inbox_triage_agent.api_client import ApiClient
+from inbox_triage_agent.metrics import Metrics
+from inbox_triage_agent.models import UpdatePayload
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_claim_messages_reports_per_id_results():
+    route = respx.patch("http://api.test/messages/bulk_claim").mock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "results": [
+                    {"id": 1, "status": "claimed", "triage_in_progress": True},
+                    {"id": 2, "status": "conflict", "triage_in_progress": False},
+                ]
+            },
+        )
+    )
+    metrics = Metrics()
+
+    async with ApiClient("http://api.test", "token", 5, 1, metrics=metrics) as client:
+        claimed = await client.claim_messages([1, 2, 3])
+
+    assert json.loads(route.calls[0].request.content) == {"ids": [1, 2, 3]}
+    assert claimed == {1: True, 2: False, 3: False}
+    assert metrics.api_requests == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_claim_messages_splits_ids_at_the_api_bulk_limit():
+    def claim_all(request):
+        ids = json.loads(request.content)["ids"]
+        return httpx.Response(200, json={"results": [{"id": i, "status": "claimed"} for i in ids]})
+
+    route = respx.patch("http://api.test/messages/bulk_claim").mock(side_effect=claim_all)
+
+    async with ApiClient("http://api.test", "token", 5, 1) as client:
+        claimed = await client.claim_messages(list(range(1, 251)))
+
+    assert [len(json.loads(call.request.content)["ids"]) for call in route.calls] == [100, 100, 50]
+    assert all(claimed.values()) and len(claimed) == 250
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_claim_message_reports_missing_and_taken_messages_as_unclaimed():
+    respx.patch("http://api.test/messages/1/claim").mock(return_value=httpx.Response(404))
+    respx.patch("http://api.test/messages/2/claim").mock(return_value=httpx.Response(409))
+    respx.patch("http://api.test/messages/3/claim").mock(
+        return_value=httpx.Response(200, json={"triage_in_progress": True})
+    )
+
+    async with ApiClient("http://api.test", "token", 5, 1) as client:
+        assert [await client.claim_message(message_id) for message_id in (1, 2, 3)] == [False, False, True]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_update_messages_sends_one_request_and_returns_errors():
+    route = respx.patch("http://api.test/messages/bulk_update").mock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "results": [
+                    {"id": 1, "status": "updated"},
+                    {"id": 2, "status": "invalid", "error": "Invalid classification"},
+                ]
+            },
+        )
+    )
+    offer = UpdatePayload(classification="offer", classified_by="llm", confidence=0.9)
+    other = UpdatePayload(classification="other", classified_by="rules")
+
+    async with ApiClient("http://api.test", "token", 5, 1) as client:
+        errors = await client.update_messages([(1, offer), (2, other)])
+
+    body = json.loads(route.calls[0].request.content)
+    assert body["updates"][0] == {"id": 1, "classification": "offer", "classified_by": "llm", "confidence": 0.9}
+    assert errors == {1: None, 2: "Invalid classification"}
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_sharded_client_filters_listings_server_side():
+    route = respx.get("http://api.test/messages").mock(return_value=httpx.Response(200, json=[]))
+
+    async with ApiClient("http://api.test", "token", 5, 1, shard=(1, 3)) as client:
+        await client.fetch_messages(classification="other", limit=10)
+
+    params = route.calls[0].request.url.params
+    assert (params["shard_index"], params["shard_count"]) == ("1", "3")
+
+    with pytest.raises(ValueError):
+        ApiClient("http://api.test", "token", 5, 1, shard=(3, 3))
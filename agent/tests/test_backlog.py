@@ -0,0 +1,49 @@
+from inbox_triage_agent.backlog import BacklogScanner
+
+
+def test_pages_through_backlog_and_reports_exhaustion():
+    scanner = BacklogScanner()
+
+    assert scanner.advance(returned=10, fresh=10, limit=10) is False
+    assert scanner.offset == 10
+    assert scanner.advance(returned=4, fresh=4, limit=10) is False
+    assert scanner.offset == 0
+    assert not scanner.exhausted
+
+    assert scanner.advance(returned=10, fresh=0, limit=10) is False
+    assert scanner.advance(returned=4, fresh=0, limit=10) is True
+    assert scanner.exhausted
+    assert scanner.offset == 0
+
+    # While exhausted only the first page is polled until new mail shows up.
+    assert scanner.advance(returned=10, fresh=0, limit=10) is True
+    assert scanner.offset == 0
+    assert scanner.advance(returned=10, fresh=2, limit=10) is False
+    assert not scanner.exhausted
+    assert scanner.offset == 10
+
+
+def test_reclassified_messages_prevent_premature_exhaustion():
+    scanner = BacklogScanner()
+
+    scanner.mark_processed(1, "offer")
+    assert scanner.advance(returned=3, fresh=0, limit=10) is True
+    assert not scanner.exhausted
+
+    assert scanner.advance(returned=3, fresh=0, limit=10) is True
+    assert scanner.exhausted
+
+
+def test_remembers_processed_ids_with_bounded_memory_and_revisit():
+    now = [100.0]
+    scanner = BacklogScanner(memory_size=2, revisit_after=60, clock=lambda: now[0])
+
+    for message_id in (1, 2, 3):
+        scanner.mark_processed(message_id, "other")
+
+    assert not scanner.is_processed(1)
+    assert scanner.is_processed(2)
+    assert scanner.classified_at(3) == 100.0
+
+    now[0] = 200.0
+    assert not scanner.is_processed(2)
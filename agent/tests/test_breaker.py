@@ -0,0 +1,121 @@
+import httpx
+import pytest
+import respx
+from tenacity import AsyncRetrying, RetryError, retry_if_exception_type, wait_none
+
+from inbox_triage_agent.api_client import ApiClient, ApiError
+from inbox_triage_agent.breaker import CircuitBreaker, RetryBudget, retry_stop
+from inbox_triage_agent.classifier import ClassificationEngine
+from inbox_triage_agent.metrics import Metrics, render_prometheus
+from inbox_triage_agent.models import Message, UpdatePayload
+from inbox_triage_agent.ollama_client import OllamaClient, OllamaError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_breaker_opens_probes_and_closes():
+    clock = FakeClock()
+    metrics = Metrics()
+    breaker = CircuitBreaker("ollama", failure_threshold=2, reset_seconds=10, metrics=metrics, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.retry_after == 10
+
+    clock.now = 10
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # Only one probe at a time.
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert metrics.breaker_state == {"ollama": "closed"}
+    assert metrics.breaker_transitions == {("ollama", "open"): 2, ("ollama", "half_open"): 2, ("ollama", "closed"): 1}
+    assert metrics.breaker_rejected == {"ollama": 2}
+    assert 'inbox_triage_circuit_breaker_state{dependency="ollama",state="closed"} 1' in render_prometheus(metrics)
+
+
+def test_retry_budget_limits_retries_to_a_share_of_requests():
+    clock = FakeClock()
+    metrics = Metrics()
+    budget = RetryBudget("api", ratio=0.5, min_per_second=0.0, capacity=1.0, metrics=metrics, clock=clock)
+
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    budget.record_request()
+    budget.record_request()
+    assert budget.try_spend()
+    assert metrics.retry_budget_exhausted == {"api": 1}
+
+    refilling = RetryBudget("api", min_per_second=2.0, capacity=1.0, clock=clock)
+    assert refilling.try_spend()
+    clock.now += 0.5
+    assert refilling.try_spend()
+
+
+@pytest.mark.asyncio
+async def test_retry_stop_gives_up_when_the_budget_is_empty():
+    budget = RetryBudget("ollama", ratio=0.0, min_per_second=0.0, capacity=2.0)
+    retrying = AsyncRetrying(
+        stop=retry_stop(10, budget=budget), wait=wait_none(), retry=retry_if_exception_type(ConnectionError)
+    )
+    attempts = 0
+
+    with pytest.raises(RetryError):
+        async for attempt in retrying:
+            with attempt:
+                attempts += 1
+                raise ConnectionError
+
+    assert attempts == 3
+    assert budget.tokens == 0
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_open_ollama_breaker_fails_fast_and_classification_uses_rules():
+    route = respx.post("http://ollama.test/api/generate").mock(side_effect=httpx.ConnectError("refused"))
+    metrics = Metrics()
+    breaker = CircuitBreaker("ollama", failure_threshold=2, reset_seconds=60, metrics=metrics)
+
+    async with OllamaClient("http://ollama.test", "llama3.1", 5, 1, metrics=metrics, breaker=breaker) as client:
+        for _ in range(2):
+            # Transport errors arrive wrapped, not as raw httpx exceptions.
+            with pytest.raises(OllamaError):
+                await client.generate("prompt")
+        engine = ClassificationEngine(client, min_confidence=0.5, metrics=metrics)
+        payload = await engine.classify_message(Message(id=1, subject="We regret to inform you"))
+
+    assert route.call_count == 2
+    assert payload.classified_by == "rules"
+    assert metrics.breaker_rejected == {"ollama": 1}
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_api_errors_carry_the_status_and_client_errors_are_not_retried():
+    route = respx.patch("http://api.test/messages/7").mock(return_value=httpx.Response(422))
+    breaker = CircuitBreaker("api", failure_threshold=1)
+
+    async with ApiClient("http://api.test", "token", 5, 3, breaker=breaker) as client:
+        with pytest.raises(ApiError) as excinfo:
+            await client.update_message(7, UpdatePayload(classification="other", classified_by="rules"))
+
+    assert excinfo.value.status_code == 422
+    assert route.call_count == 1
+    assert breaker.state == "closed"
+
@@ -0,0 +1,118 @@
+import pytest
+
+from inbox_triage_agent.cascade import parse_cascade
+from inbox_triage_agent.cache import ClassificationCache, cache_key
+from inbox_triage_agent.classifier import ClassificationEngine
+from inbox_triage_agent.metrics import Metrics
+from inbox_triage_agent.models import Message, UpdatePayload
+
+
+class CountingOllamaClient:
+    model = "llama3.1"
+
+    def __init__(self, response: str):
+        self._response = response
+        self.calls = 0
+
+    async def generate(self, prompt: str, *, options: dict | None = None, model: str | None = None) -> str:
+        self.calls += 1
+        return self._response
+
+
+def test_key_ignores_case_digits_and_volatile_headers():
+    first = Message(
+        id=1,
+        subject="Application #4821 received",
+        snippet="Thank you  for applying",
+        raw_headers={"From": "jobs@greenhouse.io", "Message-ID": "<a@x>"},
+    )
+    second = Message(
+        id=2,
+        subject="application #77 RECEIVED",
+        snippet="Thank you for applying",
+        raw_headers={"From": "jobs@greenhouse.io", "Message-ID": "<b@y>"},
+    )
+
+    assert cache_key(first, "llama3.1") == cache_key(second, "llama3.1")
+    assert cache_key(first, "llama3.1") != cache_key(first, "qwen2.5")
+    context = "Earlier messages in this thread were classified as interview_invite"
+    assert cache_key(first, "llama3.1", context=context) != cache_key(first, "llama3.1")
+
+
+@pytest.mark.asyncio
+async def test_hit_skips_llm_and_rules_fallbacks_are_not_cached():
+    metrics = Metrics()
+    cache = ClassificationCache(max_entries=10, metrics=metrics)
+    client = CountingOllamaClient('{"label":"auto_ack","confidence":0.9,"reason":"ack"}')
+    engine = ClassificationEngine(client, min_confidence=0.5, cache=cache)
+
+    first = await engine.classify_message(Message(id=1, subject="We received your application 123"))
+    second = await engine.classify_message(Message(id=2, subject="We received your application 456"))
+
+    assert client.calls == 1
+    assert second == first
+    assert (metrics.cache_hits, metrics.cache_misses) == (1, 1)
+
+    low = CountingOllamaClient('{"label":"offer","confidence":0.1}')
+    engine = ClassificationEngine(low, min_confidence=0.5, cache=cache)
+    await engine.classify_message(Message(id=3, subject="Quick question"))
+    await engine.classify_message(Message(id=4, subject="Quick question"))
+
+    assert low.calls == 2
+
+
+def test_lru_eviction_and_disk_persistence(tmp_path):
+    metrics = Metrics()
+    path = tmp_path / "cache.sqlite3"
+    payload = UpdatePayload(classification="rejection", classified_by="llm", confidence=0.8)
+
+    cache = ClassificationCache(max_entries=1, path=path, metrics=metrics)
+    cache.put("a", payload)
+    cache.put("b", payload)
+    assert len(cache) == 1
+    assert metrics.cache_evictions == 1
+    cache.close()
+
+    reopened = ClassificationCache(max_entries=1, path=path, metrics=metrics)
+    assert reopened.get("a") == payload
+    assert reopened.get("missing") is None
+    reopened.close()
+
+
+def test_disk_layer_expires_and_caps_rows(tmp_path):
+    now = [1_000.0]
+    metrics = Metrics()
+    path = tmp_path / "cache.sqlite3"
+    payload = UpdatePayload(classification="rejection", classified_by="llm", confidence=0.8)
+
+    cache = ClassificationCache(
+        max_entries=1, path=path, metrics=metrics, max_rows=2, max_age_seconds=60, clock=lambda: now[0]
+    )
+    for key in ("a", "b", "c"):
+        cache.put(key, payload)
+        now[0] += 1
+    assert cache.prune() == 1
+    now[0] += 60
+    # "c" is still in memory, but the disk rows have expired.
+    assert cache.get("b") is None
+    cache.close()
+
+    reopened = ClassificationCache(path=path, metrics=metrics, max_rows=2, max_age_seconds=60, clock=lambda: now[0])
+    assert reopened.get("c") is None
+    reopened.close()
+    assert metrics.cache_evictions == 2 + 1 + 2
+
+
+@pytest.mark.asyncio
+async def test_cascade_answers_are_cached_under_the_cascade():
+    client = CountingOllamaClient('{"label": "rejection", "confidence": 0.9, "reason": "declined"}')
+    cache = ClassificationCache()
+    plain = ClassificationEngine(client, min_confidence=0.5, cache=cache)
+    cascaded = ClassificationEngine(
+        client, min_confidence=0.5, cache=cache, cascade=parse_cascade("qwen2.5:1.5b;llama3.1", default_confidence=0.5)
+    )
+
+    await cascaded.classify_message(Message(id=1, subject="We regret to inform you"))
+    await plain.classify_message(Message(id=2, subject="We regret to inform you"))
+
+    assert client.calls == 2
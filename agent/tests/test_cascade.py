@@ -0,0 +1,89 @@
+import json
+import re
+
+import pytest
+
+from inbox_triage_agent.cascade import parse_cascade
+from inbox_triage_agent.classifier import ClassificationEngine
+from inbox_triage_agent.metrics import Metrics
+from inbox_triage_agent.models import Message
+
+
+class TwoModelLLM:
+    """The small model is unsure about offers; the large one is always sure."""
+
+    model = "large"
+
+    def __init__(self):
+        self.calls: list[str] = []
+
+    async def generate(self, prompt: str, *, options: dict | None = None, model: str | None = None) -> str:
+        self.calls.append(model or self.model)
+        confident = model != "small"
+
+        def answer(subject: str) -> dict:
+            label = "offer" if "Offer" in subject else "rejection"
+            confidence = 0.6 if label == "offer" and not confident else 0.95
+            return {"label": label, "confidence": confidence, "reason": model}
+
+        emails = re.findall(r"^Email id (\d+):\nSubject: (.*)$", prompt, re.M)
+        if emails:
+            return json.dumps([{"id": int(email_id), **answer(subject)} for email_id, subject in emails])
+        return json.dumps(answer(re.search(r"^Subject: (.*)$", prompt, re.M).group(1)))
+
+
+def test_parse_cascade_reads_models_thresholds_and_label_overrides():
+    tiers = parse_cascade("qwen2.5:1.5b@0.8,offer=0.95; llama3.1", default_confidence=0.5)
+
+    assert [tier.model for tier in tiers] == ["qwen2.5:1.5b", "llama3.1"]
+    assert tiers[0].threshold("offer") == 0.95
+    assert tiers[0].threshold("rejection") == 0.8
+    assert tiers[1].threshold("offer") == 0.5
+    with pytest.raises(ValueError):
+        parse_cascade("small@0.8,unknown_label=0.9", default_confidence=0.5)
+    with pytest.raises(ValueError):
+        parse_cascade("small@1.5", default_confidence=0.5)
+
+
+@pytest.mark.asyncio
+async def test_cascade_escalates_only_low_confidence_answers():
+    llm = TwoModelLLM()
+    metrics = Metrics()
+    engine = ClassificationEngine(
+        llm,
+        min_confidence=0.5,
+        metrics=metrics,
+        cascade=parse_cascade("small@0.8;large@0.5", default_confidence=0.5),
+    )
+
+    rejection = await engine.classify_message(Message(id=1, subject="Update on your application"))
+    offer = await engine.classify_message(Message(id=2, subject="Offer letter"))
+
+    assert (rejection.classification, rejection.reason) == ("rejection", "small")
+    assert (offer.classification, offer.reason) == ("offer", "large")
+    assert llm.calls == ["small", "small", "large"]
+    assert metrics.cascade_resolved == {"small": 1, "large": 1}
+    assert metrics.cascade_escalated == {"small": 1}
+    assert metrics.cascade_share("small") == 0.5
+    assert metrics.cascade_latency["small"].count == 2
+
+
+@pytest.mark.asyncio
+async def test_batches_use_the_first_tier_and_escalate_individually():
+    llm = TwoModelLLM()
+    metrics = Metrics()
+    engine = ClassificationEngine(
+        llm,
+        min_confidence=0.5,
+        metrics=metrics,
+        cascade=parse_cascade("small@0.8;large@0.99", default_confidence=0.5),
+    )
+    messages = [Message(id=1, subject="Sorry"), Message(id=2, subject="Offer"), Message(id=3, subject="No")]
+
+    payloads = await engine.classify_batch(messages)
+
+    assert llm.calls == ["small", "large"]
+    # The large model's 0.95 misses its 0.99 bar, so rules get the last word.
+    assert [payload.classified_by for payload in payloads] == ["llm", "rules", "llm"]
+    assert metrics.cascade_resolved == {"small": 2, "rules": 1}
+    assert metrics.cascade_escalated == {"small": 1, "large": 1}
@@ -1,7 +1,14 @@
 import pytest
 
-from inbox_triage_agent.classifier import ClassificationEngine, extract_first_json_object
-from inbox_triage_agent.models import Message
+from inbox_triage_agent.classifier import (
+    BATCH_SYSTEM_PROMPT,
+    SCHEMA_NUM_PREDICT,
+    ClassificationEngine,
+    extract_first_json_array,
+    extract_first_json_object,
+)
+from inbox_triage_agent.metrics import Metrics
+from inbox_triage_agent.models import LABELS, Message
 
 
 class StubOllamaClient:
@@ -58,3 +65,93 @@ async def test_falls_back_on_invalid_json():
 
     assert payload.classified_by == "rules"
     assert payload.classification == "other"
+
+
+def test_extracts_json_array_ignoring_brackets_in_strings():
+    payload = 'Sure: [{"id":1,"label":"oa","reason":"has [link] and {braces}"}] trailing ]'
+    assert extract_first_json_array(payload) == '[{"id":1,"label":"oa","reason":"has [link] and {braces}"}]'
+
+
+@pytest.mark.asyncio
+async def test_batch_retries_missing_entries_individually():
+    messages = [
+        Message(id=10, subject="Offer letter", snippet="Congrats"),
+        Message(id=11, subject="Coding test", snippet="Complete within 3 days"),
+    ]
+    client = StubOllamaClient([
+        '[{"id":10,"label":"offer","confidence":0.9,"reason":"offer"}, {"id":11,"label":"bogus"}]',
+        '{"label":"oa","confidence":0.8,"reason":"assessment"}',
+    ])
+    engine = ClassificationEngine(client, min_confidence=0.5)
+
+    payloads = await engine.classify_batch(messages)
+
+    assert [p.classification for p in payloads] == ["offer", "oa"]
+    assert [p.classified_by for p in payloads] == ["llm", "llm"]
+
+
+@pytest.mark.asyncio
+async def test_batch_schema_enforces_the_array_the_prompt_asks_for():
+    class RecordingClient:
+        def __init__(self):
+            self.formats: list = []
+
+        async def generate(self, prompt: str, *, options: dict | None = None, format=None) -> str:
+            self.formats.append(format)
+            return (
+                '[{"id":30,"label":"offer","confidence":0.9,"reason":"x"},'
+                '{"id":31,"label":"oa","confidence":0.9,"reason":"y"}]'
+            )
+
+    client = RecordingClient()
+    engine = ClassificationEngine(client, min_confidence=0.5, output_format="schema")
+
+    payloads = await engine.classify_batch([Message(id=30, subject="Offer"), Message(id=31, subject="Test")])
+
+    assert [p.classification for p in payloads] == ["offer", "oa"]
+    assert client.formats[0]["type"] == "array"
+    assert client.formats[0]["items"]["required"] == ["id", "label", "confidence", "reason"]
+    assert "JSON array" in BATCH_SYSTEM_PROMPT
+
+
+@pytest.mark.asyncio
+async def test_batch_can_fall_back_to_rules():
+    messages = [
+        Message(id=20, subject="We regret to inform you"),
+        Message(id=21, subject="Newsletter"),
+    ]
+    client = StubOllamaClient(['[{"id":20,"label":"rejection","confidence":0.95}]'])
+    engine = ClassificationEngine(client, min_confidence=0.5, batch_fallback="rules")
+
+    payloads = await engine.classify_batch(messages)
+
+    assert payloads[0].classified_by == "llm"
+    assert payloads[1].classified_by == "rules"
+    assert payloads[1].classification == "not_job_related"
+
+
+@pytest.mark.asyncio
+async def test_schema_output_constrains_labels_and_counts_parse_failures():
+    class RecordingClient:
+        def __init__(self, responses):
+            self._responses = responses
+            self.calls: list[dict] = []
+
+        async def generate(self, prompt: str, *, options: dict | None = None, format=None) -> str:
+            self.calls.append({"options": options, "format": format})
+            return self._responses.pop(0)
+
+    metrics = Metrics()
+    client = RecordingClient(["truncated {\"label\":\"offer\"", '{"label":"offer","confidence":0.2,"reason":"x"}'])
+    engine = ClassificationEngine(client, min_confidence=0.5, output_format="schema", metrics=metrics)
+
+    await engine.classify_message(Message(id=4, subject="Hello"))
+    await engine.classify_message(Message(id=5, subject="Hello again"))
+
+    schema = client.calls[0]["format"]
+    assert schema["properties"]["label"]["enum"] == list(LABELS)
+    assert schema["required"] == ["label", "confidence", "reason"]
+    assert client.calls[0]["options"]["num_predict"] == SCHEMA_NUM_PREDICT
+    assert metrics.fallback_parse_errors == 1
+    assert metrics.fallback_low_confidence == 1
+    assert metrics.parse_error_fallback_share == pytest.approx(0.5)
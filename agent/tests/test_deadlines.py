@@ -0,0 +1,168 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+import respx
+
+from inbox_triage_agent.classifier import ClassificationEngine, message_deadline
+from inbox_triage_agent.deadlines import AdaptiveTimeout, hedged
+from inbox_triage_agent.metrics import Metrics, render_prometheus
+from inbox_triage_agent.models import Message
+from inbox_triage_agent.ollama_client import OllamaClient, OllamaError
+from inbox_triage_agent.runner import ClassificationPipeline
+from fakes import FakeApiClient, make_settings
+
+ANSWER = json.dumps({"label": "offer", "confidence": 0.9, "reason": "offer letter"})
+
+
+class ScriptedLLM:
+    """Answers after the delay scripted for each call, in order; later calls answer at once."""
+
+    model = "llama3.1"
+
+    def __init__(self, delays=()):
+        self.delays = list(delays)
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate(self, prompt: str, *, options: dict | None = None) -> str:
+        delay = self.delays[self.calls] if self.calls < len(self.delays) else 0.0
+        self.calls += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return ANSWER
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_ollama_timeout_follows_recent_latency():
+    respx.post("http://ollama.test/api/generate").mock(return_value=httpx.Response(200, json={"response": "{}"}))
+    adaptive = AdaptiveTimeout(30.0, factor=3.0, quantile=0.99, minimum=0.5, min_samples=5)
+
+    async with OllamaClient("http://ollama.test", "llama3.1", 30, 1, adaptive_timeout=adaptive) as client:
+        for _ in range(4):
+            await client.generate("prompt")
+        assert adaptive.timeout("llama3.1") == 30.0
+        await client.generate("prompt")
+
+    # Local responses are near-instant, so the timeout drops to its floor.
+    assert adaptive.timeout("llama3.1") == 0.5
+    for _ in range(5):
+        adaptive.observe("llama3.1", 20.0)
+    assert adaptive.timeout("llama3.1") == 30.0
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_adaptive_timeout_cuts_off_a_stream_that_keeps_trickling():
+    async def trickle():
+        for _ in range(20):
+            await asyncio.sleep(0.05)
+            yield json.dumps({"response": "x", "done": False}).encode() + b"\n"
+        yield json.dumps({"response": "", "done": True}).encode() + b"\n"
+
+    respx.post("http://ollama.test/api/generate").mock(
+        side_effect=lambda request: httpx.Response(200, content=trickle())
+    )
+    adaptive = AdaptiveTimeout(30.0, factor=3.0, minimum=0.1, min_samples=1)
+    adaptive.observe("llama3.1", 0.1)
+    metrics = Metrics()
+
+    async with OllamaClient(
+        "http://ollama.test", "llama3.1", 30, 1, metrics=metrics, adaptive_timeout=adaptive
+    ) as client:
+        started = time.perf_counter()
+        with pytest.raises(OllamaError):
+            await client.generate("prompt", stream=True)
+
+    # Every token arrives well within a per-read timeout, but the whole stream takes 1s.
+    assert time.perf_counter() - started < 0.6
+    assert metrics.ollama_timeouts == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_call_returns_the_faster_duplicate_and_cancels_the_loser():
+    llm = ScriptedLLM([5.0])
+    metrics = Metrics()
+
+    started = time.perf_counter()
+    result = await hedged(lambda: llm.generate("prompt"), delay=0.05, metrics=metrics)
+
+    assert result == ANSWER
+    assert time.perf_counter() - started < 1
+    assert llm.calls == 2
+    await asyncio.sleep(0)
+    assert llm.cancelled == 1
+    assert (metrics.hedge_requests, metrics.hedge_wins) == (1, 1)
+    assert metrics.hedge_wasted_seconds >= 0.05
+    assert 'inbox_triage_hedged_requests_total{winner="hedge"} 1' in render_prometheus(metrics)
+
+
+@pytest.mark.asyncio
+async def test_engine_hedges_slow_generations_once_it_has_latency_history():
+    llm = ScriptedLLM([0.0] * 20 + [5.0])
+    metrics = Metrics()
+    engine = ClassificationEngine(llm, min_confidence=0.5, metrics=metrics, hedge_quantile=0.95)
+    for message_id in range(20):
+        await engine.classify_message(Message(id=message_id, subject="Offer letter"))
+    assert metrics.hedge_requests == 0
+
+    payload = await asyncio.wait_for(engine.classify_message(Message(id=21, subject="Offer letter")), timeout=1)
+
+    assert payload.classified_by == "llm"
+    assert metrics.hedge_wins == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_deadline_falls_back_to_rules_instead_of_waiting():
+    llm = ScriptedLLM([5.0, 5.0])
+    metrics = Metrics()
+    engine = ClassificationEngine(llm, min_confidence=0.5, metrics=metrics)
+
+    with message_deadline(time.monotonic() + 0.05):
+        payload = await asyncio.wait_for(engine.classify_message(Message(id=1, subject="Offer letter")), timeout=1)
+    assert payload.classified_by == "rules"
+    assert llm.cancelled == 1
+
+    # Nothing is sent once the deadline has already passed.
+    with message_deadline(time.monotonic() - 1):
+        await engine.classify_batch([Message(id=2, subject="Offer"), Message(id=3, subject="Rejection")])
+    assert llm.calls == 1
+    assert metrics.fallback_deadline == 3
+    assert metrics.fallback_llm_errors == 0
+
+
+@pytest.mark.asyncio
+async def test_pipeline_applies_the_message_deadline():
+    stop_event = asyncio.Event()
+    api = FakeApiClient([Message(id=1, subject="Offer letter")], stop_event=stop_event)
+    metrics = Metrics()
+    engine = ClassificationEngine(ScriptedLLM([5.0]), min_confidence=0.5, metrics=metrics)
+    pipeline = ClassificationPipeline(api, engine, metrics, make_settings(MESSAGE_DEADLINE_SECONDS=0.1))
+
+    await asyncio.wait_for(pipeline.run(stop_event), timeout=2)
+
+    assert api.updated[1].classified_by == "rules"
+    assert metrics.fallback_deadline == 1
+
+
+@pytest.mark.asyncio
+async def test_time_spent_queued_does_not_count_against_the_deadline():
+    stop_event = asyncio.Event()
+    messages = [Message(id=i, subject="Offer letter") for i in range(1, 9)]
+    api = FakeApiClient(messages, stop_event=stop_event)
+    metrics = Metrics()
+    engine = ClassificationEngine(ScriptedLLM([0.05] * 8), min_confidence=0.5, metrics=metrics)
+    settings = make_settings(BATCH_SIZE=10, CLASSIFY_CONCURRENCY=1, CLAIM_MESSAGES=False, MESSAGE_DEADLINE_SECONDS=0.15)
+    pipeline = ClassificationPipeline(api, engine, metrics, settings)
+
+    await asyncio.wait_for(pipeline.run(stop_event), timeout=5)
+
+    # The last message waits about 0.35s in the queue, longer than its deadline.
+    assert {payload.classified_by for payload in api.updated.values()} == {"llm"}
+    assert metrics.fallback_deadline == 0
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from inbox_triage_agent.api_client import ApiError
+from inbox_triage_agent.journal import UpdateJournal
+from inbox_triage_agent.metrics import Metrics
+from inbox_triage_agent.models import Message, UpdatePayload
+from inbox_triage_agent.runner import ClassificationPipeline
+from fakes import FakeApiClient, SlowEngine, make_settings
+
+
+class FlakyApiClient(FakeApiClient):
+    """Refuses every update until ``outage`` update requests have failed."""
+
+    def __init__(self, messages, *, stop_event, outage: int):
+        super().__init__(messages, stop_event=stop_event)
+        self.outage = outage
+
+    async def update_message(self, message_id: int, payload: UpdatePayload) -> None:
+        self._check_outage()
+        await super().update_message(message_id, payload)
+
+    async def update_messages(self, updates) -> dict[int, str | None]:
+        self._check_outage()
+        return await super().update_messages(updates)
+
+    def _check_outage(self) -> None:
+        if self.outage > 0:
+            self.outage -= 1
+            raise ApiError("connection refused")
+
+
+class CountingEngine(SlowEngine):
+    def __init__(self):
+        super().__init__()
+        self.classified: list[int] = []
+
+    async def classify_message(self, message: Message) -> UpdatePayload:
+        self.classified.append(message.id)
+        return await super().classify_message(message)
+
+
+def test_journal_persists_pending_updates(tmp_path):
+    path = tmp_path / "journal.db"
+    journal = UpdateJournal(path)
+    payload = UpdatePayload(classification="offer", classified_by="llm", confidence=0.9)
+    journal.append([(1, payload), (2, payload)])
+    journal.remove([1])
+    journal.close()
+
+    reopened = UpdateJournal(path)
+    assert reopened.message_ids == {2}
+    assert reopened.pending(10) == [(2, payload)]
+    assert reopened.pending(10, exclude={2}) == []
+
+
+@pytest.mark.asyncio
+async def test_updates_survive_an_api_outage_without_reclassifying(tmp_path):
+    stop_event = asyncio.Event()
+    messages = [Message(id=i, subject=f"Message {i}") for i in (1, 2, 3, 4)]
+    api = FlakyApiClient(messages, stop_event=stop_event, outage=3)
+    engine = CountingEngine()
+    metrics = Metrics()
+    journal = UpdateJournal(tmp_path / "journal.db", metrics=metrics)
+    settings = make_settings(JOURNAL_RETRY_SECONDS=0.01)
+
+    pipeline = ClassificationPipeline(api, engine, metrics, settings, journal=journal)
+    await asyncio.wait_for(pipeline.run(stop_event), timeout=5)
+
+    assert sorted(api.updated) == [1, 2, 3, 4]
+    assert sorted(engine.classified) == [1, 2, 3, 4]
+    assert len(journal) == 0
+    assert metrics.journal_appended == 4
+    assert metrics.journal_flush_failures >= 1
+    assert metrics.processed == 4
+    assert metrics.failed == 0
+    assert pipeline.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_journaled_updates_are_replayed_at_startup(tmp_path):
+    path = tmp_path / "journal.db"
+    previous = UpdateJournal(path)
+    payload = UpdatePayload(classification="rejection", classified_by="llm", confidence=0.8)
+    previous.append([(1, payload), (2, payload)])
+    previous.close()
+
+    stop_event = asyncio.Event()
+    api = FakeApiClient([Message(id=i) for i in (1, 2, 3)], stop_event=stop_event)
+    engine = CountingEngine()
+    metrics = Metrics()
+    journal = UpdateJournal(path, metrics=metrics)
+
+    pipeline = ClassificationPipeline(api, engine, metrics, make_settings(), journal=journal)
+    await asyncio.wait_for(pipeline.run(stop_event), timeout=5)
+
+    assert engine.classified == [3]
+    assert api.updated[1].classification == "rejection"
+    assert sorted(api.updated) == [1, 2, 3]
+    assert metrics.journal_replayed == 2
+    assert len(journal) == 0
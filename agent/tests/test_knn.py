@@ -0,0 +1,74 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from inbox_triage_agent.classifier import ClassificationEngine
+from inbox_triage_agent.knn import EmbeddingIndex
+from inbox_triage_agent.metrics import Metrics
+from inbox_triage_agent.models import Message
+
+
+def test_vote_requires_close_and_unanimous_neighbours():
+    index = EmbeddingIndex(capacity=10)
+    index.add([1.0, 0.0, 0.0], "rejection")
+    index.add([0.99, 0.05, 0.0], "rejection")
+    index.add([0.0, 1.0, 0.0], "offer")
+
+    label, similarity = index.vote([1.0, 0.01, 0.0], k=2, min_similarity=0.9)
+    assert label == "rejection"
+    assert similarity > 0.9
+    assert index.vote([1.0, 0.01, 0.0], k=3, min_similarity=0.0) is None
+    assert index.vote([0.7, 0.7, 0.0], k=2, min_similarity=0.9) is None
+
+
+def test_capacity_evicts_oldest_and_survives_reload(tmp_path):
+    path = tmp_path / "index.npz"
+    metrics = Metrics()
+    index = EmbeddingIndex(capacity=2, path=path, metrics=metrics)
+    index.add([1.0, 0.0], "rejection")
+    index.add([0.0, 1.0], "offer")
+    index.add([-1.0, 0.0], "auto_ack")
+    index.close()
+
+    assert metrics.knn_evictions == 1
+    reloaded = EmbeddingIndex(capacity=2, path=path)
+    assert len(reloaded) == 2
+    assert reloaded.nearest([1.0, 0.0], 2)[-1][0] == "auto_ack"
+    assert {label for label, _ in reloaded.nearest([0.0, 1.0], 2)} == {"offer", "auto_ack"}
+
+
+class EmbeddingStub:
+    model = "stub"
+
+    def __init__(self, responses):
+        self._responses = responses
+        self.generations = 0
+
+    async def embed(self, texts, *, model=None):
+        return [[1.0, 0.0] if "regret" in text else [0.0, 1.0] for text in texts]
+
+    async def generate(self, prompt, *, options=None):
+        self.generations += 1
+        return self._responses.pop(0)
+
+
+@pytest.mark.asyncio
+async def test_confident_llm_answers_teach_the_index_to_skip_generation():
+    metrics = Metrics()
+    client = EmbeddingStub(['{"label":"rejection","confidence":0.95,"reason":"declined"}'] * 2)
+    engine = ClassificationEngine(
+        client,
+        min_confidence=0.5,
+        metrics=metrics,
+        knn_index=EmbeddingIndex(capacity=10, metrics=metrics),
+        knn_k=2,
+        knn_min_similarity=0.9,
+    )
+
+    first = [await engine.classify_message(Message(id=i, subject="We regret", snippet="to inform you")) for i in (1, 2)]
+    third = await engine.classify_message(Message(id=3, subject="Sadly we regret", snippet="to inform you"))
+
+    assert [payload.classification for payload in first] == ["rejection", "rejection"]
+    assert third.classification == "rejection"
+    assert client.generations == 2
+    assert (metrics.knn_hits, metrics.knn_misses, metrics.knn_added) == (1, 2, 2)
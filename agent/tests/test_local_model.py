@@ -0,0 +1,91 @@
+import json
+import random
+
+import pytest
+
+from inbox_triage_agent.classifier import ClassificationEngine
+from inbox_triage_agent.cli import main
+from inbox_triage_agent.local_model import NaiveBayesModel, evaluate, message_features, read_examples
+from inbox_triage_agent.metrics import Metrics
+from inbox_triage_agent.models import Message
+
+_TEMPLATES = {
+    "rejection": ("Your application to {company}", "Unfortunately we will not be moving forward with you."),
+    "auto_ack": ("Thank you for applying to {company}", "We received your application and will review it."),
+    "oa": ("{company} coding challenge", "Please complete the online assessment within five days."),
+    "interview_invite": ("Interview with {company}", "Could you share your availability for a call next week?"),
+}
+
+
+def labelled(count, seed=3):
+    rng = random.Random(seed)
+    companies = ["Acme", "Globex", "Initech", "Hooli", "Umbrella", "Stark"]
+    examples = []
+    for index in range(count):
+        label = rng.choice(sorted(_TEMPLATES))
+        subject, snippet = _TEMPLATES[label]
+        message = Message(id=index, subject=subject.format(company=rng.choice(companies)), snippet=snippet)
+        examples.append((message, label))
+    return examples
+
+
+def test_model_learns_templates_and_round_trips(tmp_path):
+    model = NaiveBayesModel().fit(labelled(200))
+    model.calibrate(labelled(40, seed=4))
+    path = tmp_path / "model.json"
+    model.save(path)
+
+    reloaded = NaiveBayesModel.load(path)
+    result = evaluate(reloaded, labelled(50, seed=5), threshold=0.9)
+
+    assert result.accuracy == 1.0
+    assert result.llm_calls_avoided > 0.9
+    assert reloaded.predict(Message(id=1, subject="Hooli coding challenge")) == model.predict(
+        Message(id=1, subject="Hooli coding challenge")
+    )
+
+
+class RefusingClient:
+    model = "stub"
+
+    async def generate(self, prompt, *, options=None):
+        return '{"label":"offer","confidence":0.9,"reason":"escalated"}'
+
+
+@pytest.mark.asyncio
+async def test_engine_escalates_only_uncertain_predictions():
+    metrics = Metrics()
+    model = NaiveBayesModel().fit(labelled(200))
+    engine = ClassificationEngine(
+        RefusingClient(), min_confidence=0.5, metrics=metrics, local_model=model, local_min_probability=0.9
+    )
+
+    known = await engine.classify_message(Message(id=1, subject="Your application to Acme", snippet="Unfortunately"))
+    unknown = await engine.classify_message(Message(id=2, subject="Lunch?", snippet="Pizza on friday"))
+
+    assert (known.classification, known.classified_by) == ("rejection", "rules")
+    assert unknown.classified_by == "llm"
+    assert (metrics.local_model_hits, metrics.local_model_escalations) == (1, 1)
+
+
+def test_train_and_evaluate_commands_report_calls_avoided(tmp_path, capsys):
+    data = tmp_path / "labelled.jsonl"
+    data.write_text(
+        "\n".join(json.dumps({**message.model_dump(), "classification": label}) for message, label in labelled(300))
+    )
+    model_path = tmp_path / "model.json"
+
+    main(["train", "--data", str(data), "--output", str(model_path)])
+    main(["evaluate", "--data", str(data), "--model", str(model_path), "--threshold", "0.8"])
+
+    output = capsys.readouterr().out
+    assert "trained on 240 messages" in output
+    assert "llm_calls_avoided=" in output
+    assert len(read_examples(data)) == 300
+
+
+def test_features_include_the_sender_domain_served_by_the_api():
+    served = {"id": 1, "subject": "Hi", "raw_headers": {"from": "Acme Talent <no-reply@Greenhouse.io>"}}
+    with_sender = message_features(Message.model_validate(served))
+
+    assert len(with_sender) == len(message_features(Message(id=1, subject="Hi"))) + 1
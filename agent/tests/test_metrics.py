@@ -0,0 +1,36 @@
+import httpx
+import pytest
+
+from inbox_triage_agent.metrics import Metrics, render_prometheus
+from inbox_triage_agent.metrics_server import MetricsServer
+
+
+def test_render_prometheus_includes_stage_histograms_and_gauges():
+    metrics = Metrics(processed=3)
+    metrics.gauges["claim_queue"] = lambda: 7
+    metrics.record_retry("api")
+    with metrics.time_stage("parse"):
+        pass
+
+    text = render_prometheus(metrics)
+
+    assert "inbox_triage_processed_total 3" in text
+    assert 'inbox_triage_retries_total{dependency="api"} 1' in text
+    assert 'inbox_triage_gauge{name="claim_queue"} 7' in text
+    assert 'inbox_triage_stage_seconds_bucket{stage="parse",le="+Inf"} 1' in text
+    assert 'inbox_triage_stage_seconds_count{stage="generate"} 0' in text
+
+
+@pytest.mark.asyncio
+async def test_metrics_server_serves_scrapes():
+    metrics = Metrics(failed=2)
+
+    async with MetricsServer(metrics, port=0) as server:
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"http://127.0.0.1:{server.port}/metrics")
+            missing = await client.get(f"http://127.0.0.1:{server.port}/nope")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "inbox_triage_failed_total 2" in response.text
+    assert missing.status_code == 404
@@ -0,0 +1,126 @@
+import json
+
+import httpx
+import pytest
+import respx
+
+from inbox_triage_agent.json_extract import IncrementalJsonExtractor
+from inbox_triage_agent.metrics import Metrics
+from inbox_triage_agent.ollama_client import GenerationStats, OllamaClient, OllamaError
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_generate_sends_system_prompt_and_keep_alive_and_records_cold_start():
+    route = respx.post("http://ollama.test/api/generate").mock(
+        side_effect=[
+            httpx.Response(200, json={"response": "{}", "load_duration": 2_000_000_000}),
+            httpx.Response(200, json={"response": "{}", "load_duration": 1_000_000}),
+        ]
+    )
+    metrics = Metrics()
+
+    async with OllamaClient("http://ollama.test", "llama3.1", 5, 1, keep_alive="-1", metrics=metrics) as client:
+        await client.generate("Email to classify", system="You are a classifier")
+        await client.generate("Email to classify", system="You are a classifier")
+
+    body = json.loads(route.calls[0].request.content)
+    assert body["system"] == "You are a classifier"
+    assert body["keep_alive"] == -1
+    assert metrics.ollama_cold_requests == 1
+    assert metrics.ollama_warm_requests == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_warm_up_loads_model_with_empty_prompt():
+    route = respx.post("http://ollama.test/api/generate").mock(return_value=httpx.Response(200, json={"done": True}))
+    metrics = Metrics()
+
+    async with OllamaClient("http://ollama.test", "llama3.1", 5, 1, keep_alive="30m", metrics=metrics) as client:
+        await client.warm_up()
+
+    body = json.loads(route.calls[0].request.content)
+    assert body == {"model": "llama3.1", "prompt": "", "stream": False, "keep_alive": "30m"}
+    assert metrics.ollama_warm_up_seconds is not None
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_streaming_stops_once_json_object_is_complete():
+    chunks = ['{"label":', '"oa",', '"confidence":0.9}', " I hope", " this helps", ""]
+    lines = [json.dumps({"response": chunk, "done": False}) for chunk in chunks[:-1]]
+    lines.append(json.dumps({"response": "", "done": True, "eval_count": 40}))
+    respx.post("http://ollama.test/api/generate").mock(
+        return_value=httpx.Response(200, content="\n".join(lines).encode())
+    )
+    metrics = Metrics()
+    stats = GenerationStats()
+
+    async with OllamaClient("http://ollama.test", "llama3.1", 5, 1, metrics=metrics) as client:
+        text = await client.generate(
+            "prompt",
+            options={"num_predict": 256},
+            stream=True,
+            stop_after_json="object",
+            stats=stats,
+        )
+
+    assert text == '{"label":"oa","confidence":0.9}'
+    assert stats.stopped_early
+    assert stats.tokens == 3
+    assert stats.tokens_saved == 253
+    assert stats.time_to_json is not None
+    assert metrics.stream_stopped_early == 1
+
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_retried_stream_reports_only_the_answering_attempt():
+    async def broken_stream():
+        for _ in range(5):
+            yield json.dumps({"response": "x", "done": False}).encode() + b"\n"
+        raise httpx.ReadError("connection reset")
+
+    answer = [json.dumps({"response": '{"label":"oa"}', "done": False}), json.dumps({"done": True})]
+    respx.post("http://ollama.test/api/generate").mock(
+        side_effect=[
+            httpx.Response(200, content=broken_stream()),
+            httpx.Response(200, content="\n".join(answer).encode()),
+        ]
+    )
+    stats = GenerationStats()
+
+    async with OllamaClient("http://ollama.test", "llama3.1", 5, 2) as client:
+        text = await client.generate("prompt", stream=True, stats=stats)
+
+    assert text == '{"label":"oa"}'
+    assert stats.tokens == 1
+    assert stats.time_to_first_token is not None and stats.time_to_first_token < stats.elapsed
+
+def test_incremental_extractor_handles_split_strings():
+    extractor = IncrementalJsonExtractor()
+
+    assert extractor.feed('noise {"reason":"a } inside') is None
+    assert extractor.feed(' a string"') is None
+    assert extractor.feed(', "label":"oa"} tail') == '{"reason":"a } inside a string", "label":"oa"}'
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_embed_batches_texts_and_wraps_missing_model_errors():
+    route = respx.post("http://ollama.test/api/embed").mock(
+        side_effect=[
+            httpx.Response(200, json={"embeddings": [[0.1, 0.2], [0.3, 0.4]]}),
+            httpx.Response(404, json={"error": "model not found"}),
+        ]
+    )
+
+    async with OllamaClient("http://ollama.test", "llama3.1", 5, 1) as client:
+        vectors = await client.embed(["first", "second"], model="nomic-embed-text")
+        with pytest.raises(OllamaError):
+            await client.embed(["third"], model="missing")
+
+    assert vectors == [[0.1, 0.2], [0.3, 0.4]]
+    assert json.loads(route.calls[0].request.content)["input"] == ["first", "second"]
@@ -0,0 +1,113 @@
+import asyncio
+
+import httpx
+import pytest
+import respx
+
+from inbox_triage_agent.metrics import LatencyHistogram, Metrics
+from inbox_triage_agent.ollama_client import OllamaError
+from inbox_triage_agent.ollama_pool import OllamaPool, parse_node_specs
+
+
+def test_parse_node_specs_reads_optional_concurrency():
+    assert parse_node_specs("http://a:11434=2, http://b:11434", default_concurrency=3) == [
+        ("http://a:11434", 2),
+        ("http://b:11434", 3),
+    ]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_pool_spreads_load_by_concurrency_cap():
+    started = {"a": 0, "b": 0}
+    release = asyncio.Event()
+
+    def handler(name):
+        async def respond(request):
+            started[name] += 1
+            await release.wait()
+            return httpx.Response(200, json={"response": name})
+
+        return respond
+
+    respx.post("http://a.test/api/generate").mock(side_effect=handler("a"))
+    respx.post("http://b.test/api/generate").mock(side_effect=handler("b"))
+    metrics = Metrics()
+
+    async with OllamaPool([("http://a.test", 2), ("http://b.test", 1)], "llama3.1", 5, 1, metrics=metrics) as pool:
+        tasks = [asyncio.create_task(pool.generate("prompt")) for _ in range(4)]
+        await asyncio.sleep(0.05)
+        # The fourth request waits: both nodes are at their caps.
+        assert started == {"a": 2, "b": 1}
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+    assert results.count("a") >= 2 and results.count("b") >= 1
+    assert metrics.ollama_node_latency["http://a.test"].count + metrics.ollama_node_latency["http://b.test"].count == 4
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_pool_ejects_failing_node_and_readmits_after_probe():
+    async def slow_a(request):
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"response": "a"})
+
+    respx.post("http://a.test/api/generate").mock(side_effect=slow_a)
+    broken = respx.post("http://b.test/api/generate").mock(return_value=httpx.Response(500))
+    probe = respx.get("http://b.test/api/version").mock(return_value=httpx.Response(503))
+    metrics = Metrics()
+
+    async with OllamaPool(
+        [("http://a.test", 1), ("http://b.test", 5)],
+        "llama3.1",
+        5,
+        1,
+        metrics=metrics,
+        eject_after=2,
+        probe_interval=0.01,
+    ) as pool:
+        # While a is busy the other requests go to b, fail there and are retried on a.
+        results = await asyncio.gather(*(pool.generate("prompt") for _ in range(4)))
+        assert results == ["a"] * 4
+        node_b = pool.nodes[1]
+        assert not node_b.healthy
+        assert metrics.ollama_node_ejections == {"http://b.test": 1}
+
+        probe.mock(return_value=httpx.Response(200, json={"version": "0.5.0"}))
+        broken.mock(return_value=httpx.Response(200, json={"response": "b"}))
+        for _ in range(50):
+            if node_b.healthy:
+                break
+            await asyncio.sleep(0.01)
+        assert node_b.healthy
+
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_missing_model_404_does_not_eject_the_node():
+    embed = respx.post("http://a.test/api/embed").mock(
+        return_value=httpx.Response(404, json={"error": "model 'nomic-embed-text' not found"})
+    )
+    respx.post("http://a.test/api/generate").mock(return_value=httpx.Response(200, json={"response": "a"}))
+    metrics = Metrics()
+
+    async with OllamaPool([("http://a.test", 1)], "llama3.1", 5, 1, metrics=metrics, eject_after=2) as pool:
+        for _ in range(3):
+            with pytest.raises(OllamaError):
+                await pool.embed(["text"], model="nomic-embed-text")
+        assert await pool.generate("prompt") == "a"
+        assert pool.nodes[0].healthy
+
+    assert embed.call_count == 3
+    assert metrics.ollama_node_ejections == {}
+
+def test_latency_histogram_quantiles_use_bucket_bounds():
+    histogram = LatencyHistogram()
+    for seconds in (0.2, 0.3, 0.4, 4.0):
+        histogram.observe(seconds)
+
+    assert histogram.quantile(0.5) == 0.5
+    assert histogram.quantile(0.99) == 5.0
+    assert histogram.mean == pytest.approx(1.225)
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from inbox_triage_agent.metrics import Metrics
+from inbox_triage_agent.models import Message, UpdatePayload
+from inbox_triage_agent.priority import PriorityScheduler, PriorityScorer
+from inbox_triage_agent.rules import classify_with_rules
+from inbox_triage_agent.runner import ClassificationPipeline
+from fakes import FakeApiClient, make_settings
+
+NEWSLETTER_HEADERS = {"From": "Digest <news@example.com>", "List-Unsubscribe": "<https://example.com/u>"}
+
+
+def newsletter(message_id: int) -> Message:
+    return Message(id=message_id, subject="Weekly digest", snippet="Top stories", raw_headers=NEWSLETTER_HEADERS)
+
+
+def offer(message_id: int) -> Message:
+    return Message(
+        id=message_id,
+        subject="Offer letter",
+        snippet="We are excited to extend an offer",
+        raw_headers={"From": "Acme Talent <no-reply@greenhouse.io>"},
+    )
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_scorer_ranks_offers_above_bulk_mail():
+    scorer = PriorityScorer()
+    plain_offer = Message(id=2, subject="Offer letter", snippet="We are excited to extend an offer")
+
+    assert scorer.score(offer(1)) > scorer.score(plain_offer) > scorer.score(newsletter(3))
+
+
+def test_scorer_prefers_recently_received_mail():
+    scorer = PriorityScorer(clock=lambda: 1_800_000_000.0)
+    fresh = Message.model_validate({"id": 1, "subject": "Hello", "internal_ts": "2027-01-15T07:00:00.000Z"})
+    stale = Message.model_validate({"id": 2, "subject": "Hello", "internal_ts": "2026-01-01T00:00:00.000Z"})
+
+    assert scorer.score(fresh) > scorer.score(stale) == scorer.score(Message(id=3, subject="Hello"))
+
+
+@pytest.mark.asyncio
+async def test_scheduler_dispatches_by_priority_and_ages_waiting_groups():
+    clock = FakeClock()
+    metrics = Metrics()
+    queue = PriorityScheduler(PriorityScorer().score, aging=1.0, metrics=metrics, clock=clock)
+
+    await queue.put([newsletter(1)])
+    await queue.put([offer(2)])
+    assert [message.id for message in await queue.get()] == [2]
+
+    # After waiting longer than the score gap, the newsletter beats a fresh offer.
+    clock.now = 1_000
+    await queue.put([offer(3)])
+    assert [message.id for message in await queue.get()] == [1]
+    assert [message.id for message in await queue.get()] == [3]
+    assert metrics.priority_scores.count == 3
+
+
+class OrderedEngine:
+    def __init__(self):
+        self.order: list[int] = []
+
+    async def classify_message(self, message: Message) -> UpdatePayload:
+        self.order.append(message.id)
+        await asyncio.sleep(0.001)
+        label = classify_with_rules(message.combined_text())
+        return UpdatePayload(classification=label, classified_by="rules")
+
+
+@pytest.mark.asyncio
+async def test_pipeline_classifies_the_offer_ahead_of_the_backlog():
+    stop_event = asyncio.Event()
+    messages = [newsletter(i) for i in range(1, 40)] + [offer(41)]
+    api = FakeApiClient(messages, stop_event=stop_event)
+    engine = OrderedEngine()
+    metrics = Metrics()
+    settings = make_settings(BATCH_SIZE=50, CLASSIFY_CONCURRENCY=1, CLAIM_MESSAGES=False)
+
+    pipeline = ClassificationPipeline(api, engine, metrics, settings)
+    await asyncio.wait_for(pipeline.run(stop_event), timeout=5)
+
+    assert engine.order.index(41) < 3
+    assert metrics.time_to_label["offer"].count == 1
+    # Scored once per message at fetch, not again for the classify queue.
+    assert metrics.priority_scores.count == len(messages)
+    assert metrics.time_to_label["offer"].mean < metrics.time_to_label["other"].mean
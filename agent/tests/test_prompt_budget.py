@@ -0,0 +1,64 @@
+import pytest
+
+from inbox_triage_agent.classifier import ClassificationEngine
+from inbox_triage_agent.metrics import Metrics
+from inbox_triage_agent.models import Message
+from inbox_triage_agent.prompt_budget import PromptCompactor, estimate_tokens, truncate_to_tokens
+
+
+class RecordingLLM:
+    model = "stub"
+
+    def __init__(self):
+        self.prompts: list[str] = []
+
+    async def generate(self, prompt: str, *, options: dict | None = None) -> str:
+        self.prompts.append(prompt)
+        return '{"label": "offer", "confidence": 0.9, "reason": "offer"}'
+
+
+def test_truncate_to_tokens_cuts_at_a_word_boundary():
+    text = "word " * 100
+    truncated = truncate_to_tokens(text, 10)
+    assert estimate_tokens(truncated) <= 12
+    assert truncated.endswith("word …")
+    assert truncate_to_tokens("short text", 10) == "short text"
+
+
+def test_compactor_keeps_only_informative_headers():
+    metrics = Metrics()
+    message = Message(
+        id=1,
+        snippet="x" * 2000,
+        raw_headers={
+            "From": "Acme <jobs@acme.com>",
+            "DKIM-Signature": "v=1; b=" + "a" * 500,
+            "Received": "from mx.google.com",
+            "X-Greenhouse-Job-Id": "42",
+            "List-Unsubscribe": "<https://acme.com/u?t=" + "b" * 400 + ">",
+        },
+    )
+    compacted = PromptCompactor(snippet_tokens=50, metrics=metrics).compact(message)
+
+    assert list(compacted.raw_headers) == ["From", "X-Greenhouse-Job-Id", "List-Unsubscribe"]
+    assert len(compacted.raw_headers["List-Unsubscribe"]) <= 161
+    assert estimate_tokens(compacted.snippet) <= 52
+    assert metrics.prompt_headers_dropped == 2
+    assert metrics.prompt_snippets_truncated == 1
+    assert message.raw_headers["DKIM-Signature"].startswith("v=1")
+
+
+@pytest.mark.asyncio
+async def test_engine_prompts_with_compacted_message_and_records_length():
+    llm = RecordingLLM()
+    metrics = Metrics()
+    engine = ClassificationEngine(
+        llm, min_confidence=0.5, metrics=metrics, compactor=PromptCompactor(metrics=metrics)
+    )
+    message = Message(id=1, subject="Offer", snippet="We are excited", raw_headers={"ARC-Seal": "b=" + "c" * 900})
+
+    await engine.classify_message(message)
+
+    assert "ARC-Seal" not in llm.prompts[0]
+    assert metrics.prompt_tokens.count == 1
+    assert metrics.prompt_tokens.mean == estimate_tokens(llm.prompts[0])
@@ -0,0 +1,87 @@
+import asyncio
+
+import httpx
+import pytest
+
+from inbox_triage_agent.models import Message, UpdatePayload
+from inbox_triage_agent.push import PushReceiver
+from inbox_triage_agent.runner import ClassificationPipeline, Metrics
+from fakes import make_settings
+
+
+@pytest.mark.asyncio
+async def test_receiver_accepts_ids_and_checks_token():
+    received: list[list[int]] = []
+
+    async with PushReceiver(received.append, port=0, token="secret") as receiver:
+        url = f"http://127.0.0.1:{receiver.port}/notify"
+        async with httpx.AsyncClient() as client:
+            accepted = await client.post(url, json={"message_ids": [4, 5]}, headers={"Authorization": "Bearer secret"})
+            unauthorized = await client.post(url, json={"message_ids": [6]})
+            invalid = await client.post(url, json={"message_ids": "7"}, headers={"Authorization": "Bearer secret"})
+
+    assert accepted.status_code == 202
+    assert unauthorized.status_code == 401
+    assert invalid.status_code == 400
+    assert received == [[4, 5]]
+
+
+@pytest.mark.asyncio
+async def test_pushed_ids_are_classified_without_waiting_for_the_poll():
+    stop_event = asyncio.Event()
+    inbox = {i: Message(id=i, subject=f"Message {i}") for i in (1, 2)}
+    updated: dict[int, UpdatePayload] = {}
+
+    class PushApi:
+        def __init__(self):
+            self.fetches: list[dict] = []
+
+        async def fetch_messages(self, *, classification, limit, offset=0, ids=None):
+            self.fetches.append({"ids": ids})
+            return [inbox[i] for i in ids or () if i in inbox]
+
+        async def claim_message(self, message_id):
+            return True
+
+        async def update_message(self, message_id, payload):
+            updated[message_id] = payload
+            inbox.pop(message_id)
+            if not inbox:
+                stop_event.set()
+
+    class Engine:
+        async def classify_message(self, message):
+            return UpdatePayload(classification="offer", classified_by="llm", confidence=0.9)
+
+    api = PushApi()
+    metrics = Metrics()
+    settings = make_settings(
+        PUSH_ENABLED=True, PUSH_RECONCILE_SECONDS=60, POLL_INTERVAL_SECONDS=60, API_BULK_SIZE=1
+    )
+    pipeline = ClassificationPipeline(api, Engine(), metrics, settings)
+
+    async def push_later():
+        # Let the first (empty) reconciliation sweep run and go idle.
+        await asyncio.sleep(0.05)
+        pipeline.notify([1, 2])
+
+    await asyncio.wait_for(asyncio.gather(pipeline.run(stop_event), push_later()), timeout=2)
+
+    assert sorted(updated) == [1, 2]
+    assert api.fetches[0] == {"ids": None}
+    assert api.fetches[1] == {"ids": [1, 2]}
+    assert metrics.push_to_label.count == 2
+
+
+@pytest.mark.asyncio
+async def test_ids_returned_without_being_pushed_are_ignored():
+    class ExtraIdApi:
+        async def fetch_messages(self, *, classification, limit, offset=0, ids=None):
+            return [Message(id=i, subject=f"Message {i}") for i in (*ids, 99)]
+
+    pipeline = ClassificationPipeline(ExtraIdApi(), None, Metrics(), make_settings(PUSH_ENABLED=True))
+    pipeline.notify([1])
+
+    fresh, _ = await pipeline._fetch_pushed()
+
+    assert [message.id for message in fresh] == [1]
@@ -0,0 +1,112 @@
+import pytest
+
+from inbox_triage_agent.classifier import ClassificationEngine
+from inbox_triage_agent.metrics import Metrics
+from inbox_triage_agent.models import Message
+from inbox_triage_agent.rules import RuleSet, classify_with_confident_rules, classify_with_rules
+
+
+def test_priority_order():
+    assert classify_with_rules("Unfortunately we regret to inform you") == "rejection"
+    assert classify_with_rules("Your offer and interview details") == "offer"
+    assert classify_with_rules("Hello there") == "other"
+
+
+def test_confident_rules_require_single_precise_label():
+    assert classify_with_confident_rules("We regret to inform you", min_precision=0.9) == (
+        "rejection",
+        0.97,
+        "regret to inform",
+    )
+    assert classify_with_confident_rules("Let's set up an interview", min_precision=0.9) is None
+    assert classify_with_confident_rules(
+        "Thank you for applying. Unfortunately we went another way.", min_precision=0.9
+    ) is None
+
+
+@pytest.mark.parametrize(
+    ("text", "label"),
+    [
+        ("Thank you for applying. We'd like to invite you to an onsite or a phone screen.", "interview_invite"),
+        ("Thank you for applying. Attached is your compensation package.", "offer"),
+    ],
+)
+def test_phrases_without_precision_veto_the_confident_label(text, label):
+    assert classify_with_confident_rules(text, min_precision=0.9) is None
+    assert classify_with_rules(text) == label
+
+
+class FailingOllamaClient:
+    async def generate(self, prompt: str, *, options: dict | None = None) -> str:
+        raise AssertionError("LLM should not be called")
+
+
+@pytest.mark.asyncio
+async def test_short_circuit_skips_llm():
+    metrics = Metrics()
+    engine = ClassificationEngine(
+        FailingOllamaClient(),
+        min_confidence=0.5,
+        rules_short_circuit=True,
+        metrics=metrics,
+    )
+
+    payload = await engine.classify_message(Message(id=1, subject="Thank you for applying to Acme"))
+
+    assert payload.classification == "auto_ack"
+    assert payload.classified_by == "rules"
+    assert payload.confidence == pytest.approx(0.93)
+    assert metrics.rules_bypassed == 1
+
+
+def test_scan_reports_labels_and_spans_in_one_pass():
+    rules = RuleSet.from_dict(
+        {
+            "priority": ["offer", "oa", "recruiter_reply"],
+            "rules": [
+                {"label": "offer", "words": ["offer"], "precision": 0.5},
+                {"label": "oa", "phrases": ["hackerrank", "hacker rank"]},
+                {"label": "recruiter_reply", "patterns": [r"next steps?"]},
+            ],
+        }
+    )
+
+    matches = rules.scan("Next step: a HackerRank test before the OFFER.")
+
+    assert [(m.label, m.start, m.end) for m in matches] == [
+        ("recruiter_reply", 0, 9),
+        ("oa", 13, 23),
+        ("offer", 40, 45),
+    ]
+    assert rules.classify("Offers page and a loophole") == "other"
+    assert rules.classify("hacker rank, then an offer") == "offer"
+
+
+def test_priority_applies_across_overlapping_phrases():
+    rules = RuleSet.from_dict(
+        {
+            "priority": ["interview_invite", "rejection"],
+            "rules": [
+                {"label": "interview_invite", "phrases": ["interview"]},
+                {"label": "rejection", "phrases": ["interview feedback"]},
+            ],
+        }
+    )
+
+    matches = rules.scan("Your interview feedback")
+
+    assert {(m.label, m.text) for m in matches} == {
+        ("interview_invite", "interview"),
+        ("rejection", "interview feedback"),
+    }
+    assert rules.classify("Your interview feedback") == "interview_invite"
+
+
+def test_rules_file_is_loadable(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text('{"priority": ["rejection"], "rules": [{"label": "rejection", "phrases": ["no longer hiring"]}]}')
+
+    rules = RuleSet.from_file(path)
+
+    assert classify_with_rules("They are no longer hiring", rules=rules) == "rejection"
+    assert classify_with_rules("Thank you for applying", rules=rules) == "other"
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from inbox_triage_agent.models import Message, UpdatePayload
+from inbox_triage_agent.runner import ClassificationPipeline, Metrics
+from fakes import FakeApiClient, SlowEngine, make_settings
+
+
+@pytest.mark.asyncio
+async def test_pipeline_classifies_concurrently_and_counts_failures():
+    stop_event = asyncio.Event()
+    messages = [Message(id=i, subject=f"Message {i}") for i in range(1, 10)]
+    api = FakeApiClient(messages, stop_event=stop_event, fail_updates={3})
+    engine = SlowEngine()
+    metrics = Metrics()
+
+    pipeline = ClassificationPipeline(api, engine, metrics, make_settings())
+    await asyncio.wait_for(pipeline.run(stop_event), timeout=5)
+
+    assert 5 not in api.updated
+    assert sorted(api.updated) == [1, 2, 4, 6, 7, 8, 9]
+    assert metrics.processed == 7
+    assert metrics.classified_via_llm == 7
+    assert metrics.failed == 1
+    assert engine.peak > 1
+    assert pipeline.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_pipeline_drains_claimed_messages_on_stop():
+    stop_event = asyncio.Event()
+    messages = [Message(id=i) for i in (1, 2, 3)]
+    api = FakeApiClient(messages, stop_event=asyncio.Event())
+    metrics = Metrics()
+
+    class StoppingEngine(SlowEngine):
+        async def classify_message(self, message: Message) -> UpdatePayload:
+            stop_event.set()
+            return await super().classify_message(message)
+
+    pipeline = ClassificationPipeline(api, StoppingEngine(), metrics, make_settings())
+    await asyncio.wait_for(pipeline.run(stop_event), timeout=5)
+
+    assert api.updated
+    assert set(api.updated) <= set(api.claimed)
+    assert metrics.processed == len(api.updated)
+    assert pipeline.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_scanning_does_not_reclassify_messages_left_as_other():
+    stop_event = asyncio.Event()
+    messages = [Message(id=i) for i in range(1, 8)]
+    classified: list[int] = []
+
+    class OtherApi(FakeApiClient):
+        async def _update_one(self, message_id: int, payload: UpdatePayload) -> None:
+            # Messages stay in the "other" listing after being updated.
+            self.updated[message_id] = payload
+
+    class OtherEngine:
+        async def classify_message(self, message: Message) -> UpdatePayload:
+            classified.append(message.id)
+            return UpdatePayload(classification="other", classified_by="rules")
+
+    api = OtherApi(messages, stop_event=stop_event)
+    pipeline = ClassificationPipeline(api, OtherEngine(), Metrics(), make_settings(BATCH_SIZE=3))
+
+    async def stop_when_exhausted():
+        while not pipeline.backlog_exhausted:
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.05)
+        stop_event.set()
+
+    await asyncio.wait_for(asyncio.gather(pipeline.run(stop_event), stop_when_exhausted()), timeout=5)
+
+    assert sorted(classified) == [1, 2, 3, 4, 6, 7]
+
+
+@pytest.mark.asyncio
+async def test_bulk_requests_coalesce_claims_and_updates():
+    async def run_with(bulk_size: int) -> FakeApiClient:
+        stop_event = asyncio.Event()
+        api = FakeApiClient([Message(id=i) for i in range(1, 13)], stop_event=stop_event)
+        settings = make_settings(
+            BATCH_SIZE=12,
+            PIPELINE_QUEUE_SIZE=12,
+            API_CONCURRENCY=1,
+            API_BULK_SIZE=bulk_size,
+            UPDATE_FLUSH_SECONDS=0.05,
+        )
+        await asyncio.wait_for(ClassificationPipeline(api, SlowEngine(), Metrics(), settings).run(stop_event), timeout=5)
+        return api
+
+    single = await run_with(1)
+    bulk = await run_with(25)
+
+    assert sorted(bulk.updated) == sorted(single.updated) == [1, 2, 3, 4, 6, 7, 8, 9, 11, 12]
+    assert bulk.requests < single.requests / 2
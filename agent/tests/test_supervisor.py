@@ -0,0 +1,33 @@
+import multiprocessing
+import os
+import time
+
+from inbox_triage_agent.supervisor import ShardSupervisor
+
+
+def _crash_first_run(index: int, count: int) -> None:
+    marker = os.path.join(os.environ["SUPERVISOR_TEST_DIR"], f"shard-{index}")
+    if index == 0 and not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(3)
+
+
+def test_supervisor_restarts_crashed_shards_only(tmp_path, monkeypatch):
+    monkeypatch.setenv("SUPERVISOR_TEST_DIR", str(tmp_path))
+    supervisor = ShardSupervisor(
+        2,
+        target=_crash_first_run,
+        context=multiprocessing.get_context("fork"),
+        restart_delay=0.0,
+    )
+
+    supervisor.start()
+    deadline = time.monotonic() + 10
+    try:
+        while supervisor.running and time.monotonic() < deadline:
+            supervisor.poll(0.1)
+    finally:
+        supervisor.stop(timeout=5)
+
+    assert not supervisor.running
+    assert supervisor.restarts == {0: 1, 1: 0}
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import re
+
+import pytest
+
+from inbox_triage_agent.classifier import ClassificationEngine
+from inbox_triage_agent.metrics import Metrics
+from inbox_triage_agent.models import Message, UpdatePayload
+from inbox_triage_agent.runner import ClassificationPipeline
+from inbox_triage_agent.threads import ThreadCache, strip_quoted
+from fakes import FakeApiClient, make_settings
+
+
+class ThreadLLM:
+    model = "stub"
+
+    def __init__(self):
+        self.prompts: list[str] = []
+
+    async def generate(self, prompt: str, *, options: dict | None = None) -> str:
+        self.prompts.append(prompt)
+        ids = re.findall(r"Email id (\d+):", prompt)
+        if not ids:
+            return '{"label": "interview_invite", "confidence": 0.9, "reason": "scheduling"}'
+        return json.dumps(
+            [{"id": int(i), "label": "interview_invite", "confidence": 0.9, "reason": "scheduling"} for i in ids]
+        )
+
+
+def test_strip_quoted_keeps_only_the_new_reply():
+    text = "Tuesday at 2pm works.\nOn Mon, Jan 5, 2026 at 9:14 AM Jane <jane@acme.com> wrote:\nCan we talk?"
+    assert strip_quoted(text) == "Tuesday at 2pm works."
+    assert strip_quoted("Thanks!\n> earlier line\n> another") == "Thanks!"
+    assert strip_quoted("> only quoted") == ""
+
+
+def test_thread_cache_expires_and_bounds_states():
+    now = [0.0]
+    metrics = Metrics()
+    cache = ThreadCache(ttl=10, max_threads=2, metrics=metrics, clock=lambda: now[0])
+    payload = UpdatePayload(classification="offer", classified_by="llm", confidence=0.9)
+    for thread in ("a", "b", "c"):
+        cache.record(thread, [Message(id=1, snippet=thread)], [payload], llm_calls=1)
+
+    assert "a" not in cache and "c" in cache
+    now[0] = 11
+    assert cache.get("c") is None
+    assert metrics.threads_seen == 3
+    assert metrics.thread_evictions == 2
+
+
+@pytest.mark.asyncio
+async def test_thread_replies_share_one_prompt_and_reuse_state():
+    stop_event = asyncio.Event()
+    quote = "\nOn Mon, Jan 5, 2026 at 9:14 AM Recruiter <r@acme.com> wrote:\nWould you like to interview?"
+    messages = [
+        Message(id=1, subject="Interview", snippet="Would you like to interview?", gmail_thread_id="t1"),
+        Message(id=2, subject="Re: Interview", snippet="Yes, Tuesday works." + quote, gmail_thread_id="t1"),
+        Message(id=3, subject="Re: Interview", snippet="Great, invite sent." + quote, gmail_thread_id="t1"),
+        Message(id=4, subject="Hello", snippet="Unrelated"),
+    ]
+    api = FakeApiClient(messages, stop_event=stop_event)
+    llm = ThreadLLM()
+    metrics = Metrics()
+    engine = ClassificationEngine(llm, min_confidence=0.5, metrics=metrics)
+    pipeline = ClassificationPipeline(api, engine, metrics, make_settings(CLAIM_MESSAGES=False, LLM_BATCH_SIZE=4))
+    await asyncio.wait_for(pipeline.run(stop_event), timeout=5)
+
+    assert sorted(api.updated) == [1, 2, 3, 4]
+    thread_prompts = [prompt for prompt in llm.prompts if "Email id 1:" in prompt]
+    assert len(thread_prompts) == 1 and "wrote:" not in thread_prompts[0]
+    assert metrics.thread_llm_calls == 1
+    assert metrics.thread_messages == 3
+
+    # A reply that only forwards the quoted history reuses the thread's label.
+    forwarded = Message(id=9, subject="Fwd: Interview", snippet=quote.strip(), gmail_thread_id="t1")
+    calls = len(llm.prompts)
+    [payload] = await pipeline._classify_thread(pipeline._threads, "t1", [forwarded])
+    assert len(llm.prompts) == calls
+    assert payload.classification == "interview_invite"
+    assert metrics.thread_reused == 1
+
+    # New text is classified with the thread's label as context.
+    followup = Message(id=10, subject="Re: Interview", snippet="Here is the offer letter.", gmail_thread_id="t1")
+    await pipeline._classify_thread(pipeline._threads, "t1", [followup])
+    assert "Thread context: Earlier messages in this thread were classified as interview_invite" in llm.prompts[-1]
+
+
+@pytest.mark.asyncio
+async def test_thread_replies_are_prompted_one_by_one_when_batching_is_off():
+    llm = ThreadLLM()
+    metrics = Metrics()
+    engine = ClassificationEngine(llm, min_confidence=0.5, metrics=metrics)
+    api = FakeApiClient([], stop_event=asyncio.Event())
+    pipeline = ClassificationPipeline(api, engine, metrics, make_settings(LLM_BATCH_SIZE=1))
+    replies = [Message(id=i, subject="Re: Interview", snippet=f"Reply {i}", gmail_thread_id="t1") for i in (1, 2, 3)]
+
+    payloads = await pipeline._classify_thread(pipeline._threads, "t1", replies)
+
+    assert [payload.classification for payload in payloads] == ["interview_invite"] * 3
+    assert len(llm.prompts) == 3
+    assert not any("Email id" in prompt for prompt in llm.prompts)
+
+
+class RecordingApiClient(FakeApiClient):
+    def __init__(self, messages, *, stop_event):
+        super().__init__(messages, stop_event=stop_event)
+        self.claim_batches: list[int] = []
+
+    async def claim_messages(self, message_ids) -> dict[int, bool]:
+        self.claim_batches.append(len(message_ids))
+        return await super().claim_messages(message_ids)
+
+
+@pytest.mark.asyncio
+async def test_claims_of_thread_groups_stay_near_the_bulk_size():
+    stop_event = asyncio.Event()
+    messages = [
+        Message(id=i, subject="Re: Interview", snippet=f"Reply {i}", gmail_thread_id=f"t{(i - 1) // 20}")
+        for i in range(1, 81)
+    ]
+    api = RecordingApiClient(messages, stop_event=stop_event)
+    metrics = Metrics()
+    engine = ClassificationEngine(ThreadLLM(), min_confidence=0.5, metrics=metrics)
+    settings = make_settings(BATCH_SIZE=100, API_BULK_SIZE=5, PIPELINE_QUEUE_SIZE=10)
+    pipeline = ClassificationPipeline(api, engine, metrics, settings)
+    await asyncio.wait_for(pipeline.run(stop_event), timeout=5)
+
+    # Each thread group is larger than the bulk size, so every claim carries exactly one group.
+    assert api.claim_batches and max(api.claim_batches) <= 20
+    assert sum(api.claim_batches) == 80
@@ -4,10 +4,35 @@ class MessagesController < ApplicationController
   before_action :set_message, only: %i[update claim]
 
   STATUS_MAP = ParsedMessageIngester::STATUS_MAP
+  BULK_LIMIT = 100
+  # Headers the triage agent scores and prompts with; transport headers (Received, DKIM, ARC) are left out.
+  AGENT_HEADERS = %w[
+    from reply-to sender list-unsubscribe list-id precedence auto-submitted x-auto-response-suppress x-mailer
+  ].freeze
+  # Vendor headers of applicant tracking systems, e.g. X-Greenhouse-Job-Id.
+  ATS_VENDORS = %w[
+    ashby bamboohr greenhouse icims indeed jobvite lever linkedin smartrecruiters successfactors taleo teamtailor
+    workable workday
+  ].freeze
+  ATS_HEADER = /\Ax-.*(#{ATS_VENDORS.join("|")})/i
 
   def index
-    scope = Message.joins(:application).where(applications: { user_id: current_user.id })
+    scope = user_messages
     scope = scope.where(classification: params[:classification]) if params[:classification].present?
+    if params[:ids].present?
+      ids = params[:ids].to_s.split(",").filter_map { |id| Integer(id, exception: false) }.first(BULK_LIMIT)
+      scope = scope.where(id: ids)
+    end
+    if params[:shard_count].present?
+      shard_count = Integer(params[:shard_count].to_s, exception: false)
+      shard_index = Integer(params.fetch(:shard_index, 0).to_s, exception: false)
+      unless shard_count&.positive? && shard_index && shard_index >= 0 && shard_index < shard_count
+        return render json: { error: "Invalid shard" }, status: :unprocessable_entity
+      end
+
+      # Agent processes split the backlog by id so they never race for the same rows.
+      scope = scope.where("messages.id % ? = ?", shard_count, shard_index)
+    end
 
     limit  = [[params.fetch(:limit, 50).to_i, 1].max, 100].min
     offset = [params.fetch(:offset, 0).to_i, 0].max
@@ -17,43 +42,110 @@ class MessagesController < ApplicationController
   end
 
   def update
-    payload = update_params.to_h.symbolize_keys
-    classification = payload[:classification].to_s.downcase
-    classified_by = payload[:classified_by].to_s.downcase
+    payload, error = normalize_update_payload(update_params.to_h)
+    return render json: { error: error }, status: :unprocessable_entity if error
+
+    apply_classification!(@message, payload)
+
+    render json: serialize_message(@message.reload)
+  end
+
+  def claim
+    return render json: { triage_in_progress: false }, status: :conflict unless claim_message!(@message)
+
+    render json: { triage_in_progress: true }
+  end
+
+  # PATCH /messages/bulk_claim  { "ids": [1, 2, 3] }
+  def bulk_claim
+    ids = Array(params[:ids]).filter_map { |id| Integer(id.to_s, exception: false) }.uniq
+    return render json: { error: "Provide ids" }, status: :unprocessable_entity if ids.empty?
+    return render json: { error: "At most #{BULK_LIMIT} ids per request" }, status: :unprocessable_entity if ids.size > BULK_LIMIT
+
+    messages = user_messages.where(id: ids).index_by(&:id)
+    results = ids.map do |id|
+      message = messages[id]
+      if message.nil?
+        { id: id, status: "not_found", triage_in_progress: false }
+      elsif claim_message!(message)
+        { id: id, status: "claimed", triage_in_progress: true }
+      else
+        { id: id, status: "conflict", triage_in_progress: false }
+      end
+    end
+
+    render json: { results: results }
+  end
+
+  # PATCH /messages/bulk_update  { "updates": [{ "id": 1, "classification": "offer", ... }] }
+  def bulk_update
+    updates = params[:updates].is_a?(Array) ? params[:updates].grep(ActionController::Parameters) : []
+    return render json: { error: "Provide updates" }, status: :unprocessable_entity if updates.empty?
+    return render json: { error: "At most #{BULK_LIMIT} updates per request" }, status: :unprocessable_entity if updates.size > BULK_LIMIT
+
+    ids = updates.map { |update| update[:id].to_i }
+    messages = user_messages.where(id: ids).includes(:application).index_by(&:id)
+    results = updates.zip(ids).map do |update, id|
+      message = messages[id]
+      next { id: id, status: "not_found" } if message.nil?
+
+      payload, error = normalize_update_payload(
+        update.permit(:classification, :classified_by, :confidence, :reason, :raw_response).to_h
+      )
+      next { id: id, status: "invalid", error: error } if error
+
+      apply_classification!(message, payload)
+      { id: id, status: "updated" }
+    end
+
+    render json: { results: results }
+  end
+
+  private
+
+  def set_message
+    @message = user_messages.find(params[:id])
+  end
+
+  def user_messages
+    Message.joins(:application).where(applications: { user_id: current_user.id })
+  end
+
+  # Returns [payload, nil] or [nil, error message].
+  def normalize_update_payload(raw)
+    payload = raw.symbolize_keys
     if payload.key?(:confidence)
       begin
         payload[:confidence] = normalize_confidence(payload[:confidence])
       rescue ArgumentError
-        return render json: { error: "Invalid confidence" }, status: :unprocessable_entity
+        return [nil, "Invalid confidence"]
       end
     end
     payload[:reason] = payload[:reason].presence
     payload[:raw_response] = payload[:raw_response].presence
+    payload[:classification] = payload[:classification].to_s.downcase
+    payload[:classified_by] = payload[:classified_by].to_s.downcase
 
-    unless EmailClassifier::CATEGORIES.include?(classification)
-      return render json: { error: "Invalid classification" }, status: :unprocessable_entity
-    end
+    return [nil, "Invalid classification"] unless EmailClassifier::CATEGORIES.include?(payload[:classification])
+    return [nil, "Invalid classified_by"] unless %w[llm rules].include?(payload[:classified_by])
 
-    unless %w[llm rules].include?(classified_by)
-      return render json: { error: "Invalid classified_by" }, status: :unprocessable_entity
-    end
-
-    payload[:classification] = classification
-    payload[:classified_by] = classified_by
+    [payload, nil]
+  end
 
-    metadata = merged_classification_metadata(@message.parts_metadata, payload)
+  # Writes the classification and drops the triage claim in a single update.
+  def apply_classification!(message, payload)
+    metadata = merged_classification_metadata(message.parts_metadata, payload)
+    metadata.delete("triage")
 
     Message.transaction do
-      @message.update!(classification: payload[:classification], parts_metadata: metadata)
-      update_application_status(@message.application, payload[:classification])
-      clear_triage_state(@message)
+      message.update!(classification: payload[:classification], parts_metadata: metadata)
+      update_application_status(message.application, payload[:classification])
     end
-
-    render json: serialize_message(@message.reload)
   end
 
-  def claim
-    metadata = @message.parts_metadata.is_a?(Hash) ? @message.parts_metadata.deep_dup : {}
+  # Returns false when another claimant holds a fresh claim on the message.
+  def claim_message!(message)
+    metadata = message.parts_metadata.is_a?(Hash) ? message.parts_metadata.deep_dup : {}
     triage   = metadata.fetch("triage", {})
 
     current_claimant = current_claimant_identifier
@@ -61,9 +153,7 @@ class MessagesController < ApplicationController
     claimed_at       = parse_time(triage["claimed_at"])
     in_progress      = triage["in_progress"]
 
-    if in_progress && claimed_by.present? && claimed_by != current_claimant && claimed_at.present? && claimed_at > 10.minutes.ago
-      return render json: { triage_in_progress: false }, status: :conflict
-    end
+    return false if in_progress && claimed_by.present? && claimed_by != current_claimant && claimed_at.present? && claimed_at > 10.minutes.ago
 
     metadata["triage"] = {
       "in_progress" => true,
@@ -71,15 +161,8 @@ class MessagesController < ApplicationController
       "claimed_at" => Time.current.iso8601
     }
 
-    @message.update!(parts_metadata: metadata)
-
-    render json: { triage_in_progress: true }
-  end
-
-  private
-
-  def set_message
-    @message = Message.joins(:application).where(applications: { user_id: current_user.id }).find(params[:id])
+    message.update!(parts_metadata: metadata)
+    true
   end
 
   def update_params
@@ -108,13 +191,6 @@ class MessagesController < ApplicationController
     application.update!(status: new_status, last_status_change_at: Time.current)
   end
 
-  def clear_triage_state(message)
-    metadata = message.parts_metadata.is_a?(Hash) ? message.parts_metadata.deep_dup : {}
-    return unless metadata.delete("triage")
-
-    message.update_column(:parts_metadata, metadata) # rubocop:disable Rails/SkipsModelValidations
-  end
-
   def serialize_messages(collection)
     Array(collection).map { |message| serialize_message(message) }
   end
@@ -127,7 +203,13 @@ class MessagesController < ApplicationController
         application: { only: %i[id role_title status] },
         contact: { only: %i[id name email] }
       }
-    )
+    ).merge("raw_headers" => agent_headers(message.raw_headers))
+  end
+
+  def agent_headers(headers)
+    return nil unless headers.is_a?(Hash)
+
+    headers.select { |name, _| AGENT_HEADERS.include?(name.to_s.downcase) || name.to_s.match?(ATS_HEADER) }
   end
 
   def current_claimant_identifier
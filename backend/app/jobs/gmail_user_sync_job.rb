@@ -12,6 +12,7 @@ class GmailUserSyncJob < ApplicationJob
   gmail    = GoogleClientFactory.gmail_for(user)
     attempts = 0
     page_token = nil
+    untriaged_ids = []
   # Determine time window: only fetch messages after the user's last sync.
   # If not set, default to 1 hour ago to avoid a large backfill on first run.
   after_time = user.last_gmail_synced_at || 1.hour.ago
@@ -38,7 +39,9 @@ class GmailUserSyncJob < ApplicationJob
 
       Array(res.messages).each do |ref|
         msg = gmail.get_user_message("me", ref.id, format: "full")
-        ParsedMessageIngester.new(user, msg).ingest!
+        message = ParsedMessageIngester.new(user, msg).ingest!
+        # The triage agent only picks up messages the rules left as "other".
+        untriaged_ids << message.id if message&.classification == "other"
       end
 
       page_token = res.next_page_token
@@ -47,5 +50,6 @@ class GmailUserSyncJob < ApplicationJob
 
     # Update user's last synced timestamp to now after successful sync
     user.update!(last_gmail_synced_at: Time.current)
+    TriageAgentNotifier.new.notify(untriaged_ids)
   end
 end
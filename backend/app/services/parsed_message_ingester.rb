@@ -62,6 +62,8 @@ class ParsedMessageIngester
     if (new_status = STATUS_MAP[label])
       app.update!(status: new_status, last_status_change_at: Time.current)
     end
+
+    message
   end
 
   private
@@ -0,0 +1,43 @@
+require "net/http"
+
+# Tells the local triage agent about newly ingested messages so it can
+# classify them right away instead of waiting for its next poll.
+#
+# TRIAGE_AGENT_PUSH_URL may list several comma-separated URLs, one per agent
+# shard; every shard receives all ids and keeps the ones it owns.
+class TriageAgentNotifier
+  def initialize(url: ENV["TRIAGE_AGENT_PUSH_URL"], token: ENV["TRIAGE_AGENT_PUSH_TOKEN"], transport: nil)
+    @urls = url.to_s.split(",").map(&:strip).reject(&:empty?)
+    @token = token
+    @transport = transport || method(:post)
+  end
+
+  def notify(message_ids)
+    ids = Array(message_ids).compact.uniq
+    return false if ids.empty? || @urls.empty?
+
+    body = { message_ids: ids }.to_json
+    @urls.map { |url| deliver(url, body) }.any?
+  end
+
+  private
+
+  def deliver(url, body)
+    uri = URI(url)
+    request = Net::HTTP::Post.new(uri, "Content-Type" => "application/json")
+    request["Authorization"] = "Bearer #{@token}" if @token.present?
+    request.body = body
+    @transport.call(uri, request)
+    true
+  rescue StandardError => e
+    # The agent's reconciliation poll picks the messages up anyway.
+    Rails.logger.warn("[TRIAGE] agent notification to #{url} failed: #{e.class} #{e.message}")
+    false
+  end
+
+  def post(uri, request)
+    Net::HTTP.start(uri.host, uri.port, use_ssl: uri.scheme == "https", open_timeout: 1, read_timeout: 2) do |http|
+      http.request(request)
+    end
+  end
+end
@@ -24,6 +24,8 @@ Rails.application.routes.draw do
     post "/sync/gmail", to: "syncs#gmail"
     resources :messages, only: [:index, :update] do
       patch :claim, on: :member
+      patch :bulk_claim, on: :collection
+      patch :bulk_update, on: :collection
     end
     resources :applications, only: [:index, :show]
 
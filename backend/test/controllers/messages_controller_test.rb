@@ -54,6 +54,55 @@ class MessagesControllerTest < ActionDispatch::IntegrationTest
     assert_equal @message.id, body.first["id"]
   end
 
+  test "index serializes the headers the agent uses" do
+    @message.update!(
+      internal_ts: Time.zone.parse("2026-01-05 09:00:00"),
+      raw_headers: {
+        "From" => "Acme Talent <no-reply@greenhouse.io>",
+        "List-Unsubscribe" => "<https://example.com/u>",
+        "X-Greenhouse-Job-Id" => "42",
+        "DKIM-Signature" => "v=1; a=rsa-sha256",
+        "Received" => "from mail.example.com"
+      }
+    )
+
+    get "/api/v1/messages", headers: auth_headers(@user)
+
+    assert_response :success
+    message = JSON.parse(response.body).first
+    assert_equal %w[From List-Unsubscribe X-Greenhouse-Job-Id], message["raw_headers"].keys
+    assert message["internal_ts"].start_with?("2026-01-05T09:00:00")
+  end
+
+  test "index filters by ids" do
+    get "/api/v1/messages", params: { ids: "#{@message.id},0" }, headers: auth_headers(@user)
+
+    assert_response :success
+    assert_equal [@message.id], JSON.parse(response.body).map { |message| message["id"] }
+
+    get "/api/v1/messages", params: { ids: "0" }, headers: auth_headers(@user)
+
+    assert_equal [], JSON.parse(response.body)
+  end
+
+  test "index filters by shard" do
+    shard_count = 2
+    own_shard = @message.id % shard_count
+
+    get "/api/v1/messages", params: { shard_index: own_shard, shard_count: shard_count }, headers: auth_headers(@user)
+
+    assert_response :success
+    assert_equal [@message.id], JSON.parse(response.body).map { |message| message["id"] }
+
+    get "/api/v1/messages", params: { shard_index: 1 - own_shard, shard_count: shard_count }, headers: auth_headers(@user)
+
+    assert_equal [], JSON.parse(response.body)
+
+    get "/api/v1/messages", params: { shard_index: 2, shard_count: shard_count }, headers: auth_headers(@user)
+
+    assert_response :unprocessable_entity
+  end
+
   test "claim marks message in progress and prevents other users" do
     patch "/api/v1/messages/#{@message.id}/claim", headers: auth_headers(@user)
 
@@ -93,6 +142,52 @@ class MessagesControllerTest < ActionDispatch::IntegrationTest
     assert_nil @message.parts_metadata["triage"]
   end
 
+  test "bulk_claim reports per-id results" do
+    other_message = Message.create!(
+      application: @message.application,
+      contact: @message.contact,
+      gmail_message_id: SecureRandom.hex(8),
+      gmail_thread_id: SecureRandom.hex(8),
+      subject: "Taken",
+      classification: "other",
+      parts_metadata: {
+        "triage" => { "in_progress" => true, "claimed_by" => "someone-else", "claimed_at" => Time.current.iso8601 }
+      }
+    )
+
+    patch "/api/v1/messages/bulk_claim",
+          params: { ids: [@message.id, other_message.id, 0] }.to_json,
+          headers: auth_headers(@user).merge("Content-Type" => "application/json")
+
+    assert_response :success
+    results = JSON.parse(response.body)["results"].index_by { |result| result["id"] }
+    assert_equal "claimed", results[@message.id]["status"]
+    assert_equal "conflict", results[other_message.id]["status"]
+    assert_equal "not_found", results[0]["status"]
+    assert_equal true, @message.reload.parts_metadata.dig("triage", "in_progress")
+  end
+
+  test "bulk_update applies valid updates and reports invalid ones" do
+    @message.update!(parts_metadata: { "triage" => { "in_progress" => true } })
+    updates = [
+      { id: @message.id, classification: "offer", classified_by: "llm", confidence: 0.9 },
+      { id: @message.id + 1000, classification: "offer", classified_by: "llm" },
+      { id: @message.id, classification: "nonsense", classified_by: "llm" }
+    ]
+
+    patch "/api/v1/messages/bulk_update",
+          params: { updates: updates }.to_json,
+          headers: auth_headers(@user).merge("Content-Type" => "application/json")
+
+    assert_response :success
+    statuses = JSON.parse(response.body)["results"].map { |result| result["status"] }
+    assert_equal %w[updated not_found invalid], statuses
+    @message.reload
+    assert_equal "offer", @message.classification
+    assert_equal "offer", @message.application.reload.status
+    assert_nil @message.parts_metadata["triage"]
+  end
+
   private
 
   def auth_headers(user)
@@ -0,0 +1,38 @@
+require "test_helper"
+
+class TriageAgentNotifierTest < ActiveSupport::TestCase
+  test "posts message ids with the shared token" do
+    sent = []
+    notifier = TriageAgentNotifier.new(
+      url: "http://127.0.0.1:8765/notify",
+      token: "secret",
+      transport: ->(uri, request) { sent << [uri, request] }
+    )
+
+    assert notifier.notify([3, 4, 3, nil])
+
+    uri, request = sent.first
+    assert_equal "/notify", uri.path
+    assert_equal "Bearer secret", request["Authorization"]
+    assert_equal({ "message_ids" => [3, 4] }, JSON.parse(request.body))
+  end
+
+  test "does nothing without a url or ids and swallows transport errors" do
+    failing = ->(_uri, _request) { raise Errno::ECONNREFUSED }
+
+    assert_not TriageAgentNotifier.new(url: nil, transport: failing).notify([1])
+    assert_not TriageAgentNotifier.new(url: "http://127.0.0.1:8765/notify", transport: failing).notify([])
+    assert_not TriageAgentNotifier.new(url: "http://127.0.0.1:8765/notify", transport: failing).notify([1])
+  end
+
+  test "posts to every listed shard url" do
+    sent = []
+    notifier = TriageAgentNotifier.new(
+      url: "http://127.0.0.1:8765/notify, http://127.0.0.1:8766/notify",
+      transport: ->(uri, _request) { sent << uri.port }
+    )
+
+    assert notifier.notify([5])
+    assert_equal [8765, 8766], sent
+  end
+end